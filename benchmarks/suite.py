@@ -0,0 +1,462 @@
+import argparse
+import asyncio
+import collections
+import datetime
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+
+from concurrent.futures import ThreadPoolExecutor
+
+from voucherify import Client as voucherifyClient, utils
+from voucherify.cache import ResponseCache
+from voucherify.codec import JsonCodec, get_codec
+from voucherify.hooks import Hook, MetricsCollector
+from voucherify.models import Voucher
+from voucherify.registry import ClientRegistry
+from voucherify.stub import ApiStub, StubServer
+from voucherify.transport import RecordingAdapter, ReplayAdapter, load_cassette
+from voucherify.warmup import warm_up, RefreshAhead
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'redemptions_list.json')
+SCENARIOS = collections.OrderedDict()
+# Metrics ending in one of these are rates, where higher is better; all other metrics are durations.
+RATE_SUFFIXES = ('_per_s', 'speedup')
+# Runs with fewer repeats than this are too noisy to report regressions from.
+MIN_REPEAT = 3
+
+
+def scenario(name):
+    def register(func):
+        SCENARIOS[name] = func
+        return func
+    return register
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def latencies(func, calls):
+    timings = []
+    for i in range(calls):
+        started = time.perf_counter()
+        func(i)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return {
+        'calls_per_s': calls / sum(timings),
+        'p50_ms': 1000 * percentile(timings, 0.5),
+        'p99_ms': 1000 * percentile(timings, 0.99)
+    }
+
+
+def rate(func, items):
+    started = time.perf_counter()
+    func()
+    return items / (time.perf_counter() - started)
+
+
+def catalog(size):
+    return [{'code': 'CODE%d' % i, 'campaign': 'Bench', 'metadata': {'batch': i // 100},
+             'discount': {'type': 'PERCENT', 'percent_off': 5 + i % 20}} for i in range(size)]
+
+
+def stubClient(server, **kwargs):
+    kwargs.setdefault('pool_maxsize', 16)
+    client = voucherifyClient('bench-app-id', 'bench-secret-key', api_endpoint=server.url, **kwargs)
+    # Reading proxy settings from the environment on every call would dominate the timings.
+    client.session.trust_env = False
+    return client
+
+
+def replayClient(**kwargs):
+    # Replays one recorded response without a socket, so only the SDK and requests code paths are measured.
+    response = {'status': 200, 'headers': {'Content-Type': 'application/json'}, 'body': json.dumps(catalog(1)[0])}
+    replay = ReplayAdapter([{
+        'request': {'method': 'GET', 'path': '/v1/vouchers/CODE0', 'query': [], 'body': None},
+        'response': response
+    }])
+    return voucherifyClient('bench-app-id', 'bench-secret-key', transport=replay, **kwargs)
+
+
+@scenario('request_overhead')
+def request_overhead(quick):
+    with replayClient() as client:
+        client.session.trust_env = False
+        result = latencies(lambda i: client.vouchers.get('CODE0'), 2000 if quick else 20000)
+    return {'calls_per_s': result['calls_per_s'], 'mean_us': 1e6 / result['calls_per_s']}
+
+
+@scenario('single_call')
+def single_call(quick):
+    result = {}
+    with StubServer(ApiStub(vouchers=catalog(100))) as server:
+        for prefix, keep_alive in (('', True), ('no_keep_alive_', False)):
+            with stubClient(server, keep_alive=keep_alive) as client:
+                client.vouchers.get('CODE0')
+                timings = latencies(lambda i: client.vouchers.get('CODE%d' % (i % 100)), 300 if quick else 3000)
+            result.update((prefix + metric, value) for metric, value in timings.items())
+    return result
+
+
+@scenario('concurrent_throughput')
+def concurrent_throughput(quick, workers=8):
+    calls = 400 if quick else 4000
+    params = {'order': {'amount': 10000}}
+    with StubServer(ApiStub(vouchers=catalog(100)), latency=0.002) as server, stubClient(server) as client:
+        executor = ThreadPoolExecutor(max_workers=workers)
+        try:
+            validate = lambda i: client.validations.validateVoucher('CODE%d' % (i % 100), params, strict=True)
+            serial = rate(lambda: [validate(i) for i in range(calls // workers)], calls // workers)
+            parallel = rate(lambda: list(executor.map(validate, range(calls))), calls)
+        finally:
+            executor.shutdown(wait=True)
+    return {'serial_calls_per_s': serial, 'calls_per_s': parallel, 'speedup': parallel / serial}
+
+
+@scenario('pagination')
+def pagination(quick):
+    size = 2000 if quick else 20000
+    with StubServer(ApiStub(vouchers=catalog(size))) as server, stubClient(server) as client:
+        result = {}
+        for label, prefetch in (('records_per_s', True), ('no_prefetch_records_per_s', False)):
+            iterate = lambda: sum(1 for _ in client.vouchers.iter_list({'limit': 100}, prefetch=prefetch))
+            result[label] = rate(iterate, size)
+    return result
+
+
+def recorded_payloads():
+    # Records the bodies of a typical session against the stub, so the codecs are measured on real payload shapes.
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'session.ndjson')
+        with StubServer(ApiStub(vouchers=catalog(500))) as server:
+            with voucherifyClient('bench-app-id', 'bench-secret-key', api_endpoint=server.url,
+                                  transport=RecordingAdapter(path)) as client:
+                client.session.trust_env = False
+                client.vouchers.list({'limit': 100})
+                for i in range(20):
+                    client.vouchers.get('CODE%d' % i)
+                    client.validations.validateVoucher('CODE%d' % i, {'order': {'amount': 1000 * i}})
+                    client.redemptions.redeem({'voucher': 'CODE%d' % i, 'order': {'amount': 1000 * i},
+                                               'customer': {'source_id': 'customer-%d' % i}})
+                client.redemptions.list({'limit': 20})
+        bodies = [interaction['response']['body'].encode('utf-8') for interaction in load_cassette(path)]
+    finally:
+        shutil.rmtree(directory)
+    with open(FIXTURE, 'rb') as fixture:
+        bodies.append(fixture.read())
+    return bodies
+
+
+@scenario('json_codec')
+def json_codec(quick):
+    bodies = recorded_payloads()
+    documents = [JsonCodec().decode(body) for body in bodies]
+    size = sum(len(body) for body in bodies)
+    repeat = 5 if quick else 50
+    codecs = [JsonCodec()]
+    for name in ('orjson', 'ujson'):
+        try:
+            codecs.append(get_codec(name))
+        except ImportError:
+            pass
+    result = {}
+    for codec in codecs:
+        decode = rate(lambda: [codec.decode(body) for _ in range(repeat) for body in bodies], repeat * size)
+        encode = rate(lambda: [codec.encode(document) for _ in range(repeat) for document in documents],
+                      repeat * size)
+        result['%s_decode_mb_per_s' % codec.name] = decode / 1e6
+        result['%s_encode_mb_per_s' % codec.name] = encode / 1e6
+        # The redemptions page fixture is the last body; iter_array is what iter_list uses without prefetching.
+        iterate = rate(lambda: [sum(1 for _ in codec.iter_array(bodies[-1], 'redemptions')) for _ in range(repeat)],
+                       repeat * len(bodies[-1]))
+        result['%s_iter_array_mb_per_s' % codec.name] = iterate / 1e6
+    return result
+
+
+@scenario('pricing')
+def pricing(quick):
+    rows = 20000 if quick else 500000
+    generator = random.Random(0)
+    base_prices = [round(generator.uniform(1, 500), 2) for _ in range(rows)]
+    unit_prices = [round(generator.uniform(1, 50), 2) for _ in range(rows)]
+    vouchers = [{'discount': {'type': 'PERCENT', 'percent_off': 12.5}},
+                {'discount': {'type': 'AMOUNT', 'amount_off': 1500}},
+                {'discount': {'type': 'UNIT', 'unit_off': 2}}]
+    row_vouchers = [vouchers[i % len(vouchers)] for i in range(rows)]
+    rows_of = list(zip(base_prices, row_vouchers, unit_prices))
+
+    result = {
+        'calculate_price_rows_per_s': rate(lambda: [utils.calculate_price(*row) for row in rows_of], rows),
+        'calculate_discount_rows_per_s': rate(lambda: [utils.calculate_discount(*row) for row in rows_of], rows)
+    }
+    backends = [('python', False)] + ([('numpy', True)] if utils._load_numpy() is not None else [])
+    for name, use_numpy in backends:
+        # A single voucher for all rows takes the vectorized path without grouping rows by voucher.
+        for suffix, batch_vouchers in (('', row_vouchers), ('_one_voucher', vouchers[0])):
+            result['batch_%s%s_rows_per_s' % (name, suffix)] = rate(
+                lambda: utils.calculate_prices(base_prices, batch_vouchers, unit_prices, use_numpy=use_numpy), rows)
+    return result
+
+
+@scenario('hooks')
+def hooks(quick):
+    calls = 2000 if quick else 20000
+    result = {}
+    for label, client_hooks in (('no_hooks', None), ('noop_hook', [Hook()]), ('metrics_hook', [MetricsCollector()])):
+        with replayClient(hooks=client_hooks) as client:
+            client.session.trust_env = False
+            result['%s_us' % label] = 1e6 / latencies(lambda i: client.vouchers.get('CODE0'), calls)['calls_per_s']
+    return result
+
+
+@scenario('async_throughput')
+def async_throughput(quick):
+    from voucherify import AsyncClient
+
+    calls = 200 if quick else 2000
+    params = {'order': {'amount': 1000}}
+
+    async def run_async(url, concurrency):
+        async with AsyncClient('bench-app-id', 'bench-secret-key', api_endpoint=url, pool_maxsize=concurrency,
+                               max_concurrency=concurrency) as client:
+            await asyncio.gather(*[client.validations.validateVoucher('CODE%d' % i, params) for i in range(calls)])
+
+    result = {}
+    with StubServer(ApiStub(vouchers=catalog(100)), latency=0.005) as server:
+        for concurrency in (10, 100):
+            with stubClient(server, pool_maxsize=concurrency) as client:
+                executor = ThreadPoolExecutor(max_workers=concurrency)
+                try:
+                    validate = lambda i: client.validations.validateVoucher('CODE%d' % (i % 100), params)
+                    result['sync_%d_calls_per_s' % concurrency] = rate(
+                        lambda: list(executor.map(validate, range(calls))), calls)
+                finally:
+                    executor.shutdown(wait=True)
+            result['async_%d_calls_per_s' % concurrency] = rate(
+                lambda: asyncio.run(run_async(server.url, concurrency)), calls)
+    return result
+
+
+@scenario('create_many')
+def create_many(quick):
+    count = 200 if quick else 2000
+    result = {}
+    with StubServer(lambda method, path, query, body: (200, body), latency=0.005) as server:
+        for workers in (1, 16):
+            with stubClient(server, pool_maxsize=workers) as client:
+                created = lambda: list(client.vouchers.create_many(iter(catalog(count)), workers=workers))
+                result['workers_%d_vouchers_per_s' % workers] = rate(created, count)
+    return result
+
+
+@scenario('models')
+def models(quick):
+    count = 20000 if quick else 200000
+    payloads = [json.dumps(voucher) for voucher in catalog(count)]
+    result = {}
+    for label, build in (('dicts', lambda item: item), ('models', Voucher.from_dict)):
+        tracemalloc.start()
+        started = time.perf_counter()
+        vouchers = [build(json.loads(payload)) for payload in payloads]
+        retained = tracemalloc.get_traced_memory()[0]
+        for voucher in vouchers:
+            utils.calculate_price(100.0, voucher, 1.0)
+        elapsed = time.perf_counter() - started
+        tracemalloc.stop()
+        result['%s_vouchers_per_s' % label] = count / elapsed
+        result['%s_bytes_per_voucher' % label] = retained / float(count)
+    return result
+
+
+@scenario('registry')
+def registry(quick, tenants=1000):
+    calls = 300 if quick else 3000
+
+    def per_request(tenant):
+        with voucherifyClient(tenant, 'secret-' + tenant, api_endpoint=server.url) as client:
+            client.vouchers.get('CODE1')
+
+    def measure(handle):
+        generator = random.Random(7)
+        connections = server.connections
+        timings = latencies(lambda i: handle('app-%d' % generator.randrange(tenants)), calls)
+        return timings['p99_ms'], server.connections - connections
+
+    result = {}
+    with StubServer(ApiStub(vouchers=catalog(2))) as server:
+        result['client_per_request_p99_ms'], result['client_per_request_connections'] = measure(per_request)
+        with ClientRegistry(api_endpoint=server.url, max_tenants=256) as clients:
+            result['registry_p99_ms'], result['registry_connections'] = measure(
+                lambda tenant: clients.get(tenant, 'secret-' + tenant).vouchers.get('CODE1'))
+    return result
+
+
+@scenario('startup')
+def startup(quick):
+    script = 'import time; started = time.perf_counter(); import voucherify; print(time.perf_counter() - started)'
+    imports = sorted(float(subprocess.check_output([sys.executable, '-c', script], cwd=ROOT))
+                     for _ in range(3 if quick else 11))
+    number = 1000 if quick else 10000
+
+    def construction_us(*touch):
+        def construct():
+            client = voucherifyClient('bench-app-id', 'bench-secret-key')
+            for name in touch:
+                getattr(client, name)
+        return 1e6 * min(timeit.repeat(construct, number=number, repeat=5)) / number
+
+    return {
+        'import_ms': 1000 * imports[len(imports) // 2],
+        'client_us': construction_us(),
+        'client_vouchers_us': construction_us('vouchers'),
+        'client_all_resources_us': construction_us('customers', 'vouchers', 'redemptions', 'validations',
+                                                   'distributions', 'orders', 'products', 'validation_rules')
+    }
+
+
+@scenario('warmup')
+def warmup(quick, size=500):
+    seconds = 1 if quick else 5
+    generator = random.Random(7)
+    result = {}
+    with StubServer(ApiStub(vouchers=catalog(size)), latency=0.005) as server:
+        for label, warm, refresh in (('cold', False, False), ('warm_up', True, False),
+                                     ('refresh_ahead', True, True)):
+            cache = ResponseCache(ttl=seconds / 2.0, max_entries=size)
+            if refresh:
+                cache = RefreshAhead(cache, refresh_before=0.2, jitter=0.1, workers=4)
+            with stubClient(server, cache=cache) as client:
+                started = time.perf_counter()
+                if warm:
+                    warm_up(client, vouchers={'limit': 100})
+                result['%s_ready_ms' % label] = 1000 * (time.perf_counter() - started)
+                if refresh:
+                    cache.start(client)
+                timings = []
+                stop = time.perf_counter() + seconds
+                while time.perf_counter() < stop:
+                    call_started = time.perf_counter()
+                    client.vouchers.get('CODE%d' % generator.randrange(size))
+                    timings.append(time.perf_counter() - call_started)
+                if refresh:
+                    cache.stop()
+            stats = cache.stats()
+            timings.sort()
+            result['%s_miss_rate' % label] = stats['misses'] / float(stats['hits'] + stats['misses'])
+            result['%s_p999_ms' % label] = 1000 * percentile(timings, 0.999)
+    return result
+
+
+def environment():
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                         stderr=subprocess.STDOUT).decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    with open(os.path.join(ROOT, 'setup.py')) as f:
+        version = re.search(r"__version__ = '([^']+)'", f.read())
+    return {
+        'version': version.group(1) if version else None,
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')
+    }
+
+
+def best(runs):
+    # Keeps the best value of each metric, and how far apart the runs were relative to it.
+    values, spread = collections.OrderedDict(), collections.OrderedDict()
+    for metric in runs[0]:
+        samples = [metrics[metric] for metrics in runs]
+        values[metric] = max(samples) if metric.endswith(RATE_SUFFIXES) else min(samples)
+        spread[metric] = (max(samples) - min(samples)) / values[metric] if values[metric] else 0.0
+    return values, spread
+
+
+def run(names=None, quick=False, repeat=MIN_REPEAT, out=None):
+    results, spread = collections.OrderedDict(), collections.OrderedDict()
+    for name in names or SCENARIOS:
+        started = time.perf_counter()
+        results[name], spread[name] = best([SCENARIOS[name](quick) for _ in range(repeat)])
+        if out is not None:
+            out.write('%-22s done in %5.1f s\n' % (name, time.perf_counter() - started))
+    return dict(environment(), quick=quick, repeat=repeat, results=results, spread=spread)
+
+
+def compare(baseline, current):
+    rows = []
+    for name, metrics in current['results'].items():
+        for metric, value in metrics.items():
+            before = baseline['results'].get(name, {}).get(metric)
+            if not before or metric == 'speedup':
+                continue
+            ratio = value / before
+            improved = ratio > 1 if metric.endswith(RATE_SUFFIXES) else ratio < 1
+            noise = max(baseline.get('spread', {}).get(name, {}).get(metric, 0),
+                        current.get('spread', {}).get(name, {}).get(metric, 0))
+            rows.append((name, metric, before, value, ratio, improved, noise))
+    return rows
+
+
+def report(results, out):
+    out.write('voucherify %(version)s (%(commit)s) on Python %(python)s\n' % results)
+    for name, metrics in results['results'].items():
+        for metric, value in metrics.items():
+            out.write('%-22s %-36s %14.3f\n' % (name, metric, value))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the SDK benchmark suite against a local API stub.')
+    parser.add_argument('scenarios', nargs='*', metavar='scenario',
+                        help='scenarios to run (default: all of %s)' % ', '.join(SCENARIOS))
+    parser.add_argument('--quick', action='store_true', help='smaller inputs, for smoke runs')
+    parser.add_argument('--repeat', type=int, default=MIN_REPEAT,
+                        help='runs of each scenario, keeping the best (default: %d)' % MIN_REPEAT)
+    parser.add_argument('--output', help='save the results as JSON to this file')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare with')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='relative change reported as a regression (default: 0.1)')
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error('unknown scenarios: %s' % ', '.join(unknown))
+
+    results = run(args.scenarios or None, quick=args.quick, repeat=args.repeat, out=sys.stderr)
+    report(results, sys.stdout)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        sys.stdout.write('\ncompared with %s (%s)\n' % (baseline.get('commit'), baseline.get('timestamp')))
+        flag = min(baseline.get('repeat', 1), results['repeat']) >= MIN_REPEAT
+        if not flag:
+            sys.stdout.write('not reporting regressions: both runs need --repeat %d or more\n' % MIN_REPEAT)
+        regressions = 0
+        for name, metric, before, value, ratio, improved, noise in compare(baseline, results):
+            # A change within the spread between repeats of either run is noise, not a regression.
+            regression = flag and not improved and abs(ratio - 1) > args.threshold + noise
+            regressions += regression
+            sys.stdout.write('%-22s %-36s %12.3f -> %12.3f  %+6.1f%%%s\n' % (
+                name, metric, before, value, 100 * (ratio - 1), '  REGRESSION' if regression else ''))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -42,6 +42,17 @@ setup(
         'Programming Language :: Python :: Implementation :: PyPy',
         'Topic :: Software Development :: Libraries :: Python Modules'
     ],
-    install_requires=['requests>=1.0.0', 'six>=1.0.0'],
+    install_requires=['requests>=1.0.0', 'six>=1.0.0', 'futures>=3.0; python_version < "3"'],
+    extras_require={
+        'async': ['aiohttp>=3.0'],
+        'fast-json': ['orjson>=3.0'],
+        'tracing': ['opentelemetry-api>=1.0']
+    },
+    entry_points={
+        'console_scripts': [
+            'voucherify-export=voucherify.export:main',
+            'voucherify-stub=voucherify.stub:main'
+        ]
+    },
     keywords=['voucherify', 'rest', 'sdk']
 )
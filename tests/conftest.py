@@ -0,0 +1,39 @@
+import threading
+
+import pytest
+
+from voucherify import Client as voucherifyClient
+
+
+class StubHandler(object):
+    def __init__(self, respond, state):
+        self.respond = respond
+        self.state = state
+        self._lock = threading.Lock()
+
+    def __call__(self, method, path, query, body):
+        with self._lock:
+            return self.respond(self.state, method, path, query, body)
+
+
+@pytest.fixture
+def createClient():
+    def create(stub, **kwargs):
+        return voucherifyClient('stub-app-id', 'stub-secret-key', api_endpoint=stub.url, **kwargs)
+    return create
+
+
+@pytest.fixture
+def createAsyncClient():
+    from voucherify import AsyncClient
+
+    def create(stub, **kwargs):
+        return AsyncClient('stub-app-id', 'stub-secret-key', api_endpoint=stub.url, **kwargs)
+    return create
+
+
+@pytest.fixture
+def stubHandler():
+    # Builds a StubServer handler from respond(state, method, path, query, body); the state is exposed as
+    # handler.state and the calls are serialized, so respond can update it without its own lock.
+    return StubHandler
@@ -0,0 +1,95 @@
+import fnmatch
+import threading
+import time
+
+try:
+    from socketserver import StreamRequestHandler, ThreadingMixIn, TCPServer
+except ImportError:
+    from SocketServer import StreamRequestHandler, ThreadingMixIn, TCPServer
+
+
+class _ThreadingTCPServer(ThreadingMixIn, TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _RedisRequestHandler(StreamRequestHandler):
+    def handle(self):
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            count = int(line[1:-2])
+            args = []
+            for _ in range(count):
+                length = int(self.rfile.readline()[1:-2])
+                args.append(self.rfile.read(length + 2)[:-2])
+            self.wfile.write(self.server.stub.execute(args))
+
+
+def _bulk(value):
+    if value is None:
+        return b'$-1\r\n'
+    return b'$' + str(len(value)).encode() + b'\r\n' + value + b'\r\n'
+
+
+class RedisStub(object):
+    def __init__(self, host='127.0.0.1', port=0):
+        self.data = {}
+        self.commands = []
+        self._lock = threading.Lock()
+        self._server = _ThreadingTCPServer((host, port), _RedisRequestHandler)
+        self._server.stub = self
+        self._thread = None
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def execute(self, args):
+        name = args[0].decode().upper()
+        with self._lock:
+            self.commands.append(name)
+            now = time.time()
+            for key in [key for key, (_, expires) in self.data.items() if expires is not None and expires <= now]:
+                del self.data[key]
+            if name == 'PING':
+                return b'+PONG\r\n'
+            if name in ('AUTH', 'SELECT'):
+                return b'+OK\r\n'
+            if name == 'GET':
+                entry = self.data.get(args[1])
+                return _bulk(entry[0] if entry is not None else None)
+            if name == 'SET':
+                expires = None
+                if len(args) > 3 and args[3].upper() == b'PX':
+                    expires = now + int(args[4]) / 1000.0
+                self.data[args[1]] = (args[2], expires)
+                return b'+OK\r\n'
+            if name == 'DEL':
+                removed = sum(1 for key in args[1:] if self.data.pop(key, None) is not None)
+                return b':' + str(removed).encode() + b'\r\n'
+            if name == 'SCAN':
+                pattern = args[args.index(b'MATCH') + 1].decode() if b'MATCH' in args else '*'
+                keys = [key for key in self.data if fnmatch.fnmatchcase(key.decode(), pattern)]
+                return b'*2\r\n' + _bulk(b'0') + b'*' + str(len(keys)).encode() + b'\r\n' + b''.join(
+                    _bulk(key) for key in keys)
+            return b'-ERR unknown command\r\n'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,186 @@
+import asyncio
+import json
+
+from aiohttp import web
+
+from voucherify import VoucherifyError
+from voucherify.hooks import MetricsCollector
+
+
+class AsyncStubServer(object):
+    def __init__(self, latency=0, records_key=None):
+        self.latency = latency
+        self.records_key = records_key
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._runner = None
+        self.url = None
+
+    async def handle(self, request):
+        body = await request.text()
+        self.requests.append((request.method, request.path, dict(request.query), body,
+                              request.headers.get('Idempotency-Key')))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+        if request.path.endswith('/missing'):
+            return web.json_response({'code': 404, 'message': 'Resource not found'}, status=404)
+        if self.records_key:
+            query = dict(request.query)
+            return web.json_response({self.records_key: [query] * int(query['limit'])})
+        return web.json_response({
+            'method': request.method,
+            'path': request.path,
+            'query': dict(request.query),
+            'body': json.loads(body) if body else None
+        })
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_route('*', '/{tail:.*}', self.handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.url = 'http://127.0.0.1:%d' % port
+        return self
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+
+def runWithStub(scenario, **stub_kwargs):
+    async def run():
+        stub = await AsyncStubServer(**stub_kwargs).start()
+        try:
+            return await scenario(stub)
+        finally:
+            await stub.stop()
+    return asyncio.run(run())
+
+
+def test_shouldAwaitResourceMethods(createAsyncClient):
+    async def scenario(stub):
+        async with createAsyncClient(stub) as client:
+            voucher = await client.vouchers.get('CODE1')
+            validation = await client.validations.validateVoucher('CODE1', {'order': {'amount': 1000}})
+            redemption = await client.redemptions.redeem('CODE1', tracking_id='track_1')
+            rules = await client.validation_rules.list({'limit': 5})
+        assert voucher['path'] == '/v1/vouchers/CODE1'
+        assert validation['method'] == 'POST'
+        assert validation['body'] == {'order': {'amount': 1000}}
+        assert redemption['query'] == {'tracking_id': 'track_1'}
+        assert rules['query'] == {'limit': '5'}
+        assert stub.requests[0][0] == 'GET'
+    runWithStub(scenario)
+
+
+def test_shouldShareOnePoolAcrossResources(createAsyncClient):
+    async def scenario(stub):
+        async with createAsyncClient(stub) as client:
+            assert client.orders.session is client.session
+            assert client.products.session is client.session
+    runWithStub(scenario)
+
+
+def test_shouldReturnErrorBodyOrRaiseInStrictMode(createAsyncClient):
+    async def scenario(stub):
+        async with createAsyncClient(stub) as client:
+            body = await client.customers.get('missing')
+            assert body == {'code': 404, 'message': 'Resource not found'}
+            try:
+                await client.customers.get('missing', strict=True)
+                assert False
+            except VoucherifyError as e:
+                assert e.code == 404
+    runWithStub(scenario)
+
+
+def test_shouldBoundConcurrency(createAsyncClient):
+    async def scenario(stub):
+        async with createAsyncClient(stub, max_concurrency=3) as client:
+            results = await asyncio.gather(*[client.products.get('prod_%d' % i) for i in range(12)])
+        assert len(results) == 12
+        assert stub.max_in_flight == 3
+    runWithStub(scenario, latency=0.02)
+
+
+def test_shouldIterateAcrossPages(createAsyncClient):
+    async def scenario(stub):
+        async with createAsyncClient(stub) as client:
+            queries = []
+            async for record in client.vouchers.iter_list({'limit': 2}):
+                queries.append(record)
+                if len(queries) == 4:
+                    break
+        assert [query['page'] for query in queries] == ['1', '1', '2', '2']
+    runWithStub(scenario, records_key='vouchers')
+
+
+def test_shouldValidateManyConcurrently(createAsyncClient):
+    async def scenario(stub):
+        async with createAsyncClient(stub) as client:
+            codes = ['CODE%d' % i for i in range(6)]
+            results = await client.validations.validate_many(codes, {'order': {'amount': 1000}}, max_concurrency=6)
+            assert [result['path'] for result in results] == ['/v1/vouchers/%s/validate' % code for code in codes]
+            assert stub.max_in_flight == 6
+            results = await client.validations.validate_many(codes, {}, deadline=0.05)
+            assert [result['error']['key'] for result in results] == ['deadline_exceeded'] * 6
+    runWithStub(scenario, latency=0.2)
+
+
+def test_shouldCreateManyVouchersConcurrently(createAsyncClient):
+    def vouchers():
+        for i in range(5):
+            yield {'code': 'CODE%d' % i}
+        yield {'code': 'missing'}
+
+    async def scenario(stub):
+        async with createAsyncClient(stub) as client:
+            results = [result async for result in client.vouchers.create_many(vouchers(), workers=3, window=4)]
+        assert [result['code'] for result in results] == ['CODE%d' % i for i in range(5)] + ['missing']
+        assert [result['status'] for result in results] == ['created'] * 5 + ['failed']
+        assert results[-1]['error'] == {'code': 404, 'message': 'Resource not found'}
+        assert stub.max_in_flight == 3
+    runWithStub(scenario, latency=0.05)
+
+
+def test_shouldNotCreateVoucherTwiceWhenTimingOut(createAsyncClient):
+    async def scenario(stub):
+        async with createAsyncClient(stub, timeout=0.1) as client:
+            results = [result async for result in client.vouchers.create_many([{'code': 'SLOW'}], retry_delay=0)]
+        assert results[0]['status'] == 'failed'
+        keys = [request[4] for request in stub.requests]
+        assert len(keys) == 4 and len(set(keys)) == 1
+    runWithStub(scenario, latency=0.2)
+
+
+def test_shouldCoalesceConcurrentIdenticalGets(createAsyncClient):
+    async def scenario(stub):
+        async with createAsyncClient(stub, single_flight=True) as client:
+            results = await asyncio.gather(*(
+                [client.vouchers.get('HOT') for _ in range(10)] + [client.vouchers.get('COLD') for _ in range(5)]
+            ))
+        assert [result['path'] for result in results] == ['/v1/vouchers/HOT'] * 10 + ['/v1/vouchers/COLD'] * 5
+        assert len(stub.requests) == 2
+        assert client.single_flight.stats() == {'calls': 2, 'shared': 13, 'in_flight': 0}
+    runWithStub(scenario, latency=0.05)
+
+
+def test_shouldCallHooksAroundRequests(createAsyncClient):
+    metrics = MetricsCollector()
+
+    async def scenario(stub):
+        async with createAsyncClient(stub, hooks=[metrics]) as client:
+            await client.vouchers.get('CODE1')
+            await client.customers.get('missing')
+        snapshot = metrics.snapshot()
+        assert snapshot['GET /vouchers/{id}']['count'] == 1
+        assert snapshot['GET /customers/{id}']['errors'] == {'404': 1}
+    runWithStub(scenario)
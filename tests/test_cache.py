@@ -0,0 +1,185 @@
+import multiprocessing
+
+from voucherify import VoucherifyError
+from voucherify.cache import ResponseCache, MmapCache, RedisCache
+from voucherify.stub import StubServer
+from tests.redis_stub import RedisStub
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def catalogHandler(method, path, query, body):
+    if path.endswith('/MISSING'):
+        return 404, {'code': 404, 'message': 'Resource not found'}
+    return 200, {'path': path, 'body': body}
+
+
+def gets(stub):
+    return [request['path'] for request in stub.requests if request['method'] == 'GET']
+
+
+def test_shouldServeRepeatedLookupsFromCache(createClient):
+    cache = ResponseCache(ttl={'vouchers': 60, 'products': 60})
+    with StubServer(catalogHandler) as stub:
+        with createClient(stub, cache=cache) as client:
+            first = client.vouchers.get('CODE1')
+            second = client.vouchers.get('CODE1')
+            client.products.get('prod_1')
+            client.products.get('prod_1')
+        assert first == second
+        assert gets(stub) == ['/v1/vouchers/CODE1', '/v1/products/prod_1']
+    assert cache.stats() == {'hits': 2, 'misses': 2, 'evictions': 0, 'entries': 2, 'bytes': 0}
+
+
+def test_shouldInvalidateOnMutatingCalls(createClient):
+    with StubServer(catalogHandler) as stub:
+        with createClient(stub, cache=ResponseCache()) as client:
+            client.vouchers.get('CODE1')
+            client.vouchers.disable('CODE1')
+            client.vouchers.get('CODE1')
+            client.validation_rules.get('val_1')
+            client.validation_rules.assign('val_1', {'voucher': 'CODE1'})
+            client.validation_rules.get('val_1')
+            client.validation_rules.get('val_1')
+        assert gets(stub) == ['/v1/vouchers/CODE1', '/v1/vouchers/CODE1', '/v1/validation-rules/val_1',
+                              '/v1/validation-rules/val_1']
+
+
+def test_shouldCacheNotFoundResponses(createClient):
+    with StubServer(catalogHandler) as stub:
+        with createClient(stub, cache=ResponseCache(negative_ttl=5)) as client:
+            assert client.vouchers.get('MISSING')['code'] == 404
+            try:
+                client.vouchers.get('MISSING', strict=True)
+                assert False
+            except VoucherifyError as e:
+                assert e.code == 404
+        assert gets(stub) == ['/v1/vouchers/MISSING']
+
+
+def test_shouldExpireEntriesAfterTtl():
+    clock = FakeClock()
+    cache = ResponseCache(ttl=10, clock=clock)
+    cache.set('vouchers', 'CODE1', {'code': 'CODE1'})
+    assert cache.get('vouchers', 'CODE1') == ({'code': 'CODE1'}, False)
+    clock.now += 10
+    assert cache.get('vouchers', 'CODE1') is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_shouldEvictLeastRecentlyUsedEntries():
+    cache = ResponseCache(max_entries=2)
+    cache.set('vouchers', 'A', {'code': 'A'})
+    cache.set('vouchers', 'B', {'code': 'B'})
+    cache.get('vouchers', 'A')
+    cache.set('vouchers', 'C', {'code': 'C'})
+    assert cache.get('vouchers', 'B') is None
+    assert cache.get('vouchers', 'A') is not None
+    assert cache.evictions == 1
+
+    cache = ResponseCache(max_bytes=50)
+    cache.set('products', 'p1', {'name': 'x' * 10})
+    cache.set('products', 'p2', {'name': 'y' * 10})
+    cache.set('products', 'p3', {'name': 'z' * 10})
+    assert cache.stats()['entries'] == 2
+    assert cache.stats()['bytes'] <= 50
+    assert cache.get('products', 'p1') is None
+
+
+def test_shouldShareMmapCacheBetweenInstances(tmpdir):
+    path = str(tmpdir.join('cache.bin'))
+    first = MmapCache(path, slots=64, ttl={'vouchers': 30}, negative_ttl=5)
+    second = MmapCache(path, slots=64)
+    first.set('vouchers', 'CODE1', {'code': 'CODE1', 'metadata': {'n': 1}})
+    first.set('vouchers', 'MISSING', {'code': 404}, negative=True)
+    assert second.get('vouchers', 'CODE1') == ({'code': 'CODE1', 'metadata': {'n': 1}}, False)
+    assert second.get('vouchers', 'MISSING') == ({'code': 404}, True)
+    second.invalidate('vouchers', 'CODE1')
+    assert first.get('vouchers', 'CODE1') is None
+    assert first.stats() == {'hits': 0, 'misses': 1, 'evictions': 0, 'entries': 1}
+    first.clear()
+    assert second.get('vouchers', 'MISSING') is None
+
+
+def test_shouldExpireAndEvictMmapEntries(tmpdir):
+    clock = FakeClock()
+    cache = MmapCache(str(tmpdir.join('cache.bin')), slots=2, ways=2, slot_size=256, ttl=10, compress_over=None,
+                      clock=clock)
+    cache.set('products', 'p1', {'id': 'p1'})
+    clock.now += 1
+    cache.set('products', 'p2', {'id': 'p2'})
+    cache.set('products', 'p3', {'id': 'p3'})
+    assert cache.get('products', 'p1') is None
+    assert cache.get('products', 'p3') == ({'id': 'p3'}, False)
+    assert cache.evictions == 1
+    cache.set('products', 'big', {'name': 'x' * 1000})
+    assert cache.get('products', 'big') is None
+    clock.now += 10
+    assert cache.get('products', 'p3') is None
+
+    compressed = MmapCache(str(tmpdir.join('compressed.bin')), slots=4, slot_size=256, compress_over=64)
+    compressed.set('products', 'big', {'name': 'x' * 1000})
+    assert compressed.get('products', 'big') == ({'name': 'x' * 1000}, False)
+
+
+def test_shouldServeOtherProcessesFromMmapCache(tmpdir, createClient):
+    path = str(tmpdir.join('cache.bin'))
+    cache = MmapCache(path, slots=64)
+    process = multiprocessing.get_context('fork').Process(
+        target=lambda: cache.set('vouchers', 'CODE1', {'code': 'CODE1'}))
+    process.start()
+    process.join()
+    assert process.exitcode == 0
+    with StubServer(catalogHandler) as stub:
+        with createClient(stub, cache=cache) as client:
+            assert client.vouchers.get('CODE1') == {'code': 'CODE1'}
+            client.vouchers.get('CODE2')
+        with createClient(stub, cache=MmapCache(path, slots=64)) as client:
+            assert client.vouchers.get('CODE2')['path'] == '/v1/vouchers/CODE2'
+        assert gets(stub) == ['/v1/vouchers/CODE2']
+
+
+def test_shouldCacheInRedis(createClient):
+    with RedisStub() as redis:
+        cache = RedisCache(port=redis.port, prefix='test:', ttl=30, compress_over=64)
+        with StubServer(catalogHandler) as stub:
+            with createClient(stub, cache=cache) as client:
+                client.vouchers.get('CODE1')
+                client.vouchers.get('CODE1')
+                client.vouchers.update({'code': 'CODE1', 'metadata': {'big': 'x' * 200}})
+                client.products.get('prod_1')
+            assert gets(stub) == ['/v1/vouchers/CODE1', '/v1/products/prod_1']
+        assert sorted(redis.data) == [b'test:products:prod_1']
+        cache.set('vouchers', 'BIG', {'name': 'x' * 1000})
+        assert cache.get('vouchers', 'BIG') == ({'name': 'x' * 1000}, False)
+        cache.clear()
+        assert redis.data == {}
+        assert cache.stats() == {'hits': 2, 'misses': 2, 'evictions': 0, 'errors': 0}
+        cache.close()
+
+
+def test_shouldTreatRedisFailuresAsMisses():
+    class CountingRedisCache(RedisCache):
+        connects = 0
+
+        def _connect(self):
+            self.connects += 1
+            super(CountingRedisCache, self)._connect()
+
+    with RedisStub() as redis:
+        port = redis.port
+    now = [0.0]
+    cache = CountingRedisCache(port=port, socket_timeout=0.2, retry_backoff=5, clock=lambda: now[0])
+    cache.set('vouchers', 'CODE1', {'code': 'CODE1'})
+    assert cache.get('vouchers', 'CODE1') is None
+    assert cache.stats()['errors'] == 2
+    assert cache.connects == 1
+    now[0] += 5
+    assert cache.get('vouchers', 'CODE1') is None
+    assert cache.connects == 2
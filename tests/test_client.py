@@ -0,0 +1,250 @@
+import subprocess
+import sys
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from voucherify import Client as voucherifyClient
+from voucherify.stub import StubServer
+
+
+def test_shouldShareOneSessionAcrossResources(createClient):
+    with StubServer() as stub:
+        with createClient(stub) as client:
+            resources = [
+                client.customers, client.vouchers, client.redemptions, client.validations,
+                client.distributions, client.orders, client.products, client.validation_rules
+            ]
+            for resource in resources:
+                assert resource.session is client.session
+
+
+def test_shouldImportWithoutHttpStack():
+    modules = '{"requests", "numpy", "aiohttp", "orjson", "ujson", "opentelemetry"}'
+    script = 'import sys, voucherify; print(sorted(set(sys.modules) & %s))' % modules
+    assert subprocess.check_output([sys.executable, '-c', script]).strip() == b'[]'
+
+
+def test_shouldCreateResourcesAndSessionOnFirstUse(createClient):
+    with StubServer() as stub:
+        with createClient(stub) as client:
+            assert 'vouchers' not in client.__dict__
+            assert client._config._session is None
+            assert client.vouchers is client.vouchers
+            assert client.vouchers._config is client._config
+            client.vouchers.get('CODE1')
+            assert client._config._session is not None
+        assert client._config._session is None
+
+
+def test_shouldApplySettingsToClientAndResources():
+    client = voucherifyClient('app-id', 'secret-key')
+    client.strict = True
+    client.timeout = 30
+    assert client.vouchers.strict is True
+    assert client.vouchers.timeout == 30
+    client.vouchers.timeout = 3
+    assert client.timeout == 3
+    assert client.orders.timeout == 3
+
+
+def test_shouldReuseConnectionBetweenCalls(createClient):
+    with StubServer() as stub:
+        with createClient(stub) as client:
+            client.vouchers.get('CODE1')
+            client.products.get('prod_1')
+            result = client.redemptions.list({'limit': 1})
+        assert result['path'] == '/v1/redemptions/'
+        assert len(stub.requests) == 3
+        assert stub.connections == 1
+
+
+def test_shouldOpenNewConnectionsWithoutKeepAlive(createClient):
+    with StubServer() as stub:
+        with createClient(stub, keep_alive=False) as client:
+            client.vouchers.get('CODE1')
+            client.vouchers.get('CODE2')
+        assert stub.connections == 2
+
+
+def test_shouldNotCloseExternalSession(createClient):
+    with StubServer() as stub:
+        owner = createClient(stub)
+        with createClient(stub, session=owner.session) as client:
+            client.vouchers.get('CODE1')
+        owner.vouchers.get('CODE2')
+        owner.close()
+        assert stub.connections == 1
+
+
+def pagingHandler(total, key):
+    def handler(method, path, query, body):
+        limit = int(query.get('limit'))
+        page = int(query.get('page'))
+        start = (page - 1) * limit
+        records = [{'id': 'r_%d' % i} for i in range(start, min(start + limit, total))]
+        return 200, {key: records}
+    return handler
+
+
+def test_shouldIterateAcrossPages(createClient):
+    with StubServer(pagingHandler(250, 'redemptions')) as stub:
+        with createClient(stub) as client:
+            ids = [record['id'] for record in client.redemptions.iter_list({'limit': 100})]
+        assert ids == ['r_%d' % i for i in range(250)]
+        assert [request['query']['page'] for request in stub.requests] == ['1', '2', '3']
+
+
+def test_shouldStopIteratingWithoutFetchingMorePages(createClient):
+    with StubServer(pagingHandler(1000, 'data')) as stub:
+        with createClient(stub) as client:
+            records = client.validation_rules.iter_list({'limit': 10}, prefetch=False)
+            first = [next(records) for _ in range(5)]
+            records.close()
+        assert first[-1] == {'id': 'r_4'}
+        assert len(stub.requests) == 1
+
+
+def test_shouldCreateManyVouchersWithPerItemResults(createClient):
+    attempts = {}
+
+    def handler(method, path, query, body):
+        code = body['code']
+        attempts[code] = attempts.get(code, 0) + 1
+        if code == 'FLAKY' and attempts[code] == 1:
+            return 503, {'code': 503, 'message': 'Service Unavailable'}
+        if code == 'TAKEN':
+            return 409, {'code': 409, 'message': 'Duplicate resource key'}
+        return 200, body
+
+    def vouchers():
+        for code in ('A', 'FLAKY', 'TAKEN', 'B'):
+            yield {'code': code, 'discount': {'type': 'AMOUNT', 'amount_off': 100}}
+
+    with StubServer(handler) as stub:
+        with createClient(stub) as client:
+            results = list(client.vouchers.create_many(vouchers(), workers=2, retry_delay=0))
+    assert [result['code'] for result in results] == ['A', 'FLAKY', 'TAKEN', 'B']
+    assert [result['status'] for result in results] == ['created', 'created', 'failed', 'created']
+    assert results[2]['error']['code'] == 409
+    assert attempts == {'A': 1, 'FLAKY': 2, 'TAKEN': 1, 'B': 1}
+
+
+def test_shouldNotCreateVoucherTwiceWhenResponseIsLost(createClient):
+    created = []
+
+    def handler(method, path, query, body):
+        if body['code'] in created:
+            return 409, {'code': 409, 'message': 'Duplicated voucher code'}
+        created.append(body['code'])
+        if len(created) == 1:
+            time.sleep(0.5)
+        return 200, body
+
+    with StubServer(handler) as stub:
+        with createClient(stub, timeout=0.2) as client:
+            results = list(client.vouchers.create_many([{'code': 'SLOW'}, {'code': 'FAST'}], retry_delay=0))
+        keys = [request['headers']['Idempotency-Key'] for request in stub.requests]
+    assert [result['status'] for result in results] == ['created', 'created']
+    assert len(keys) == 3 and len(set(keys)) == 2
+
+
+def test_shouldReportNonJsonErrorBodiesAsFailedItems(createClient):
+    def handler(method, path, query, body):
+        if body['code'] == 'DOWN':
+            return 503, None
+        return 200, body
+
+    with StubServer(handler) as stub:
+        with createClient(stub) as client:
+            results = list(client.vouchers.create_many([{'code': 'A'}, {'code': 'DOWN'}], retries=1, retry_delay=0))
+    assert [result['status'] for result in results] == ['created', 'failed']
+    assert results[1]['error'] == {'code': 503, 'message': ''}
+
+
+def validationHandler(discounts, slow=()):
+    def handler(method, path, query, body):
+        code = path.split('/')[3]
+        if code in slow:
+            time.sleep(0.5)
+        if code not in discounts:
+            return 404, {'code': 404, 'key': 'not_found', 'message': 'Resource not found'}
+        return 200, {'valid': True, 'code': code, 'discount': discounts[code]}
+    return handler
+
+
+def test_shouldValidateManyConcurrentlyInInputOrder(createClient):
+    discounts = dict(('CODE%d' % i, {'type': 'AMOUNT', 'amount_off': 100 * i}) for i in range(8))
+    codes = ['CODE%d' % i for i in reversed(range(8))] + ['MISSING']
+    with StubServer(validationHandler(discounts), latency=0.1) as stub:
+        with createClient(stub) as client:
+            started = time.time()
+            results = client.validations.validate_many(codes, {'order': {'amount': 1000}}, max_concurrency=9)
+            elapsed = time.time() - started
+    assert [result['code'] for result in results[:-1]] == codes[:-1]
+    assert results[-1]['key'] == 'not_found'
+    assert elapsed < 0.5
+
+
+def test_shouldMarkValidationsUnfinishedAtDeadline(createClient):
+    discounts = {'FAST': {'type': 'AMOUNT', 'amount_off': 100}, 'SLOW': {'type': 'AMOUNT', 'amount_off': 500}}
+    with StubServer(validationHandler(discounts, slow=('SLOW',))) as stub:
+        with createClient(stub) as client:
+            results = client.validations.validate_many(['SLOW', 'FAST'], {}, deadline=0.2)
+    assert results[0]['valid'] is False and results[0]['error']['key'] == 'deadline_exceeded'
+    assert results[1]['valid'] is True
+
+
+def test_shouldPickBestValidation(createClient):
+    discounts = {
+        'AMOUNT': {'type': 'AMOUNT', 'amount_off': 1500},
+        'PERCENT': {'type': 'PERCENT', 'percent_off': 20},
+        'BIG': {'type': 'AMOUNT', 'amount_off': 9000}
+    }
+    with StubServer(validationHandler(discounts)) as stub:
+        with createClient(stub) as client:
+            best = client.validations.validate_best(['AMOUNT', 'PERCENT', 'MISSING'], {'order': {'amount': 10000}})
+            assert best['code'] == 'PERCENT'
+            best = client.validations.validate_best(['AMOUNT', 'BIG'], {'order': {'amount': 5000}})
+            assert best['code'] == 'BIG'
+            assert client.validations.validate_best(['MISSING'], {}) is None
+
+
+def test_shouldCoalesceConcurrentIdenticalGets(createClient):
+    def handler(method, path, query, body):
+        if path.endswith('/MISSING'):
+            return 404, {'code': 404, 'message': 'Resource not found'}
+        return 200, {'path': path, 'query': query}
+
+    with StubServer(handler, latency=0.2) as stub:
+        with createClient(stub, single_flight=True, pool_maxsize=20) as client:
+            barrier = threading.Barrier(20)
+
+            def get(index):
+                barrier.wait()
+                if index % 4 == 0:
+                    return client.vouchers.get('MISSING')
+                if index % 4 == 1:
+                    return client.redemptions.list({'limit': 10, 'page': 2})
+                return client.vouchers.get('HOT')
+
+            executor = ThreadPoolExecutor(max_workers=20)
+            results = list(executor.map(get, range(20)))
+            executor.shutdown()
+
+        assert results[0] == {'code': 404, 'message': 'Resource not found'}
+        assert results[1] == {'path': '/v1/redemptions/', 'query': {'limit': '10', 'page': '2'}}
+        assert results[2] == results[3] == {'path': '/v1/vouchers/HOT', 'query': {}}
+        assert results[2] is not results[3]
+        assert len(stub.requests) == 3
+        assert client.single_flight.stats() == {'calls': 3, 'shared': 17, 'in_flight': 0}
+
+
+def test_shouldNotCoalesceWrites(createClient):
+    with StubServer(latency=0.1) as stub:
+        with createClient(stub, single_flight=True) as client:
+            executor = ThreadPoolExecutor(max_workers=4)
+            list(executor.map(lambda _: client.vouchers.enable('CODE1'), range(4)))
+            executor.shutdown()
+        assert len(stub.requests) == 4
@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+from voucherify.codec import JsonCodec, get_codec
+from voucherify.stub import StubServer
+
+payload = {
+    "object": "list",
+    "redemptions": [{"id": "r_1", "voucher": {"code": "A", "tags": ["x", "]"]}}, {"id": "r_2"}, {"id": "r_é"}],
+    "total": 3
+}
+
+
+def test_shouldEncodeToBytesAndDecode():
+    for name in ('json', 'auto'):
+        codec = get_codec(name)
+        data = codec.encode(payload)
+        assert isinstance(data, bytes)
+        assert codec.decode(data) == payload
+        assert json.loads(data.decode('utf-8')) == payload
+
+
+def test_shouldFallBackToStdlibWhenRequestedCodecIsMissing():
+    assert type(get_codec('json')) is JsonCodec
+    try:
+        import orjson
+    except ImportError:
+        assert get_codec('auto').name != 'orjson'
+        with pytest.raises(ImportError):
+            get_codec('orjson')
+    else:
+        assert get_codec('auto').name == 'orjson'
+    with pytest.raises(ValueError):
+        get_codec('pickle')
+
+
+def test_shouldIterateArrayItemsIncrementally():
+    codec = JsonCodec()
+    data = json.dumps(payload, indent=2).encode('utf-8')
+    items = codec.iter_array(data, 'redemptions')
+    assert next(items) == payload['redemptions'][0]
+    assert list(items) == payload['redemptions'][1:]
+    assert list(codec.iter_array(b'{"total": 0, "redemptions" : [ ]}', 'redemptions')) == []
+    assert list(codec.iter_array(b'{"data": {"redemptions": [1]}}', 'redemptions')) == []
+    assert list(get_codec('auto').iter_array(data, 'redemptions')) == payload['redemptions']
+
+
+def test_shouldDecodeListPagesIncrementallyWithoutPrefetch(createClient):
+    class StreamingCodec(JsonCodec):
+        def decode(self, data):
+            raise AssertionError('List pages should not be decoded as a whole.')
+
+    def handler(method, path, query, body):
+        page = int(query['page'])
+        return 200, {'object': 'list', 'redemptions': [{'id': 'r_%d' % i} for i in range(min(3, 7 - 3 * (page - 1)))]}
+
+    with StubServer(handler) as stub:
+        with createClient(stub, codec=StreamingCodec()) as client:
+            records = list(client.redemptions.iter_list({'limit': 3}, prefetch=False))
+    assert [record['id'] for record in records] == ['r_0', 'r_1', 'r_2', 'r_0', 'r_1', 'r_2', 'r_0']
+    assert [request['query']['page'] for request in stub.requests] == ['1', '2', '3']
+
+
+def test_shouldUseConfiguredCodecForRequests(createClient):
+    with StubServer(lambda method, path, query, body: (200, body)) as stub:
+        with createClient(stub, codec='auto') as client:
+            result = client.customers.create({'source_id': 'customer_1', 'name': 'Zoë'})
+            raw = client.customers.create({'source_id': 'customer_2'}, decode=False)
+    assert result == {'source_id': 'customer_1', 'name': 'Zoë'}
+    assert json.loads(raw.decode('utf-8')) == {'source_id': 'customer_2'}
@@ -0,0 +1,86 @@
+import io
+import json
+import time
+
+import pytest
+
+from voucherify.distribution import DistributionLog, distribute
+from voucherify.stub import StubServer
+
+
+@pytest.fixture
+def publishHandler(stubHandler):
+    def respond(published, method, path, query, body):
+        customer = body['customer']['source_id']
+        if customer == 'blocked':
+            return 400, {'code': 400, 'key': 'customer_blocked', 'message': 'Customer is blocked'}
+        published.setdefault((body['campaign'], customer), 0)
+        published[(body['campaign'], customer)] += 1
+        return 200, {'voucher': {'code': '%s-%s' % (body['campaign'], customer)}}
+    return stubHandler(respond, {})
+
+
+def pairs(count, campaign='Summer'):
+    return [('customer-%d' % i, campaign) for i in range(count)]
+
+
+def test_shouldPublishConcurrentlyAndStreamCodes(tmpdir, createClient, publishHandler):
+    with StubServer(publishHandler, latency=0.02) as stub:
+        client = createClient(stub)
+        output = io.StringIO()
+        started = time.time()
+        with DistributionLog(str(tmpdir.join('log.db'))) as log:
+            report = distribute(client, pairs(40) + [('blocked', 'Summer')], log, output=output, workers=8)
+            assert log.stats() == {'done': 40, 'failed': 1}
+            assert len(log.codes('Summer')) == 40
+        elapsed = time.time() - started
+        client.close()
+    assert elapsed < 40 * 0.02 / 2
+    assert report['published'] == 40
+    assert report['failed'] == 1
+    assert report['errors'][0][:2] == ('Summer', 'blocked')
+    lines = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert lines[0] == {'campaign': 'Summer', 'customer': 'customer-0', 'code': 'Summer-customer-0'}
+    assert len(lines) == 40
+    keys = set(request['headers']['Idempotency-Key'] for request in stub.requests)
+    assert len(keys) == 41
+
+
+def test_shouldReportCustomersWithoutKeyAsFailed(tmpdir, createClient, publishHandler):
+    with StubServer(publishHandler) as stub:
+        client = createClient(stub)
+        with DistributionLog(str(tmpdir.join('log.db'))) as log:
+            report = distribute(client, [({'name': 'Anonymous'}, 'Summer'), ({'source_id': 'cust_1'}, 'Summer')], log)
+            assert log.stats() == {'done': 1, 'failed': 0}
+        client.close()
+    assert (report['published'], report['failed']) == (1, 1)
+    assert report['errors'][0][:2] == ('Summer', None)
+    assert report['errors'][0][2]['key'] == 'missing_key'
+
+
+def test_shouldResumeFromCheckpoint(tmpdir, createClient, publishHandler):
+
+    def interrupted():
+        for pair in pairs(30)[:12]:
+            yield pair
+        raise KeyboardInterrupt()
+
+    with StubServer(publishHandler) as stub:
+        client = createClient(stub)
+        path = str(tmpdir.join('log.db'))
+        with DistributionLog(path) as log:
+            try:
+                distribute(client, interrupted(), log, workers=4)
+            except KeyboardInterrupt:
+                pass
+            first = log.stats()['done']
+        assert 0 < first <= 12
+
+        with DistributionLog(path) as log:
+            report = distribute(client, pairs(30), log, workers=4)
+            assert log.stats()['done'] == 30
+        client.close()
+    assert report['skipped'] == first
+    assert report['published'] == 30 - first
+    assert sorted(customer for _, customer in publishHandler.state) == sorted(c for c, _ in pairs(30))
+    assert all(count <= 2 for count in publishHandler.state.values())
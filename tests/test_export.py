@@ -0,0 +1,92 @@
+import csv
+import gzip
+import io
+import json
+import os
+
+from voucherify.export import export, export_many, main
+from voucherify.stub import StubServer
+
+
+def pagingHandler(totals, fail_page=None):
+    def handler(method, path, query, body):
+        key = path.strip('/').split('/')[-1]
+        limit = int(query.get('limit'))
+        page = int(query.get('page'))
+        if page == fail_page:
+            return 500, {'code': 500, 'message': 'Internal error'}
+        start = (page - 1) * limit
+        records = [{'id': '%s_%d' % (key, i), 'amount': i, 'metadata': {'n': i}}
+                   for i in range(start, min(start + limit, totals[key]))]
+        return 200, {key: records}
+    return handler
+
+
+def readLines(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_shouldExportAllPagesToNdjson(tmpdir, createClient):
+    path = str(tmpdir.join('redemptions.ndjson'))
+    with StubServer(pagingHandler({'redemptions': 25})) as stub:
+        with createClient(stub) as client:
+            result = export(client, 'redemptions', path, {'limit': 10})
+    assert result == {'resource': 'redemptions', 'path': path, 'pages': 3, 'records': 25, 'resumed': False}
+    assert [record['id'] for record in readLines(path)] == ['redemptions_%d' % i for i in range(25)]
+    assert not os.path.exists(path + '.checkpoint')
+
+
+def test_shouldExportGzippedCsv(tmpdir, createClient):
+    path = str(tmpdir.join('orders.csv.gz'))
+    with StubServer(pagingHandler({'orders': 15})) as stub:
+        with createClient(stub) as client:
+            export(client, 'orders', path, {'limit': 10})
+    with gzip.open(path) as f:
+        rows = list(csv.reader(io.TextIOWrapper(f, encoding='utf-8')))
+    assert rows[0] == ['id', 'amount', 'metadata']
+    assert rows[1] == ['orders_0', '0', '{"n":0}']
+    assert len(rows) == 16
+
+
+def test_shouldResumeFromCheckpoint(tmpdir, createClient):
+    path = str(tmpdir.join('customers.ndjson'))
+    with StubServer(pagingHandler({'customers': 45}, fail_page=3)) as stub:
+        with createClient(stub) as client:
+            try:
+                export(client, 'customers', path, {'limit': 10}, prefetch=False)
+                assert False
+            except Exception:
+                pass
+    checkpoint = json.load(open(path + '.checkpoint'))
+    assert checkpoint['page'] == 2 and checkpoint['records'] == 20
+    with open(path, 'ab') as f:
+        f.write(b'{"id": "partial')
+
+    with StubServer(pagingHandler({'customers': 45})) as stub:
+        with createClient(stub) as client:
+            result = export(client, 'customers', path, {'limit': 10})
+        assert [request['query']['page'] for request in stub.requests] == ['3', '4', '5']
+    assert result['resumed'] and result['records'] == 45
+    assert [record['id'] for record in readLines(path)] == ['customers_%d' % i for i in range(45)]
+
+
+def test_shouldExportResourcesInParallel(tmpdir, createClient):
+    totals = {'redemptions': 30, 'orders': 12, 'customers': 7}
+    with StubServer(pagingHandler(totals)) as stub:
+        with createClient(stub) as client:
+            results = export_many(client, [
+                {'resource': resource, 'path': str(tmpdir.join(resource + '.ndjson')), 'query': {'limit': 5}}
+                for resource in sorted(totals)
+            ])
+    assert [result['records'] for result in results] == [7, 12, 30]
+    for resource, total in totals.items():
+        assert len(readLines(str(tmpdir.join(resource + '.ndjson')))) == total
+
+
+def test_shouldExportFromCommandLine(tmpdir):
+    with StubServer(pagingHandler({'redemptions': 3, 'orders': 4})) as stub:
+        main(['redemptions', 'orders', '--app-id', 'id', '--secret-key', 'key', '--api-endpoint', stub.url,
+              '--output-dir', str(tmpdir), '--gzip'])
+    with gzip.open(str(tmpdir.join('orders.ndjson.gz'))) as f:
+        assert len(f.read().splitlines()) == 4
@@ -0,0 +1,95 @@
+import pytest
+
+from voucherify.hooks import Hook, MetricsCollector, OpenTelemetryHook, endpoint
+from voucherify.retry import RetryPolicy
+from voucherify.stub import StubServer
+
+
+class RecordingHook(Hook):
+    def __init__(self):
+        self.events = []
+
+    def before_request(self, context):
+        self.events.append(('before', context['method'], context['endpoint']))
+
+    def after_response(self, context):
+        self.events.append(('after', context['status'], context['attempts'], context['bytes_out'] > 0))
+
+    def on_error(self, context):
+        self.events.append(('error', context['status'], context['error'].code))
+
+
+@pytest.fixture
+def flakyHandler(stubHandler):
+    def respond(calls, method, path, query, body):
+        calls.append(path)
+        if path.endswith('/MISSING'):
+            return 404, {'code': 404, 'message': 'Resource not found'}
+        if path.endswith('/FLAKY') and calls.count(path) == 1:
+            return 503, {'code': 503, 'message': 'Service Unavailable'}
+        return 200, {'path': path}
+    return stubHandler(respond, [])
+
+
+def test_shouldTemplateEndpoints():
+    assert endpoint('/vouchers/CODE1') == '/vouchers/{id}'
+    assert endpoint('/vouchers/CODE1/sessions/key_1') == '/vouchers/{id}/sessions/{id}'
+    assert endpoint('/vouchers/publish') == '/vouchers/publish'
+    assert endpoint('/redemptions/') == '/redemptions'
+    assert endpoint('/validation-rules/val_1/assignments') == '/validation-rules/{id}/assignments'
+
+
+def test_shouldCallHooksAroundRequests(createClient, flakyHandler):
+    hook = RecordingHook()
+    with StubServer(flakyHandler) as stub:
+        with createClient(stub, hooks=[hook], retry_policy=RetryPolicy(backoff_factor=0, jitter=False)) as client:
+            client.vouchers.get('FLAKY')
+            client.customers.get('MISSING')
+            client.validations.validateVoucher('CODE1', {'order': {'amount': 1000}})
+    assert hook.events == [
+        ('before', 'GET', '/vouchers/{id}'),
+        ('after', 200, 2, False),
+        ('before', 'GET', '/customers/{id}'),
+        ('error', 404, 404),
+        ('before', 'POST', '/vouchers/{id}/validate'),
+        ('after', 200, 1, True),
+    ]
+
+
+def test_shouldCollectMetricsPerEndpoint(createClient, flakyHandler):
+    metrics = MetricsCollector(buckets=(0.001, 10))
+    with StubServer(flakyHandler) as stub:
+        with createClient(stub, hooks=[metrics], retry_policy=RetryPolicy(backoff_factor=0, jitter=False)) as client:
+            client.vouchers.get('FLAKY')
+            client.vouchers.get('CODE1')
+            client.vouchers.get('MISSING')
+            client.redemptions.redeem('CODE1')
+    snapshot = metrics.snapshot()
+    assert sorted(snapshot) == ['GET /vouchers/{id}', 'POST /vouchers/{id}/redemption']
+    vouchers = snapshot['GET /vouchers/{id}']
+    assert vouchers['count'] == 3
+    assert vouchers['errors'] == {'404': 1}
+    assert vouchers['retries'] == 1
+    assert vouchers['bytes_in'] > 0 and vouchers['bytes_out'] == 0
+    assert vouchers['latency_buckets'][-1] == (10, 3)
+    assert snapshot['POST /vouchers/{id}/redemption']['bytes_out'] == 2
+
+    text = metrics.prometheus()
+    assert '# TYPE voucherify_request_duration_seconds histogram' in text
+    assert 'voucherify_request_duration_seconds_count{method="GET",endpoint="/vouchers/{id}"} 3' in text
+    assert 'voucherify_request_duration_seconds_bucket{method="GET",endpoint="/vouchers/{id}",le="+Inf"} 3' in text
+    assert 'voucherify_request_errors_total{method="GET",endpoint="/vouchers/{id}",code="404"} 1' in text
+    assert 'voucherify_request_retries_total{method="GET",endpoint="/vouchers/{id}"} 1' in text
+
+
+def test_shouldRequireOpenTelemetryForTracingHook():
+    try:
+        import opentelemetry
+    except ImportError:
+        try:
+            OpenTelemetryHook()
+            assert False
+        except ImportError:
+            pass
+    else:
+        assert OpenTelemetryHook().tracer is not None
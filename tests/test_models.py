@@ -0,0 +1,85 @@
+from voucherify import utils
+from voucherify.models import Voucher, Discount, Redemption
+from voucherify.stub import StubServer
+
+voucherData = {
+    "code": "PythonVoucherTest",
+    "discount": {
+        "type": "AMOUNT",
+        "amount_off": 12436
+    },
+    "category": "PythonTestCategory",
+    "start_date": "2016-01-01T00:00:00Z",
+    "expiration_date": None,
+    "redemption": {
+        "quantity": None,
+        "redeemed_quantity": 0
+    },
+    "active": True,
+    "assets": {"qr": {"id": "qr_1"}}
+}
+
+
+def test_shouldParseNestedFieldsLazily():
+    voucher = Voucher.from_dict(voucherData)
+    assert not hasattr(voucher, '__dict__')
+    assert isinstance(voucher._discount, dict)
+    assert isinstance(voucher.discount, Discount)
+    assert voucher.discount is voucher.discount
+    assert voucher.discount.amount_off == 12436
+    assert voucher.redemption.redeemed_quantity == 0
+    assert voucher.gift is None
+    assert voucher['assets'] == {"qr": {"id": "qr_1"}}
+    assert voucher.to_dict()['assets'] == voucherData['assets']
+
+
+def test_shouldSupportDictStyleAccess():
+    voucher = Voucher.from_dict(voucherData)
+    assert voucher['discount']['type'] == 'AMOUNT'
+    assert voucher.get('category') == 'PythonTestCategory'
+    assert voucher.get('missing', 'default') == 'default'
+    assert 'discount' in voucher
+    assert 'gift' not in voucher
+
+
+def test_shouldCalculatePricesFromModels():
+    unit_price = 83.45
+    base_price = unit_price * 13
+    voucher = Voucher.from_dict(voucherData)
+    assert utils.calculate_discount(base_price, voucher, unit_price) == 124.36
+    assert utils.calculate_price(base_price, voucher, unit_price) == 960.49
+    assert utils.calculate_prices([base_price], voucher, unit_price) == [960.49]
+
+    gift_card = Voucher.from_dict({"code": "GIFT", "gift": {"amount": 5000, "balance": 2500}})
+    assert utils.calculate_discount(100, gift_card, 0) == 25
+    assert utils.calculate_price(100, gift_card, 0) == 75
+
+
+def test_shouldCalculateGiftCardsFromModelsAndDicts():
+    data = {"code": "GIFT", "gift": {"amount": 10000, "balance": 6000}}
+    for gift_card in (Voucher.from_dict(data), data):
+        assert utils.calculate_price(100, gift_card, 0) == 40.0
+        assert utils.calculate_discount(100, gift_card, 0) == 60.0
+        assert utils.calculate_prices([100, 50], gift_card) == [40.0, 0]
+
+
+def test_shouldReturnModelsFromResourcesWhenEnabled(createClient):
+    def handler(method, path, query, body):
+        if path == '/v1/redemptions/':
+            return 200, {'redemptions': [{'id': 'r_1', 'voucher': voucherData}]}
+        if path.endswith('/MISSING'):
+            return 404, {'code': 404, 'message': 'Resource not found'}
+        return 200, voucherData
+
+    with StubServer(handler) as stub:
+        with createClient(stub, models=True) as client:
+            voucher = client.vouchers.get('PythonVoucherTest')
+            redemptions = list(client.redemptions.iter_list())
+            missing = client.vouchers.get('MISSING')
+            page = client.redemptions.list({})
+    assert isinstance(voucher, Voucher)
+    assert voucher.code == 'PythonVoucherTest'
+    assert isinstance(redemptions[0], Redemption)
+    assert redemptions[0].voucher.discount.type == 'AMOUNT'
+    assert missing == {'code': 404, 'message': 'Resource not found'}
+    assert isinstance(page, dict)
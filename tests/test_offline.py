@@ -0,0 +1,29 @@
+import json
+import os
+
+from voucherify.offline import validate_voucher, parse_date
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures', 'validate_voucher.json')
+
+
+def test_shouldMatchApiResponsesForRecordedValidations():
+    with open(FIXTURES) as fixtures:
+        cases = json.load(fixtures)
+    for case in cases:
+        response = validate_voucher(
+            case['voucher'],
+            case['params'],
+            validation_rules=case.get('validation_rules'),
+            now=parse_date(case['now'])
+        )
+        assert response == case['response'], case['name']
+
+
+def test_shouldRejectUnsupportedRules():
+    voucher = {'code': 'CODE1', 'discount': {'type': 'PERCENT', 'percent_off': 10}}
+    rule = {'rules': {'1': {'name': 'redemption.count.per_customer', 'conditions': {'$less_than': [2]}}}}
+    try:
+        validate_voucher(voucher, {'order': {'amount': 1000}}, validation_rules=[rule])
+        assert False
+    except Exception as e:
+        assert 'redemption.count.per_customer' in str(e)
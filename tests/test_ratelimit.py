@@ -0,0 +1,63 @@
+import time
+
+import pytest
+
+from voucherify.ratelimit import RateLimiter, FileLockBucket, parse_retry_after
+from voucherify.stub import StubServer
+
+
+@pytest.fixture
+def quotaHandler(stubHandler):
+    def create(rate, burst):
+        def respond(state, method, path, query, body):
+            now = time.time()
+            state['tokens'] = min(burst, state['tokens'] + (now - state['updated']) * rate)
+            state['updated'] = now
+            if state['tokens'] < 1:
+                state['rejected'] += 1
+                return 429, {'code': 429, 'message': 'Too Many Requests'}, {'Retry-After': '0.1'}
+            state['tokens'] -= 1
+            state['accepted'] += 1
+            return 200, {'path': path}
+        return stubHandler(respond, {'tokens': float(burst), 'updated': time.time(), 'accepted': 0, 'rejected': 0})
+    return create
+
+
+def test_shouldParseRetryAfterSecondsAndDates():
+    assert parse_retry_after('2') == 2.0
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:05 GMT', now=1445412480) == 5.0
+    assert parse_retry_after('soon') is None
+
+
+def test_shouldKeepThroughputWithinQuota(createClient, quotaHandler):
+    handler = quotaHandler(rate=40, burst=4)
+    limiter = RateLimiter(rate=40, burst=4)
+    with StubServer(handler) as stub:
+        client = createClient(stub, rate_limiter=limiter)
+        with client:
+            results = [client.vouchers.get('CODE%d' % i) for i in range(30)]
+    assert all(result.get('path') for result in results)
+    assert handler.state['accepted'] == 30
+    assert handler.state['rejected'] <= 3
+
+
+def test_shouldBackOffAndRetryThrottledRequests(createClient, quotaHandler):
+    handler = quotaHandler(rate=20, burst=2)
+    limiter = RateLimiter(rate=1000, burst=100, max_retries=10)
+    with StubServer(handler) as stub:
+        client = createClient(stub, rate_limiter=limiter)
+        with client:
+            results = [client.products.get('prod_%d' % i) for i in range(6)]
+    assert all(result.get('path') for result in results)
+    assert limiter.throttled == handler.state['rejected'] > 0
+    assert limiter.rate < 1000
+
+
+def test_shouldShareFileLockBucketBetweenLimiters(tmpdir):
+    path = str(tmpdir.join('bucket'))
+    first = RateLimiter(rate=0.5, burst=2, backend=FileLockBucket(path))
+    second = RateLimiter(rate=0.5, burst=2, backend=FileLockBucket(path))
+    first.acquire()
+    second.acquire()
+    assert second.backend.take(second.rate, second.burst) > 0
+    assert first.backend.take(first.rate, first.burst) > 0
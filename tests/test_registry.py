@@ -0,0 +1,69 @@
+import pytest
+
+from voucherify.cache import ResponseCache
+from voucherify.registry import ClientRegistry
+from voucherify.stub import StubServer
+from voucherify.warmup import RefreshAhead
+
+
+def tenantHandler(method, path, query, body):
+    return 200, {'path': path}
+
+
+def test_shouldShareOneSessionAcrossTenants():
+    with StubServer(tenantHandler) as stub:
+        with ClientRegistry(api_endpoint=stub.url) as registry:
+            first = registry.get('app-1', 'key-1')
+            second = registry.get('app-2', 'key-2')
+            assert registry.get('app-1', 'key-1') is first
+            first.vouchers.get('CODE1')
+            second.products.get('prod_1')
+            assert first.session is second.session
+            assert stub.connections == 1
+        headers = [request['headers']['X-App-Id'] for request in stub.requests]
+        assert headers == ['app-1', 'app-2']
+        assert registry.stats() == {'tenants': 0, 'created': 2, 'reused': 1, 'evicted': 0}
+
+
+def test_shouldIsolateTenantCacheEntries():
+    with StubServer(tenantHandler) as stub:
+        with ClientRegistry(api_endpoint=stub.url, cache=ResponseCache()) as registry:
+            registry.get('app-1', 'key-1').vouchers.get('CODE1')
+            registry.get('app-1', 'key-1').vouchers.get('CODE1')
+            registry.get('app-2', 'key-2').vouchers.get('CODE1')
+        assert [request['headers']['X-App-Id'] for request in stub.requests] == ['app-1', 'app-2']
+
+
+def test_shouldRejectRefreshAheadCache():
+    with pytest.raises(ValueError):
+        ClientRegistry(cache=RefreshAhead(ResponseCache()))
+
+
+def test_shouldEvictLeastRecentlyUsedAndIdleTenants():
+    now = [0.0]
+    registry = ClientRegistry(max_tenants=2, idle_timeout=60, clock=lambda: now[0])
+    registry.get('app-1', 'key-1')
+    registry.get('app-2', 'key-2')
+    registry.get('app-1', 'key-1')
+    registry.get('app-3', 'key-3')
+    assert list(registry._tenants) == ['app-1', 'app-3']
+    now[0] = 30
+    registry.get('app-3', 'key-3')
+    now[0] = 70
+    assert registry.evict_idle() == 1
+    assert list(registry._tenants) == ['app-3']
+    rotated = registry.get('app-3', 'new-key')
+    assert rotated.headers['X-App-Token'] == 'new-key'
+    assert registry.stats()['evicted'] == 2
+
+
+def test_shouldCollectMetricsPerTenant():
+    with StubServer(tenantHandler) as stub:
+        with ClientRegistry(api_endpoint=stub.url) as registry:
+            registry.get('app-1', 'key-1').vouchers.get('CODE1')
+            registry.get('app-1', 'key-1').vouchers.get('CODE2')
+            registry.get('app-2', 'key-2').products.get('prod_1')
+            metrics = registry.tenant_metrics()
+            assert metrics['app-1']['GET /vouchers/{id}']['count'] == 2
+            assert list(metrics['app-2']) == ['GET /products/{id}']
+            assert list(registry.tenant_metrics('app-2')) == ['app-2']
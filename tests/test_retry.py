@@ -0,0 +1,67 @@
+import pytest
+
+from voucherify import VoucherifyError
+from voucherify.retry import RetryPolicy
+from voucherify.stub import StubServer
+
+
+@pytest.fixture
+def faultyHandler(stubHandler):
+    def create(failures, fault=(503, {'code': 503, 'message': 'Service Unavailable'})):
+        def respond(calls, method, path, query, body):
+            calls.append(path)
+            if len(calls) <= failures:
+                return fault
+            return 200, {'path': path}
+        return stubHandler(respond, [])
+    return create
+
+
+def test_shouldRetryIdempotentRequestsOnServerErrors(createClient, faultyHandler):
+    handler = faultyHandler(failures=2)
+    with StubServer(handler) as stub:
+        with createClient(stub, retry_policy=RetryPolicy(max_attempts=3, backoff_factor=0.01)) as client:
+            result = client.vouchers.get('CODE1')
+    assert result == {'path': '/v1/vouchers/CODE1'}
+    assert len(handler.state) == 3
+
+
+def test_shouldGiveUpAfterMaxAttempts(createClient, faultyHandler):
+    handler = faultyHandler(failures=5)
+    with StubServer(handler) as stub:
+        with createClient(stub, retry_policy=RetryPolicy(max_attempts=2, backoff_factor=0.01)) as client:
+            try:
+                client.products.get('prod_1', strict=True)
+                assert False
+            except VoucherifyError as e:
+                assert e.code == 503
+    assert len(handler.state) == 2
+
+
+def test_shouldNotRetryPostWithoutIdempotencyKey(createClient, faultyHandler):
+    handler = faultyHandler(failures=1)
+    with StubServer(handler) as stub:
+        with createClient(stub, retry_policy=RetryPolicy(backoff_factor=0.01)) as client:
+            result = client.customers.create({'source_id': 'customer_1'})
+    assert result['code'] == 503
+    assert len(handler.state) == 1
+
+
+def test_shouldRetryRedemptionWithSameIdempotencyKey(createClient, faultyHandler):
+    handler = faultyHandler(failures=2, fault=None)
+    with StubServer(handler) as stub:
+        with createClient(stub, retry_policy=RetryPolicy(max_attempts=3, backoff_factor=0.01)) as client:
+            result = client.redemptions.redeem('CODE1')
+        keys = set(request['headers'].get('Idempotency-Key') for request in stub.requests)
+    assert result == {'path': '/v1/vouchers/CODE1/redemption'}
+    assert len(handler.state) == 3
+    assert len(keys) == 1 and None not in keys
+
+
+def test_shouldStopRetryingAtDeadline(createClient):
+    with StubServer(latency=0.3) as stub:
+        policy = RetryPolicy(max_attempts=10, backoff_factor=0.01, read_timeout=0.1, deadline=0.5)
+        with createClient(stub, retry_policy=policy) as client:
+            result = client.vouchers.get('CODE1')
+    assert 'Timeout' in result['message']
+    assert 2 <= len(stub.requests) <= 5
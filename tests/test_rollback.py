@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+
+from voucherify.rollback import RollbackJournal
+from voucherify.stub import StubServer
+
+
+@pytest.fixture
+def redemptionsHandler(stubHandler):
+    def create(count):
+        redemptions = []
+        for i in range(count):
+            redemptions.append({'id': 'r_%d' % i, 'object': 'redemption', 'result': 'SUCCESS',
+                                'metadata': {'promo': 'misfire' if i % 2 == 0 else 'ok'}})
+        redemptions.append({'id': 'rr_0', 'object': 'redemption_rollback', 'result': 'SUCCESS'})
+        redemptions.append({'id': 'r_failed', 'object': 'redemption', 'result': 'FAILURE'})
+        redemptions.append({'id': 'r_undone', 'object': 'redemption', 'result': 'SUCCESS', 'status': 'ROLLED_BACK',
+                            'metadata': {'promo': 'misfire'}})
+
+        def respond(rolled_back, method, path, query, body):
+            if method == 'GET':
+                limit, page = int(query['limit']), int(query['page'])
+                return 200, {'redemptions': redemptions[(page - 1) * limit:page * limit]}
+            redemption_id = path.split('/')[3]
+            if redemption_id == 'r_4':
+                return 400, {'code': 400, 'key': 'rollback_not_allowed', 'message': 'Rollback not allowed'}
+            rolled_back.append(redemption_id)
+            return 200, {'id': 'rr_' + redemption_id, 'reason': query.get('reason')}
+        return stubHandler(respond, [])
+    return create
+
+
+def misfire(record):
+    return record['metadata']['promo'] == 'misfire'
+
+
+def test_shouldListMatchingRedemptionsInDryRun(createClient, redemptionsHandler):
+    handler = redemptionsHandler(10)
+    with StubServer(handler) as stub:
+        client = createClient(stub)
+        report = client.redemptions.rollback_many({'limit': 4, 'campaign': 'Summer'}, where=misfire, dry_run=True)
+        client.close()
+    assert report['ids'] == ['r_0', 'r_2', 'r_4', 'r_6', 'r_8']
+    assert report['matched'] == 5
+    assert handler.state == []
+    assert all(request['query']['campaign'] == 'Summer' for request in stub.requests)
+
+
+def test_shouldRollBackConcurrentlyAndResumeFromJournal(tmpdir, createClient, redemptionsHandler):
+    handler = redemptionsHandler(10)
+    path = str(tmpdir.join('rollback.db'))
+    with StubServer(handler) as stub:
+        client = createClient(stub)
+        with RollbackJournal(path) as journal:
+            report = client.redemptions.rollback_many({'limit': 4}, reason='misfire', where=misfire,
+                                                      journal=journal, workers=3)
+        assert report['rolled_back'] == 4
+        assert report['failed'] == 1
+        assert report['errors'][0][0] == 'r_4'
+        assert sorted(handler.state) == ['r_0', 'r_2', 'r_6', 'r_8']
+
+        with RollbackJournal(path) as journal:
+            assert journal.stats() == {'done': 4, 'failed': 1}
+            assert journal.entries('done')[0]['result']['reason'] == 'misfire'
+            again = client.redemptions.rollback_many({'limit': 4}, where=misfire, journal=journal)
+        client.close()
+    assert again['skipped'] == 4
+    assert again['failed'] == 1
+    keys = [request['headers']['Idempotency-Key'] for request in stub.requests if request['method'] == 'POST']
+    assert 'rollback-r_0' in keys
+
+
+def test_shouldRollBackManyWithAsyncClient(tmpdir, createAsyncClient, redemptionsHandler):
+    handler = redemptionsHandler(10)
+
+    async def scenario(stub, journal):
+        async with createAsyncClient(stub) as client:
+            dry_run = await client.redemptions.rollback_many({'limit': 4}, where=misfire, dry_run=True)
+            listed = len(stub.requests)
+            report = await client.redemptions.rollback_many({'limit': 4}, reason='misfire', where=misfire,
+                                                            journal=journal, workers=3)
+        return dry_run, report, [request['method'] for request in stub.requests[listed:]]
+
+    with StubServer(handler) as stub:
+        with RollbackJournal(str(tmpdir.join('rollback.db'))) as journal:
+            dry_run, report, methods = asyncio.run(scenario(stub, journal))
+            assert journal.stats() == {'done': 4, 'failed': 1}
+    assert dry_run['ids'] == ['r_0', 'r_2', 'r_4', 'r_6', 'r_8']
+    assert (report['rolled_back'], report['failed']) == (4, 1)
+    assert report['errors'][0][0] == 'r_4'
+    assert sorted(handler.state) == ['r_0', 'r_2', 'r_6', 'r_8']
+    # Rollbacks start while later pages are still being listed.
+    assert methods.index('POST') < max(i for i, method in enumerate(methods) if method == 'GET')
@@ -0,0 +1,106 @@
+import sqlite3
+import time
+
+import pytest
+
+from voucherify.hooks import Hook
+from voucherify.spool import RedemptionSpool
+from voucherify.stub import StubServer
+
+
+@pytest.fixture
+def redemptionHandler(stubHandler):
+    def create(fail_once=(), rejected=()):
+        def respond(calls, method, path, query, body):
+            code = path.split('/')[3]
+            calls.append(code)
+            if code in rejected:
+                return 400, {'code': 400, 'key': 'quantity_exceeded', 'message': 'quantity exceeded'}
+            if code in fail_once and calls.count(code) == 1:
+                return 503, {'code': 503, 'message': 'Service Unavailable'}
+            return 200, {'result': 'SUCCESS', 'voucher': {'code': code}, 'tracking_id': query.get('tracking_id')}
+        return stubHandler(respond, [])
+    return create
+
+
+def test_shouldAcknowledgeImmediatelyAndDrainInBackground(tmpdir, createClient, redemptionHandler):
+    with StubServer(redemptionHandler(), latency=0.05) as stub:
+        with createClient(stub) as client:
+            with RedemptionSpool(client, str(tmpdir.join('spool.db')), workers=4) as spool:
+                started = time.time()
+                ids = spool.redeem_many([('CODE%d' % i, 'track_%d' % i) for i in range(8)])
+                ids.append(spool.redeem({'voucher': 'CTX', 'order': {'amount': 1000}}, 'track_ctx'))
+                assert time.time() - started < 0.05
+                assert len(set(ids)) == 9
+                assert spool.drain(timeout=5)
+                stats = spool.stats()
+        assert stats['depth'] == 0 and stats['drained'] == 9 and stats['drain_rate'] > 0
+        assert len(stub.requests) == 9
+        ctx = [request for request in stub.requests if request['path'] == '/v1/vouchers/CTX/redemption'][0]
+        assert ctx['body'] == {'order': {'amount': 1000}}
+        assert ctx['query'] == {'tracking_id': 'track_ctx'}
+        assert all(request['headers'].get('Idempotency-Key') for request in stub.requests)
+
+
+def test_shouldKeepOrderPerVoucherCode(tmpdir, createClient, redemptionHandler):
+    with StubServer(redemptionHandler(fail_once=('A',)), latency=0.02) as stub:
+        with createClient(stub) as client:
+            with RedemptionSpool(client, str(tmpdir.join('spool.db')), workers=4, retry_delay=0.05) as spool:
+                spool.redeem_many([('A', 'a1'), ('B', 'b1'), ('A', 'a2'), ('B', 'b2'), ('A', 'a3')])
+                assert spool.drain(timeout=5)
+        tracking = [request['query']['tracking_id'] for request in stub.requests]
+        assert [tracking_id for tracking_id in tracking if tracking_id.startswith('a')] == ['a1', 'a1', 'a2', 'a3']
+        assert [tracking_id for tracking_id in tracking if tracking_id.startswith('b')] == ['b1', 'b2']
+
+
+def test_shouldMoveRejectedRedemptionsToDeadLetters(tmpdir, createClient, redemptionHandler):
+    with StubServer(redemptionHandler(rejected=('BAD',))) as stub:
+        with createClient(stub) as client:
+            with RedemptionSpool(client, str(tmpdir.join('spool.db')), retry_delay=0.01) as spool:
+                spool.redeem_many([('BAD', 't1'), ('GOOD', 't2')])
+                assert spool.drain(timeout=5)
+                dead = spool.dead_letters()
+                assert [(item['code'], item['attempts'], item['error']['key']) for item in dead] == [
+                    ('BAD', 1, 'quantity_exceeded')]
+                assert spool.stats()['dead'] == 1
+                assert spool.purge_dead() == 1
+                assert spool.dead_letters() == []
+
+
+def test_shouldRetryUnexpectedErrorsWithoutStoppingWorkers(tmpdir, createClient, redemptionHandler):
+    class FailingHook(Hook):
+        failures = 0
+
+        def before_request(self, context):
+            if context['path'].endswith('/A/redemption') and not self.failures:
+                self.failures += 1
+                raise RuntimeError('hook failed')
+
+    with StubServer(redemptionHandler()) as stub:
+        with createClient(stub, hooks=[FailingHook()]) as client:
+            with RedemptionSpool(client, str(tmpdir.join('spool.db')), workers=1, retry_delay=0.01) as spool:
+                spool.redeem_many([('A', 'a1'), ('B', 'b1')])
+                assert spool.drain(timeout=5)
+                assert spool.stats()['drained'] == 2
+        assert sorted(request['path'] for request in stub.requests) == [
+            '/v1/vouchers/A/redemption', '/v1/vouchers/B/redemption']
+
+
+def test_shouldResendInflightRedemptionsAfterCrash(tmpdir, createClient, redemptionHandler):
+    path = str(tmpdir.join('spool.db'))
+    with StubServer(redemptionHandler()) as stub:
+        with createClient(stub) as client:
+            crashed = RedemptionSpool(client, path, start=False)
+            crashed.redeem_many([('CODE1', 't1'), ('CODE2', 't2')])
+            with crashed._lock:
+                claimed = crashed._claim()
+            crashed._db.close()
+            with sqlite3.connect(path) as db:
+                assert db.execute('SELECT status FROM redemptions ORDER BY id').fetchall() == [
+                    ('inflight',), ('pending',)]
+
+            with RedemptionSpool(client, path) as spool:
+                assert spool.drain(timeout=5)
+        keys = dict((request['path'], request['headers']['Idempotency-Key']) for request in stub.requests)
+        assert sorted(keys) == ['/v1/vouchers/CODE1/redemption', '/v1/vouchers/CODE2/redemption']
+        assert keys['/v1/vouchers/CODE1/redemption'] == claimed[3]
@@ -0,0 +1,62 @@
+from voucherify import VoucherifyError
+from voucherify.stub import ApiStub, StubServer
+
+
+def test_shouldEmulateVoucherLifecycle(createClient):
+    api = ApiStub(vouchers=[{'code': 'TEN', 'discount': {'type': 'PERCENT', 'percent_off': 10},
+                             'redemption': {'quantity': 1, 'redeemed_quantity': 0}}])
+    with StubServer(api) as server, createClient(server, strict=True) as client:
+        rule = client.validation_rules.create({'rules': {'1': {'name': 'order.amount',
+                                                               'conditions': {'$more_than': [500]}}}})
+        client.validation_rules.assign(rule['id'], {'voucher': 'TEN'})
+        assert client.validations.validateVoucher('TEN', {'order': {'amount': 100}})['valid'] is False
+        validation = client.validations.validateVoucher('TEN', {'order': {'amount': 1000}})
+        assert validation['order']['discount_amount'] == 100
+
+        redemption = client.redemptions.redeem({'voucher': 'TEN', 'order': {'amount': 1000}}, 'track_1')
+        assert redemption['result'] == 'SUCCESS'
+        assert client.vouchers.get('TEN')['redemption']['redeemed_quantity'] == 1
+        try:
+            client.redemptions.redeem({'voucher': 'TEN', 'order': {'amount': 1000}})
+            assert False
+        except VoucherifyError as e:
+            assert e.body['key'] == 'quantity_exceeded'
+
+        rollback = client.redemptions.rollback(redemption['id'], 'test')
+        assert rollback['object'] == 'redemption_rollback'
+        assert client.vouchers.get('TEN')['redemption']['redeemed_quantity'] == 0
+        assert len(client.redemptions.list({'limit': 10})['redemptions']) == 2
+
+        client.vouchers.disable('TEN')
+        assert client.validations.validateVoucher('TEN', {})['valid'] is False
+        publication = client.distributions.publish({'campaign': 'Summer', 'customer': {'source_id': 'c1'}})
+        assert client.vouchers.list({'campaign': 'Summer'})['vouchers'][0]['code'] == publication['voucher']['code']
+
+
+def test_shouldEmulateCustomersOrdersAndProducts(createClient):
+    with StubServer(ApiStub()) as server, createClient(server, strict=True) as client:
+        customer = client.customers.create({'source_id': 'crm-1', 'name': 'Ann'})
+        assert client.customers.create({'source_id': 'crm-1', 'name': 'Annie'})['id'] == customer['id']
+        assert client.customers.update({'id': customer['id'], 'email': 'ann@example.com'})['name'] == 'Annie'
+        order = client.orders.create({'amount': 2000})
+        assert client.orders.get(order['id'])['amount'] == 2000
+        product = client.products.create({'name': 'Shoes'})
+        assert client.products.list({})['products'][0]['id'] == product['id']
+        client.customers.delete(customer['id'])
+        try:
+            client.customers.get(customer['id'])
+            assert False
+        except VoucherifyError as e:
+            assert e.code == 404
+
+
+def test_shouldInjectErrors(createClient):
+    api = ApiStub(vouchers=[{'code': 'A'}], error_rate=0.5, seed=1)
+    with StubServer(api) as server, createClient(server, strict=False) as client:
+        results = [client.vouchers.get('A') for _ in range(40)]
+        failures = [result for result in results if result.get('code') == 503]
+        assert 5 < len(failures) < 35
+
+        api.error_rate = 0
+        api.fail('/v1/vouchers/A', status=429, times=2)
+        assert [client.vouchers.get('A').get('code') for _ in range(3)] == [429, 429, 'A']
@@ -0,0 +1,62 @@
+import pytest
+
+from voucherify.stub import StubServer
+from voucherify.sync import SyncIndex, sync
+
+
+@pytest.fixture
+def crmHandler(stubHandler):
+    def respond(store, method, path, query, body):
+        parts = path.strip('/').split('/')
+        if method == 'POST':
+            record = dict(body, id='cust_' + body['source_id'])
+            if record['source_id'] == 'BROKEN':
+                return 400, {'code': 400, 'key': 'invalid_payload', 'message': 'Invalid payload'}
+            store[record['id']] = record
+            return 200, record
+        if method == 'PUT':
+            if parts[2] not in store:
+                return 404, {'code': 404, 'key': 'not_found', 'message': 'Resource not found'}
+            store[parts[2]] = body
+            return 200, store[parts[2]]
+        return 404, {'code': 404, 'message': 'Resource not found'}
+    return stubHandler(respond, {})
+
+
+def customers(names):
+    return [{'source_id': 'crm-%d' % i, 'name': name} for i, name in enumerate(names)]
+
+
+def test_shouldOnlySendChangedRecords(tmpdir, createClient, crmHandler):
+    with StubServer(crmHandler) as stub:
+        client = createClient(stub)
+        with SyncIndex(str(tmpdir.join('sync.db'))) as index:
+            first = sync(client, 'customers', customers(['Ann', 'Bob', 'Cid']), index)
+            assert first == {'skipped': 0, 'created': 3, 'updated': 0, 'failed': 0, 'errors': []}
+            second = sync(client, 'customers', customers(['Ann', 'Bobby', 'Cid', 'Dee']), index)
+            assert second == {'skipped': 2, 'created': 1, 'updated': 1, 'failed': 0, 'errors': []}
+
+        with SyncIndex(str(tmpdir.join('sync.db'))) as index:
+            third = sync(client, 'customers', customers(['Ann', 'Bobby', 'Cid', 'Dee']), index)
+            assert third['skipped'] == 4
+            assert index.count('customers') == 4
+
+        updates = [request for request in stub.requests if request['method'] == 'PUT']
+        assert [request['path'] for request in updates] == ['/v1/customers/cust_crm-1']
+        assert crmHandler.state['cust_crm-1']['name'] == 'Bobby'
+        client.close()
+
+
+def test_shouldReportFailuresAndRecreateDeletedRecords(tmpdir, createClient, crmHandler):
+    with StubServer(crmHandler) as stub:
+        client = createClient(stub)
+        with SyncIndex(str(tmpdir.join('sync.db'))) as index:
+            sync(client, 'customers', customers(['Ann']), index)
+            crmHandler.state.clear()
+            records = customers(['Annie']) + [{'source_id': 'BROKEN'}, {'name': 'No key'}]
+            report = sync(client, 'customers', records, index, workers=2)
+        assert report['created'] == 1
+        assert report['failed'] == 2
+        assert sorted(str(key) for key, _ in report['errors']) == ['BROKEN', 'None']
+        assert [record['name'] for record in crmHandler.state.values()] == ['Annie']
+        client.close()
@@ -0,0 +1,56 @@
+import json
+import time
+
+from voucherify import Client as voucherifyClient, VoucherifyError
+from voucherify.stub import ApiStub, StubServer
+from voucherify.transport import RecordingAdapter, ReplayAdapter, load_cassette
+
+
+def scenario(client):
+    return [
+        client.vouchers.get('TEN'),
+        client.validations.validateVoucher('TEN', {'order': {'amount': 1000}}),
+        client.vouchers.get('MISSING'),
+        client.vouchers.list({'limit': 5})
+    ]
+
+
+def test_shouldRecordAndReplayInteractions(tmpdir):
+    path = str(tmpdir.join('cassette.ndjson'))
+    api = ApiStub(vouchers=[{'code': 'TEN', 'discount': {'type': 'PERCENT', 'percent_off': 10}}])
+    with StubServer(api) as server:
+        with voucherifyClient('app-id', 'secret-key', api_endpoint=server.url,
+                              transport=RecordingAdapter(path)) as client:
+            recorded = scenario(client)
+
+    interactions = load_cassette(path)
+    assert len(interactions) == 4
+    assert interactions[2]['response']['status'] == 404
+    assert 'secret-key' not in json.dumps(interactions)
+
+    replay = ReplayAdapter(path)
+    with voucherifyClient('app-id', 'secret-key', api_endpoint=server.url, transport=replay) as client:
+        assert scenario(client) == recorded
+        missed = client.validations.validateVoucher('TEN', {'order': {'amount': 9}})
+        assert 'No recorded response for POST' in missed['message']
+    assert replay.stats() == {'hits': 4, 'misses': 1}
+
+
+def test_shouldReplayInOrderWithLatency():
+    request = {'method': 'GET', 'path': '/v1/vouchers/A', 'query': [], 'body': None}
+    interactions = [
+        {'request': request, 'response': {'status': 503, 'headers': {'Content-Type': 'application/json'},
+                                          'body': '{"code": 503}', 'elapsed': 0.01}},
+        {'request': request, 'response': {'status': 200, 'headers': {'Content-Type': 'application/json'},
+                                          'body': '{"code": "A"}', 'elapsed': 0.01}}
+    ]
+    client = voucherifyClient('app-id', 'secret-key', strict=True,
+                              transport=ReplayAdapter(interactions, latency=0.02))
+    started = time.time()
+    try:
+        client.vouchers.get('A')
+        assert False
+    except VoucherifyError as e:
+        assert e.code == 503
+    assert [client.vouchers.get('A')['code'] for _ in range(3)] == ['A', 'A', 'A']
+    assert time.time() - started >= 4 * 0.02
@@ -46,3 +46,43 @@ def test_shouldCalculateAmountDiscountWhenGiftIsNone():
     price = utils.calculate_price(base_price, voucher, unit_price)
     assert discount == 124.36
     assert price == 960.49
+
+def test_shouldCalculateBatchPricesIdenticalToScalar():
+    import random
+    vouchers = [
+        {"discount": {"type": "PERCENT", "percent_off": 12.5}},
+        {"discount": {"type": "AMOUNT", "amount_off": 12436}},
+        {"discount": {"type": "UNIT", "unit_off": 3}},
+    ]
+    rng = random.Random(7)
+    base_prices = [round(rng.uniform(0, 500), 2) for _ in range(3000)]
+    unit_prices_ = [round(rng.uniform(0, 100), 2) for _ in range(3000)]
+    row_vouchers = [vouchers[i % 3] for i in range(3000)]
+
+    expected_prices = [utils.calculate_price(b, v, u) for b, v, u in zip(base_prices, row_vouchers, unit_prices_)]
+    expected_discounts = [utils.calculate_discount(b, v, u) for b, v, u in zip(base_prices, row_vouchers, unit_prices_)]
+    for use_numpy in (False, utils._load_numpy() is not None):
+        assert utils.calculate_prices(base_prices, row_vouchers, unit_prices_, use_numpy=use_numpy) == expected_prices
+        assert utils.calculate_discounts(base_prices, row_vouchers, unit_prices_,
+                                         use_numpy=use_numpy) == expected_discounts
+
+
+def test_shouldCalculateBatchPricesForOneVoucher():
+    voucher = {"discount": {"type": "AMOUNT", "amount_off": 12436}}
+    assert utils.calculate_prices([base_price, 100], voucher, unit_price) == [960.49, 0]
+    assert utils.calculate_discounts([base_price, 100], voucher, unit_price) == [124.36, 100]
+
+
+def test_shouldCalculateEmptyBatch():
+    voucher = {"discount": {"type": "PERCENT", "percent_off": 10}}
+    for use_numpy in (False, utils._load_numpy() is not None):
+        assert utils.calculate_prices([], voucher, use_numpy=use_numpy) == []
+        assert utils.calculate_discounts([], [], use_numpy=use_numpy) == []
+
+
+def test_shouldRoundBatchPricesLikeRoundMoney():
+    voucher = {"discount": {"type": "PERCENT", "percent_off": 0}}
+    base_prices = [i / 1000 for i in range(200000)]
+    expected = [utils.round_money(price) for price in base_prices]
+    for use_numpy in (False, utils._load_numpy() is not None):
+        assert utils.calculate_prices(base_prices, voucher, use_numpy=use_numpy) == expected
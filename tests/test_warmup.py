@@ -0,0 +1,60 @@
+import time
+
+from voucherify.cache import ResponseCache
+from voucherify.stub import StubServer
+from voucherify.warmup import warm_up, RefreshAhead
+
+
+def catalogHandler(method, path, query, body):
+    parts = path.strip('/').split('/')
+    if len(parts) == 2:
+        limit = int(query.get('limit'))
+        page = int(query.get('page'))
+        key = {'vouchers': 'vouchers', 'products': 'products', 'validation-rules': 'data'}[parts[1]]
+        start = (page - 1) * limit
+        records = [{'id': '%s_%d' % (parts[1], i), 'code': 'CODE%d' % i} for i in range(start, min(start + limit, 25))]
+        return 200, {key: records}
+    if parts[2] == 'MISSING':
+        return 404, {'code': 404, 'message': 'Resource not found'}
+    return 200, {'id': parts[2], 'code': parts[2], 'fetched': time.time()}
+
+
+def test_shouldWarmUpCacheFromListEndpoints(createClient):
+    cache = ResponseCache()
+    with StubServer(catalogHandler) as stub:
+        with createClient(stub, cache=cache) as client:
+            loaded = warm_up(client, vouchers={'limit': 10, 'campaign': 'Summer'}, products={},
+                             validation_rules={'limit': 100}, codes=['CODE3', 'EXTRA'])
+            warmed = len(stub.requests)
+            client.vouchers.get('CODE24')
+            client.products.get('products_7')
+            client.validation_rules.get('validation-rules_0')
+        assert loaded == {'vouchers': 25, 'products': 25, 'validation_rules': 25, 'codes': 2}
+        assert warmed == 3 + 1 + 1 + 1
+        assert len(stub.requests) == warmed
+        assert stub.requests[0]['query'] == {'limit': '10', 'page': '1', 'campaign': 'Summer'}
+
+
+def test_shouldRefreshReadEntriesBeforeTheyExpire(createClient):
+    cache = RefreshAhead(ResponseCache(ttl=0.5), refresh_before=0.4, jitter=0.1)
+    with StubServer(catalogHandler) as stub:
+        with createClient(stub, cache=cache) as client:
+            cache.start(client)
+            try:
+                first = client.vouchers.get('HOT')
+                client.vouchers.get('COLD')
+                client.vouchers.get('MISSING')
+                deadline = time.time() + 1.5
+                while time.time() < deadline:
+                    hot = client.vouchers.get('HOT')
+                    time.sleep(0.05)
+            finally:
+                cache.stop()
+        hot_gets = [request for request in stub.requests if request['path'] == '/v1/vouchers/HOT']
+        cold_gets = [request for request in stub.requests if request['path'] == '/v1/vouchers/COLD']
+        assert hot['fetched'] > first['fetched']
+        assert len(hot_gets) >= 4
+        assert len(cold_gets) == 2
+        stats = cache.stats()
+        assert stats['misses'] == 3
+        assert stats['refreshes'] == len(hot_gets) + len(cold_gets) - 2
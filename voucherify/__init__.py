@@ -1,2 +1,18 @@
+import sys
+
 from voucherify.client import Client, VoucherifyError
 import voucherify.utils as utils
+from voucherify.ratelimit import RateLimiter
+
+if sys.version_info >= (3, 7):
+    # aiohttp is the slowest dependency to import, so AsyncClient is only loaded when it is first used.
+    def __getattr__(name):
+        if name == 'AsyncClient':
+            from voucherify.async_client import AsyncClient
+            return AsyncClient
+        raise AttributeError("module 'voucherify' has no attribute '%s'" % name)
+else:
+    try:
+        from voucherify.async_client import AsyncClient
+    except (ImportError, SyntaxError):
+        pass
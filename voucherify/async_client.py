@@ -0,0 +1,379 @@
+import asyncio
+import collections
+import time
+import uuid
+
+import aiohttp
+
+from voucherify.client import (
+    TIMEOUT, POOL_MAXSIZE, PAGE_LIMIT, ClientConfig, VoucherifyRequest, VoucherifyError, Vouchers, Redemptions,
+    Validations, Distributions, Customers, Orders, Products, ValidationRules, _Resource, _best_validation,
+    _deadline_exceeded, _is_transient_error, _rollbackable
+)
+from voucherify.codec import get_codec
+from voucherify.hooks import request_context
+from voucherify.singleflight import freeze
+
+
+async def _aimap_bounded(func, iterable, workers, window=None):
+    window = window or workers * 2
+    semaphore = asyncio.Semaphore(workers)
+    pending = collections.deque()
+
+    async def run(item):
+        async with semaphore:
+            return await func(item)
+
+    async def items():
+        if hasattr(iterable, '__aiter__'):
+            async for item in iterable:
+                yield item
+        else:
+            for item in iterable:
+                yield item
+
+    try:
+        async for item in items():
+            pending.append(asyncio.ensure_future(run(item)))
+            if len(pending) >= window:
+                yield await pending.popleft()
+        while pending:
+            yield await pending.popleft()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+class AsyncSingleFlight(object):
+    def __init__(self):
+        self.calls = 0
+        self.shared = 0
+        self._tasks = {}
+
+    async def do(self, key, factory):
+        task = self._tasks.get(key)
+        if task is None:
+            task = self._tasks[key] = asyncio.ensure_future(factory())
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+            self.calls += 1
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    def stats(self):
+        return {'calls': self.calls, 'shared': self.shared, 'in_flight': len(self._tasks)}
+
+
+class AsyncConnectionPool(object):
+    def __init__(self, pool_maxsize=POOL_MAXSIZE, max_concurrency=None, keep_alive=True, session=None):
+        self.pool_maxsize = pool_maxsize
+        self.max_concurrency = max_concurrency
+        self.keep_alive = keep_alive
+        self._owns_session = session is None
+        self._session = session
+        self._semaphore = None
+
+    @property
+    def session(self):
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self.pool_maxsize, force_close=not self.keep_alive)
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def request(self, method, url, **kwargs):
+        if self.max_concurrency is None:
+            return await self._send(method, url, **kwargs)
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            return await self._send(method, url, **kwargs)
+
+    async def _send(self, method, url, **kwargs):
+        async with self.session.request(method, url, **kwargs) as response:
+            body = await response.read()
+        return response, body
+
+    async def close(self):
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+class AsyncVoucherifyRequest(VoucherifyRequest):
+    def __init__(self, application_id, client_secret_key=None, api_endpoint=None, timeout=TIMEOUT, strict=False,
+                 session=None, models=False, codec=None, single_flight=None, hooks=None):
+        super(AsyncVoucherifyRequest, self).__init__(
+            application_id, client_secret_key, api_endpoint, timeout, strict, session, models=models, codec=codec,
+            single_flight=single_flight, hooks=hooks
+        )
+
+    async def request(self, path, method='GET', strict=None, idempotency_key=None, model=None, decode=True,
+                      **kwargs):
+        try:
+            if self.single_flight is not None and method == 'GET' and idempotency_key is None:
+                response, body = await self.single_flight.do(
+                    (path, freeze(kwargs)),
+                    lambda: self._send(path, method, idempotency_key, **kwargs)
+                )
+            else:
+                response, body = await self._send(path, method, idempotency_key, **kwargs)
+        except VoucherifyError as e:
+            raise_exception = strict if strict is not None else self.strict
+            if raise_exception:
+                raise
+            return e.body
+
+        if not decode:
+            return body
+        content_type = response.headers.get('content-type')
+        if content_type and 'json' in content_type:
+            return self._as_model(self.codec.decode(body), model)
+        return body.decode('utf-8')
+
+    async def _send(self, path, method, idempotency_key, **kwargs):
+        context = None
+        if self.hooks:
+            context = request_context(type(self).__name__, method, path, kwargs.get('data'))
+            context['attempts'] = 1
+            for hook in self.hooks:
+                hook.before_request(context)
+
+        headers = self.headers
+        if idempotency_key is not None:
+            headers = dict(self.headers, **{'Idempotency-Key': idempotency_key})
+        try:
+            url = self.url + path
+            response, body = await self.session.request(
+                method,
+                url,
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                **kwargs
+            )
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            voucherify_error = VoucherifyError(e)
+            if context is not None:
+                self._finish(context, None, None, voucherify_error)
+            raise voucherify_error
+
+        error = None
+        if response.status >= 400:
+            content_type = response.headers.get('content-type')
+            if content_type and 'json' in content_type:
+                error_body = self.codec.decode(body)
+            else:
+                error_body = {'code': response.status, 'message': body.decode('utf-8', 'replace')}
+            error = VoucherifyError(
+                aiohttp.ClientResponseError(
+                    response.request_info,
+                    response.history,
+                    status=response.status,
+                    message=response.reason or ''
+                ),
+                body=error_body
+            )
+        if context is not None:
+            self._finish(context, response, body, error)
+        if error is not None:
+            raise error
+        return response, body
+
+    def _finish(self, context, response, body, error=None):
+        context['elapsed'] = time.time() - context['started']
+        context['error'] = error
+        if response is not None:
+            context['status'] = response.status
+            context['bytes_in'] = len(body)
+        for hook in self.hooks:
+            if error is None:
+                hook.after_response(context)
+            else:
+                hook.on_error(context)
+
+    async def _iterate(self, path, query, key, prefetch=True, model=None, **kwargs):
+        kwargs.pop('strict', None)
+        query = dict(query or {})
+        limit = int(query.get('limit') or PAGE_LIMIT)
+        page = int(query.get('page') or 1)
+        query['limit'] = limit
+
+        async def fetch(page_number):
+            params = dict(query, page=page_number)
+            return (await self.request(path, params=params, strict=True, **kwargs)).get(key) or []
+
+        records = await fetch(page)
+        while records:
+            has_more = len(records) >= limit
+            next_page = asyncio.ensure_future(fetch(page + 1)) if has_more and prefetch else None
+            try:
+                for record in records:
+                    yield self._as_model(record, model)
+            except GeneratorExit:
+                if next_page is not None:
+                    next_page.cancel()
+                raise
+            if not has_more:
+                return
+            page += 1
+            records = await next_page if next_page is not None else await fetch(page)
+
+
+class AsyncVouchers(AsyncVoucherifyRequest, Vouchers):
+    async def create_many(self, vouchers, workers=4, window=None, retries=3, retry_delay=0.5, **kwargs):
+        async def create(voucher):
+            idempotency_key = uuid.uuid4().hex
+            attempt = 0
+            while True:
+                try:
+                    result = await self.create(voucher, strict=True, idempotency_key=idempotency_key, **kwargs)
+                    return {'code': result.get('code', voucher.get('code')), 'status': 'created', 'error': None}
+                except VoucherifyError as e:
+                    if attempt > 0 and e.code == 409:
+                        return {'code': voucher.get('code'), 'status': 'created', 'error': None}
+                    if attempt < retries and _is_transient_error(e):
+                        await asyncio.sleep(retry_delay * (2 ** attempt))
+                        attempt += 1
+                        continue
+                    return {'code': voucher.get('code'), 'status': 'failed', 'error': e.body}
+
+        async for result in _aimap_bounded(create, vouchers, workers, window):
+            yield result
+
+
+class AsyncRedemptions(AsyncVoucherifyRequest, Redemptions):
+    async def rollback_many(self, query=None, reason=None, data=None, where=None, journal=None, dry_run=False,
+                            workers=8):
+        report = {'matched': 0, 'rolled_back': 0, 'skipped': 0, 'failed': 0, 'errors': []}
+
+        async def matching():
+            seen = set()
+            async for record in self._iterate(self.base_path, query, 'redemptions'):
+                redemption_id = record.get('id')
+                if redemption_id in seen or not _rollbackable(record) or (where is not None and not where(record)):
+                    continue
+                seen.add(redemption_id)
+                report['matched'] += 1
+                if journal is not None and journal.is_done(redemption_id):
+                    report['skipped'] += 1
+                    continue
+                yield redemption_id
+
+        if dry_run:
+            report['ids'] = [redemption_id async for redemption_id in matching()]
+            return report
+
+        async def rollback(redemption_id):
+            try:
+                result = await self.rollback(redemption_id, reason, data, strict=True,
+                                             idempotency_key='rollback-' + redemption_id)
+            except VoucherifyError as e:
+                return redemption_id, None, e
+            return redemption_id, result, None
+
+        try:
+            async for redemption_id, result, error in _aimap_bounded(rollback, matching(), workers):
+                if error is not None:
+                    report['failed'] += 1
+                    report['errors'].append((redemption_id, error.body))
+                else:
+                    report['rolled_back'] += 1
+                if journal is not None:
+                    journal.record(redemption_id, result, error.body if error is not None else None)
+        finally:
+            if journal is not None:
+                journal.commit()
+        return report
+
+
+class AsyncValidations(AsyncVoucherifyRequest, Validations):
+    async def validate_many(self, codes, params, max_concurrency=4, deadline=None, **kwargs):
+        kwargs.pop('strict', None)
+        codes = list(codes)
+        if not codes:
+            return []
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def validate(code):
+            async with semaphore:
+                try:
+                    return await self.validateVoucher(code, params, strict=True, **kwargs)
+                except VoucherifyError as e:
+                    return e.body
+
+        tasks = [asyncio.ensure_future(validate(code)) for code in codes]
+        await asyncio.wait(tasks, timeout=deadline)
+        results = []
+        for code, task in zip(codes, tasks):
+            if task.done():
+                results.append(task.result())
+            else:
+                task.cancel()
+                results.append(_deadline_exceeded(code))
+        return results
+
+    async def validate_best(self, codes, params, **kwargs):
+        return _best_validation(await self.validate_many(codes, params, **kwargs), params)
+
+
+class AsyncDistributions(AsyncVoucherifyRequest, Distributions):
+    pass
+
+
+class AsyncCustomers(AsyncVoucherifyRequest, Customers):
+    pass
+
+
+class AsyncOrders(AsyncVoucherifyRequest, Orders):
+    pass
+
+
+class AsyncProducts(AsyncVoucherifyRequest, Products):
+    pass
+
+
+class AsyncValidationRules(AsyncVoucherifyRequest, ValidationRules):
+    pass
+
+
+class AsyncClient(AsyncVoucherifyRequest):
+    customers = _Resource('customers', AsyncCustomers)
+    vouchers = _Resource('vouchers', AsyncVouchers)
+    redemptions = _Resource('redemptions', AsyncRedemptions)
+    validations = _Resource('validations', AsyncValidations)
+    distributions = _Resource('distributions', AsyncDistributions)
+    orders = _Resource('orders', AsyncOrders)
+    products = _Resource('products', AsyncProducts)
+    validation_rules = _Resource('validation_rules', AsyncValidationRules)
+
+    def __init__(self, application_id, client_secret_key, api_endpoint=None, timeout=TIMEOUT, strict=False,
+                 session=None, pool_maxsize=POOL_MAXSIZE, max_concurrency=None, keep_alive=True, models=False,
+                 codec='json', single_flight=False, hooks=None):
+        pool = AsyncConnectionPool(
+            pool_maxsize=pool_maxsize,
+            max_concurrency=max_concurrency,
+            keep_alive=keep_alive,
+            session=session
+        )
+
+        if isinstance(codec, str):
+            codec = get_codec(codec)
+
+        if single_flight is True:
+            single_flight = AsyncSingleFlight()
+
+        super(AsyncClient, self).__init__(ClientConfig(
+            application_id, client_secret_key, api_endpoint, timeout, strict, pool, models=models, codec=codec,
+            single_flight=single_flight or None, hooks=list(hooks or ())
+        ))
+
+    async def close(self):
+        await self.session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+__all__ = ['AsyncClient']
@@ -0,0 +1,408 @@
+import collections
+import hashlib
+import json
+import mmap
+import os
+import socket
+import struct
+import threading
+import time
+import zlib
+
+from voucherify.codec import JsonCodec
+from voucherify.ratelimit import _FileLock, _read_at, _write_at, fcntl
+
+DEFAULT_TTL = 60
+MAX_ENTRIES = 1024
+NEGATIVE = 1
+COMPRESSED = 2
+
+
+class CacheBackend(object):
+    def __init__(self, ttl=DEFAULT_TTL, negative_ttl=None, clock=time.time):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def ttl_for(self, namespace, negative=False):
+        if negative and self.negative_ttl is not None:
+            return self.negative_ttl
+        if isinstance(self.ttl, dict):
+            return self.ttl.get(namespace, DEFAULT_TTL)
+        return self.ttl
+
+    def get(self, namespace, key):
+        raise NotImplementedError
+
+    def set(self, namespace, key, value, negative=False):
+        raise NotImplementedError
+
+    def invalidate(self, namespace, key):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+
+class _Serializer(object):
+    def __init__(self, codec=None, compress_over=512):
+        self.codec = codec if codec is not None else JsonCodec()
+        self.compress_over = compress_over
+
+    def dumps(self, value, negative):
+        data = self.codec.encode(value)
+        flags = NEGATIVE if negative else 0
+        if self.compress_over is not None and len(data) > self.compress_over:
+            data = zlib.compress(data, 1)
+            flags |= COMPRESSED
+        return flags, data
+
+    def loads(self, flags, data):
+        if flags & COMPRESSED:
+            data = zlib.decompress(data)
+        return self.codec.decode(data), bool(flags & NEGATIVE)
+
+
+class ResponseCache(CacheBackend):
+    def __init__(self, ttl=DEFAULT_TTL, max_entries=MAX_ENTRIES, max_bytes=None, negative_ttl=None, clock=time.time):
+        super(ResponseCache, self).__init__(ttl, negative_ttl, clock)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, namespace, key):
+        cache_key = (namespace, key)
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, negative, size, expires = entry
+            if expires <= self.clock():
+                self._remove(cache_key)
+                self.misses += 1
+                return None
+            # Re-inserting marks the entry as most recently used; OrderedDict.move_to_end is Python 3 only.
+            self._entries[cache_key] = self._entries.pop(cache_key)
+            self.hits += 1
+            return value, negative
+
+    def set(self, namespace, key, value, negative=False):
+        ttl = self.ttl_for(namespace, negative)
+        if not ttl:
+            return
+        cache_key = (namespace, key)
+        size = len(json.dumps(value)) if self.max_bytes is not None else 0
+        with self._lock:
+            if cache_key in self._entries:
+                self._remove(cache_key)
+            self._entries[cache_key] = (value, negative, size, self.clock() + ttl)
+            self.size += size
+            while self._entries and (
+                    len(self._entries) > self.max_entries or
+                    (self.max_bytes is not None and self.size > self.max_bytes)):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, namespace, key):
+        with self._lock:
+            self._remove((namespace, key))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self.size
+            }
+
+    def _remove(self, cache_key):
+        entry = self._entries.pop(cache_key, None)
+        if entry is not None:
+            self.size -= entry[2]
+
+
+class MmapCache(CacheBackend):
+    _header = struct.Struct('<4sIII')
+    _slot = struct.Struct('<QdBxHI')
+    _magic = b'VCC1'
+
+    def __init__(self, path, slots=16384, slot_size=2048, ways=4, ttl=DEFAULT_TTL, negative_ttl=None,
+                 codec=None, compress_over=512, clock=time.time):
+        if fcntl is None:
+            raise RuntimeError('MmapCache requires fcntl, which is not available on this platform.')
+        super(MmapCache, self).__init__(ttl, negative_ttl, clock)
+        self.path = path
+        self.slots = slots - slots % ways
+        self.slot_size = slot_size
+        self.ways = ways
+        self._serializer = _Serializer(codec, compress_over)
+        self._size = self._header.size + self.slots * slot_size
+        self._pid = None
+        self._open()
+
+    def _open(self):
+        self._pid = os.getpid()
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        self._lock = _FileLock(self._fd)
+        with self._lock:
+            header = _read_at(self._fd, self._header.size, 0)
+            expected = self._header.pack(self._magic, self.slots, self.slot_size, self.ways)
+            if header != expected:
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, self._size)
+                _write_at(self._fd, expected, 0)
+        self._map = mmap.mmap(self._fd, self._size)
+
+    def _locked(self):
+        # flock belongs to the open file description, so a forked worker needs its own descriptor.
+        if self._pid != os.getpid():
+            self._map.close()
+            os.close(self._fd)
+            self._open()
+        return self._lock
+
+    def _locate(self, namespace, key):
+        name = ('%s\0%s' % (namespace, key)).encode('utf-8')
+        key_hash = struct.unpack('<Q', hashlib.md5(name).digest()[:8])[0] or 1
+        first = self._header.size + (key_hash % (self.slots // self.ways)) * self.ways * self.slot_size
+        return name, key_hash, [first + way * self.slot_size for way in range(self.ways)]
+
+    def _find(self, name, key_hash, offsets):
+        for offset in offsets:
+            slot_hash, expires, flags, key_length, value_length = self._slot.unpack_from(self._map, offset)
+            start = offset + self._slot.size
+            if slot_hash == key_hash and self._map[start:start + key_length] == name:
+                return offset, expires, flags, start + key_length, value_length
+        return None
+
+    def get(self, namespace, key):
+        name, key_hash, offsets = self._locate(namespace, key)
+        with self._locked():
+            entry = self._find(name, key_hash, offsets)
+            if entry is not None:
+                offset, expires, flags, start, length = entry
+                if expires <= self.clock():
+                    self._map[offset:offset + 8] = b'\0' * 8
+                    entry = None
+                else:
+                    data = self._map[start:start + length]
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return self._serializer.loads(flags, data)
+
+    def set(self, namespace, key, value, negative=False):
+        ttl = self.ttl_for(namespace, negative)
+        if not ttl:
+            return
+        name, key_hash, offsets = self._locate(namespace, key)
+        flags, data = self._serializer.dumps(value, negative)
+        if self._slot.size + len(name) + len(data) > self.slot_size:
+            return
+        with self._locked():
+            now = self.clock()
+            entry = self._find(name, key_hash, offsets)
+            if entry is not None:
+                target = entry[0]
+            else:
+                candidates = [(self._slot.unpack_from(self._map, offset)[:2], offset) for offset in offsets]
+                free = [offset for (slot_hash, expires), offset in candidates if slot_hash == 0 or expires <= now]
+                if free:
+                    target = free[0]
+                else:
+                    target = min(candidates, key=lambda candidate: candidate[0][1])[1]
+                    self.evictions += 1
+            header = self._slot.pack(key_hash, now + ttl, flags, len(name), len(data))
+            start = target + self._slot.size
+            self._map[start:start + len(name) + len(data)] = name + data
+            self._map[target:start] = header
+
+    def invalidate(self, namespace, key):
+        name, key_hash, offsets = self._locate(namespace, key)
+        with self._locked():
+            entry = self._find(name, key_hash, offsets)
+            if entry is not None:
+                self._map[entry[0]:entry[0] + 8] = b'\0' * 8
+
+    def clear(self):
+        with self._locked():
+            for index in range(self.slots):
+                offset = self._header.size + index * self.slot_size
+                self._map[offset:offset + 8] = b'\0' * 8
+
+    def stats(self):
+        stats = super(MmapCache, self).stats()
+        with self._locked():
+            now = self.clock()
+            entries = 0
+            for index in range(self.slots):
+                slot_hash, expires = self._slot.unpack_from(self._map, self._header.size + index * self.slot_size)[:2]
+                if slot_hash and expires > now:
+                    entries += 1
+        stats['entries'] = entries
+        return stats
+
+    def close(self):
+        self._map.close()
+        os.close(self._fd)
+
+
+class RedisError(Exception):
+    pass
+
+
+class RedisCache(CacheBackend):
+    def __init__(self, host='127.0.0.1', port=6379, db=0, password=None, prefix='voucherify:', ttl=DEFAULT_TTL,
+                 negative_ttl=None, socket_timeout=1.0, codec=None, compress_over=512, retry_backoff=1.0,
+                 clock=time.time):
+        super(RedisCache, self).__init__(ttl, negative_ttl, clock)
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.prefix = prefix
+        self.socket_timeout = socket_timeout
+        self.retry_backoff = retry_backoff
+        self.errors = 0
+        self._retry_at = 0
+        self._serializer = _Serializer(codec, compress_over)
+        self._socket = None
+        self._reader = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), self.socket_timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._socket = sock
+        self._reader = sock.makefile('rb')
+        if self.password is not None:
+            self._call('AUTH', self.password)
+        if self.db:
+            self._call('SELECT', self.db)
+
+    def _disconnect(self):
+        if self._socket is not None:
+            self._reader.close()
+            self._socket.close()
+        self._socket = None
+        self._reader = None
+
+    def _call(self, *args):
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode('utf-8')
+            parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        self._socket.sendall(b''.join(parts))
+        return self._read_reply()
+
+    def _read_reply(self):
+        line = self._reader.readline()
+        if not line.endswith(b'\r\n'):
+            raise socket.error('Connection closed by the Redis server.')
+        kind, rest = line[:1], line[1:-2]
+        if kind == b'+':
+            return rest
+        if kind == b'-':
+            raise RedisError(rest.decode('utf-8'))
+        if kind == b':':
+            return int(rest)
+        if kind == b'$':
+            length = int(rest)
+            if length < 0:
+                return None
+            data = self._reader.read(length + 2)
+            return data[:-2]
+        if kind == b'*':
+            length = int(rest)
+            return None if length < 0 else [self._read_reply() for _ in range(length)]
+        # The rest of the stream cannot be parsed either, so the connection is dropped.
+        self._disconnect()
+        raise RedisError('Unexpected reply from the Redis server.')
+
+    def command(self, *args):
+        with self._lock:
+            if self._socket is None and self.clock() < self._retry_at:
+                raise socket.error('Redis is unreachable, not reconnecting before the backoff ends.')
+            if self._socket is not None:
+                try:
+                    return self._call(*args)
+                except (socket.error, OSError):
+                    # The connection may have gone stale between calls, so retry once on a fresh one.
+                    self._disconnect()
+            try:
+                self._connect()
+                return self._call(*args)
+            except (socket.error, OSError):
+                self._disconnect()
+                self._retry_at = self.clock() + self.retry_backoff
+                raise
+
+    def _safe(self, *args):
+        try:
+            return self.command(*args)
+        except (socket.error, OSError, RedisError):
+            self.errors += 1
+            return None
+
+    def _key(self, namespace, key):
+        return ('%s%s:%s' % (self.prefix, namespace, key)).encode('utf-8')
+
+    def get(self, namespace, key):
+        data = self._safe('GET', self._key(namespace, key))
+        if data is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self._serializer.loads(ord(data[:1]), data[1:])
+
+    def set(self, namespace, key, value, negative=False):
+        ttl = self.ttl_for(namespace, negative)
+        if not ttl:
+            return
+        flags, data = self._serializer.dumps(value, negative)
+        self._safe('SET', self._key(namespace, key), struct.pack('B', flags) + data, 'PX', int(ttl * 1000))
+
+    def invalidate(self, namespace, key):
+        self._safe('DEL', self._key(namespace, key))
+
+    def clear(self):
+        cursor = b'0'
+        while True:
+            reply = self._safe('SCAN', cursor, 'MATCH', self.prefix + '*', 'COUNT', 500)
+            if reply is None:
+                return
+            cursor, keys = reply
+            if keys:
+                self._safe('DEL', *keys)
+            if cursor == b'0':
+                return
+
+    def stats(self):
+        stats = super(RedisCache, self).stats()
+        stats['errors'] = self.errors
+        return stats
+
+    def close(self):
+        with self._lock:
+            self._disconnect()
+
+
+__all__ = ['CacheBackend', 'ResponseCache', 'MmapCache', 'RedisCache', 'RedisError']
@@ -1,5 +1,16 @@
-import requests
-import json
+import collections
+import functools
+import six
+import threading
+import time
+import uuid
+
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from voucherify.codec import JsonCodec, get_codec
+from voucherify.hooks import request_context
+from voucherify.models import Voucher, Redemption, Customer, Order, Product
+from voucherify.singleflight import SingleFlight, freeze
 
 try:
     from urllib.parse import quote
@@ -8,12 +19,116 @@ except ImportError:
 
 ENDPOINT_URL = 'https://api.voucherify.io'
 TIMEOUT = 180
-
-
-class VoucherifyRequest(object):
-    def __init__(self, application_id, client_secret_key, api_endpoint=None, timeout=TIMEOUT, strict=False):
-        self.strict = strict
-        self.timeout = timeout
+POOL_CONNECTIONS = 10
+POOL_MAXSIZE = 10
+PAGE_LIMIT = 100
+TRANSIENT_STATUS_CODES = (429, 500, 502, 503, 504)
+
+_DEFAULT_CODEC = JsonCodec()
+
+_requests = None
+
+
+def _http():
+    # requests is imported on the first API call rather than with the SDK to keep cold starts short.
+    global _requests
+    if _requests is None:
+        import requests
+        _requests = requests
+    return _requests
+
+
+def create_session(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, max_retries=0, keep_alive=True,
+                   transport=None):
+    from requests.adapters import HTTPAdapter
+
+    session = _http().Session()
+    adapter = transport if transport is not None else HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=max_retries
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    if not keep_alive:
+        session.headers['Connection'] = 'close'
+    return session
+
+
+def _is_transient_error(voucherify_error):
+    return voucherify_error.code is None or voucherify_error.code in TRANSIENT_STATUS_CODES
+
+
+def _imap_bounded(func, iterable, workers, window=None):
+    window = window or workers * 2
+    executor = ThreadPoolExecutor(max_workers=workers)
+    pending = collections.deque()
+    try:
+        for item in iterable:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+def _rollbackable(record):
+    return (record.get('object', 'redemption') == 'redemption' and record.get('result', 'SUCCESS') == 'SUCCESS' and
+            record.get('status') != 'ROLLED_BACK')
+
+
+def _deadline_exceeded(code):
+    return {
+        'valid': False,
+        'code': code,
+        'reason': 'deadline exceeded',
+        'error': {
+            'key': 'deadline_exceeded',
+            'message': 'Validation did not finish before the deadline'
+        }
+    }
+
+
+def _discount_amount(validation, order):
+    from voucherify.offline import _unit_price
+    from voucherify.utils import calculate_discount
+
+    if (validation.get('order') or {}).get('total_discount_amount') is not None:
+        return validation['order']['total_discount_amount']
+    amount = order.get('amount')
+    if amount is None:
+        return 0
+    unit_price = _unit_price(validation, order) if (validation.get('discount') or {}).get('type') == 'UNIT' else 0
+    try:
+        return int(round(calculate_discount(amount / 100.0, validation, unit_price / 100.0) * 100))
+    except Exception:
+        return 0
+
+
+def _best_validation(validations, params):
+    order = (params or {}).get('order') or {}
+    best = None
+    best_amount = None
+    for validation in validations:
+        if not validation.get('valid'):
+            continue
+        amount = _discount_amount(validation, order)
+        if best is None or amount > best_amount:
+            best, best_amount = validation, amount
+    return best
+
+
+class ClientConfig(object):
+    __slots__ = ('url', 'headers', 'timeout', 'strict', 'rate_limiter', 'retry_policy', 'cache', 'models', 'codec',
+                 'single_flight', 'hooks', '_session', '_session_factory', '_lock')
+
+    def __init__(self, application_id, client_secret_key, api_endpoint=None, timeout=TIMEOUT, strict=False,
+                 session=None, rate_limiter=None, retry_policy=None, cache=None, models=False, codec=None,
+                 single_flight=None, hooks=None, session_factory=None):
         self.url = (api_endpoint if api_endpoint else ENDPOINT_URL) + "/v1"
         self.headers = {
             'X-App-Id': application_id,
@@ -21,32 +136,269 @@ class VoucherifyRequest(object):
             'X-Voucherify-Channel': 'Python-SDK',
             'Content-Type': 'application/json'
         }
+        self.timeout = timeout
+        self.strict = strict
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+        self.cache = cache
+        self.models = models
+        self.codec = codec if codec is not None else _DEFAULT_CODEC
+        self.single_flight = single_flight
+        self.hooks = hooks
+        self._session = session
+        self._session_factory = session_factory if session is None else None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        if self._session is None and self._session_factory is not None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self._session_factory()
+        return self._session
+
+    @session.setter
+    def session(self, session):
+        self._session = session
+        self._session_factory = None
+
+    def close(self):
+        if self._session_factory is not None and self._session is not None:
+            self._session.close()
+            self._session = None
+
+
+def _shared(name):
+    return property(lambda self: getattr(self._config, name), lambda self, value: setattr(self._config, name, value))
 
-    def request(self, path, method='GET', strict=None, **kwargs):
-        try:
-            url = self.url + path
-            response = requests.request(
-                method=method,
-                url=url,
-                headers=self.headers,
-                timeout=self.timeout,
-                **kwargs
+
+class VoucherifyRequest(object):
+    url = _shared('url')
+    headers = _shared('headers')
+    timeout = _shared('timeout')
+    strict = _shared('strict')
+    session = _shared('session')
+    rate_limiter = _shared('rate_limiter')
+    retry_policy = _shared('retry_policy')
+    cache = _shared('cache')
+    models = _shared('models')
+    codec = _shared('codec')
+    single_flight = _shared('single_flight')
+    hooks = _shared('hooks')
+
+    def __init__(self, application_id, client_secret_key=None, api_endpoint=None, timeout=TIMEOUT, strict=False,
+                 session=None, rate_limiter=None, retry_policy=None, cache=None, models=False, codec=None,
+                 single_flight=None, hooks=None):
+        if isinstance(application_id, ClientConfig):
+            self._config = application_id
+        else:
+            self._config = ClientConfig(
+                application_id, client_secret_key, api_endpoint, timeout, strict, session, rate_limiter,
+                retry_policy, cache, models, codec, single_flight, hooks
             )
-            response.raise_for_status()
-        except (requests.HTTPError, requests.ConnectionError) as e:
-            voucherify_error = VoucherifyError(e)
+
+    def request(self, path, method='GET', strict=None, idempotency_key=None, model=None, decode=True, **kwargs):
+        try:
+            if self.single_flight is not None and method == 'GET' and idempotency_key is None:
+                response = self.single_flight.do(
+                    (path, freeze(kwargs)),
+                    lambda: self._send(path, method, idempotency_key, **kwargs)
+                )
+            else:
+                response = self._send(path, method, idempotency_key, **kwargs)
+        except VoucherifyError as e:
             raise_exception = strict if strict is not None else self.strict
             if raise_exception:
-                raise voucherify_error
-            return voucherify_error.body
+                raise
+            return e.body
+
+        if not decode:
+            return response.content
 
         if response.headers.get('content-type') and 'json' in response.headers['content-type']:
-            result = response.json()
+            result = self.codec.decode(response.content)
         else:
             result = response.text
 
+        return self._as_model(result, model)
+
+    def _send(self, path, method, idempotency_key, **kwargs):
+        requests = _http()
+        context = None
+        if self.hooks:
+            context = request_context(type(self).__name__, method, path, kwargs.get('data'))
+            for hook in self.hooks:
+                hook.before_request(context)
+
+        url = self.url + path
+        session = self.session
+        http = session if session is not None else requests
+        headers = self.headers
+        if idempotency_key is not None:
+            headers = dict(self.headers, **{'Idempotency-Key': idempotency_key})
+
+        policy = self.retry_policy
+        started = time.time()
+        attempt = 1
+        throttled = 0
+        while True:
+            delay = None
+            if context is not None:
+                context['attempts'] += 1
+            try:
+                if self.rate_limiter is not None:
+                    self.rate_limiter.acquire()
+                response = http.request(
+                    method=method,
+                    url=url,
+                    headers=headers,
+                    timeout=policy.timeout(self.timeout, started) if policy is not None else self.timeout,
+                    **kwargs
+                )
+                if self.rate_limiter is not None:
+                    self.rate_limiter.update(response.status_code, response.headers)
+                    if response.status_code == 429 and throttled < self.rate_limiter.max_retries:
+                        throttled += 1
+                        continue
+                if policy is not None and response.status_code >= 400:
+                    delay = policy.next_delay(method, attempt, started, idempotency_key is not None, response)
+                if delay is None:
+                    response.raise_for_status()
+            except (requests.HTTPError, requests.ConnectionError, requests.Timeout) as e:
+                if policy is not None and not isinstance(e, requests.HTTPError):
+                    # A request that never connected cannot have been processed, so it is safe to resend.
+                    idempotent = idempotency_key is not None or isinstance(e, requests.ConnectTimeout)
+                    delay = policy.next_delay(method, attempt, started, idempotent)
+                if delay is None:
+                    voucherify_error = VoucherifyError(e)
+                    if context is not None:
+                        self._finish(context, getattr(e, 'response', None), voucherify_error)
+                    raise voucherify_error
+            if delay is None:
+                if context is not None:
+                    self._finish(context, response)
+                return response
+            time.sleep(delay)
+            attempt += 1
+
+    def _finish(self, context, response, error=None):
+        context['elapsed'] = time.time() - context['started']
+        context['error'] = error
+        if response is not None:
+            context['status'] = response.status_code
+            context['bytes_in'] = len(response.content)
+            context['server_time'] = response.elapsed.total_seconds()
+        for hook in self.hooks:
+            if error is None:
+                hook.after_response(context)
+            else:
+                hook.on_error(context)
+
+    def _as_model(self, result, model):
+        if self.models and model is not None and isinstance(result, dict):
+            return model.from_dict(result)
         return result
 
+    def _cached_request(self, namespace, key, path, strict=None, model=None, **kwargs):
+        if self.cache is None or kwargs:
+            return self.request(path, strict=strict, model=model, **kwargs)
+
+        raise_exception = strict if strict is not None else self.strict
+        entry = self.cache.get(namespace, key)
+        if entry is not None:
+            result, negative = entry
+            if negative and raise_exception:
+                raise VoucherifyError(None, body=result)
+            return result if negative else self._as_model(result, model)
+
+        try:
+            result = self.request(path, strict=True)
+        except VoucherifyError as e:
+            if e.code == 404:
+                self.cache.set(namespace, key, e.body, negative=True)
+            if raise_exception:
+                raise
+            return e.body
+        self.cache.set(namespace, key, result)
+        return self._as_model(result, model)
+
+    def _invalidate(self, namespace, key):
+        if self.cache is not None:
+            self.cache.invalidate(namespace, key)
+
+    def _iterate(self, path, query, key, prefetch=True, model=None, **kwargs):
+        if prefetch or getattr(self.codec, 'iter_array', None) is None:
+            pages = self._iter_pages(path, query, key, prefetch=prefetch, **kwargs)
+        else:
+            pages = self._stream_pages(path, query, key, **kwargs)
+        for _, records in pages:
+            for record in records:
+                yield self._as_model(record, model)
+
+    def _stream_pages(self, path, query, key, **kwargs):
+        # Without prefetching, the next page is only requested once this one is used up, so its records can be
+        # decoded one at a time from the raw body instead of all at once.
+        kwargs.pop('strict', None)
+        query, limit, page = _page_query(query)
+        while True:
+            body = self.request(path, params=dict(query, page=page), strict=True, decode=False, **kwargs)
+            count = [0]
+
+            def records():
+                for record in self.codec.iter_array(body, key):
+                    count[0] += 1
+                    yield record
+            yield page, records()
+            if count[0] < limit:
+                return
+            page += 1
+
+    def _iter_pages(self, path, query, key, prefetch=True, **kwargs):
+        kwargs.pop('strict', None)
+        query, limit, page = _page_query(query)
+
+        def fetch(page_number):
+            params = dict(query, page=page_number)
+            return self.request(path, params=params, strict=True, **kwargs).get(key) or []
+
+        records = fetch(page)
+        while records:
+            has_more = len(records) >= limit
+            next_page = _PageFetch(fetch, page + 1) if has_more and prefetch else None
+            yield page, records
+            if not has_more:
+                return
+            page += 1
+            records = next_page.result() if next_page is not None else fetch(page)
+
+
+def _page_query(query):
+    query = dict(query or {})
+    limit = int(query.get('limit') or PAGE_LIMIT)
+    query['limit'] = limit
+    return query, limit, int(query.get('page') or 1)
+
+
+class _PageFetch(object):
+    def __init__(self, fetch, page):
+        self._records = None
+        self._error = None
+        self._thread = threading.Thread(target=self._run, args=(fetch, page))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self, fetch, page):
+        try:
+            self._records = fetch(page)
+        except Exception as e:
+            self._error = e
+
+    def result(self):
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+        return self._records
+
 
 class Vouchers(VoucherifyRequest):
     def __init__(self, *args, **kwargs):
@@ -56,36 +408,70 @@ class Vouchers(VoucherifyRequest):
     def list(self, query, **kwargs):
         return self.request(self.base_path, params=query, **kwargs)
 
+    def iter_list(self, query=None, prefetch=True, **kwargs):
+        return self._iterate(self.base_path, query, 'vouchers', prefetch=prefetch, model=Voucher, **kwargs)
+
     def get(self, code, **kwargs):
         path = self.base_path + quote(code)
-        return self.request(path, **kwargs)
+        return self._cached_request('vouchers', code, path, model=Voucher, **kwargs)
 
     def create(self, voucher, **kwargs):
         code = voucher.get('code', '')
         path = self.base_path + quote(code)
-        return self.request(
+        result = self.request(
             path,
-            data=json.dumps(voucher),
+            data=self.codec.encode(voucher),
             method='POST',
+            model=Voucher,
             **kwargs
         )
+        self._invalidate('vouchers', code)
+        return result
 
     def update(self, voucher_update, **kwargs):
         path = self.base_path + quote(voucher_update.get('code'))
-        return self.request(
+        result = self.request(
             path,
-            data=json.dumps(voucher_update),
+            data=self.codec.encode(voucher_update),
             method='PUT',
+            model=Voucher,
             **kwargs
         )
+        self._invalidate('vouchers', voucher_update.get('code'))
+        return result
+
+    def create_many(self, vouchers, workers=4, window=None, retries=3, retry_delay=0.5, **kwargs):
+        def create(voucher):
+            # Every attempt for a voucher sends the same key, so resending after a lost response cannot create it twice.
+            idempotency_key = uuid.uuid4().hex
+            attempt = 0
+            while True:
+                try:
+                    result = self.create(voucher, strict=True, idempotency_key=idempotency_key, **kwargs)
+                    return {'code': result.get('code', voucher.get('code')), 'status': 'created', 'error': None}
+                except VoucherifyError as e:
+                    if attempt > 0 and e.code == 409:
+                        # The code is taken by the voucher an earlier attempt created before its response was lost.
+                        return {'code': voucher.get('code'), 'status': 'created', 'error': None}
+                    if attempt < retries and _is_transient_error(e):
+                        time.sleep(retry_delay * (2 ** attempt))
+                        attempt += 1
+                        continue
+                    return {'code': voucher.get('code'), 'status': 'failed', 'error': e.body}
+
+        return _imap_bounded(create, vouchers, workers, window)
 
     def enable(self, code, **kwargs):
         path = self.base_path + quote(code) + "/enable"
-        return self.request(path, method='POST', **kwargs)
+        result = self.request(path, method='POST', model=Voucher, **kwargs)
+        self._invalidate('vouchers', code)
+        return result
 
     def disable(self, code, **kwargs):
         path = self.base_path + quote(code) + "/disable"
-        return self.request(path, method='POST', **kwargs)
+        result = self.request(path, method='POST', model=Voucher, **kwargs)
+        self._invalidate('vouchers', code)
+        return result
 
     def releaseValidationSession(self, code, sessionKey, **kwargs):
         path = self.base_path + quote(code) + '/sessions/' + quote(sessionKey)
@@ -110,19 +496,22 @@ class Redemptions(VoucherifyRequest):
         if tracking_id:
             params['tracking_id'] = tracking_id
 
+        kwargs.setdefault('idempotency_key', uuid.uuid4().hex)
         return self.request(
             path,
             method='POST',
-            data=json.dumps(context),
+            data=self.codec.encode(context),
             params=params,
+            model=Redemption,
             **kwargs
         )
 
     def redeemStackable(self, params, **kwargs):
+        kwargs.setdefault('idempotency_key', uuid.uuid4().hex)
         return self.request(
             self.base_path,
             method='POST',
-            data=json.dumps(params),
+            data=self.codec.encode(params),
             **kwargs
         )
 
@@ -133,6 +522,9 @@ class Redemptions(VoucherifyRequest):
     def list(self, query, **kwargs):
         return self.request(self.base_path, params=query, **kwargs)
 
+    def iter_list(self, query=None, prefetch=True, **kwargs):
+        return self._iterate(self.base_path, query, 'redemptions', prefetch=prefetch, model=Redemption, **kwargs)
+
     def rollback(self, redemption_id, reason=None, data=None, **kwargs):
         path = self.base_path + redemption_id + "/rollback"
 
@@ -144,11 +536,56 @@ class Redemptions(VoucherifyRequest):
         return self.request(
             path,
             method='POST',
-            data=json.dumps(data),
+            data=self.codec.encode(data),
             params=params,
             **kwargs
         )
 
+    def rollback_many(self, query=None, reason=None, data=None, where=None, journal=None, dry_run=False,
+                      workers=8):
+        report = {'matched': 0, 'rolled_back': 0, 'skipped': 0, 'failed': 0, 'errors': []}
+
+        def matching():
+            seen = set()
+            for _, records in self._iter_pages(self.base_path, query, 'redemptions'):
+                for record in records:
+                    redemption_id = record.get('id')
+                    # Rollbacks created meanwhile shift later pages, so a redemption can be listed twice.
+                    if redemption_id in seen or not _rollbackable(record) or (where is not None and not where(record)):
+                        continue
+                    seen.add(redemption_id)
+                    report['matched'] += 1
+                    if journal is not None and journal.is_done(redemption_id):
+                        report['skipped'] += 1
+                        continue
+                    yield redemption_id
+
+        if dry_run:
+            report['ids'] = list(matching())
+            return report
+
+        def rollback(redemption_id):
+            try:
+                result = self.rollback(redemption_id, reason, data, strict=True,
+                                       idempotency_key='rollback-' + redemption_id)
+            except VoucherifyError as e:
+                return redemption_id, None, e
+            return redemption_id, result, None
+
+        try:
+            for redemption_id, result, error in _imap_bounded(rollback, matching(), workers):
+                if error is not None:
+                    report['failed'] += 1
+                    report['errors'].append((redemption_id, error.body))
+                else:
+                    report['rolled_back'] += 1
+                if journal is not None:
+                    journal.record(redemption_id, result, error.body if error is not None else None)
+        finally:
+            if journal is not None:
+                journal.commit()
+        return report
+
 
 class Validations(VoucherifyRequest):
     def __init__(self, *args, **kwargs):
@@ -160,7 +597,7 @@ class Validations(VoucherifyRequest):
         return self.request(
             path,
             method='POST',
-            data=json.dumps(params),
+            data=self.codec.encode(params),
             **kwargs
         )
 
@@ -168,10 +605,41 @@ class Validations(VoucherifyRequest):
         return self.request(
             self.base_path,
             method='POST',
-            data=json.dumps(params),
+            data=self.codec.encode(params),
             **kwargs
         )
 
+    def validate_many(self, codes, params, max_concurrency=4, deadline=None, **kwargs):
+        kwargs.pop('strict', None)
+        codes = list(codes)
+        if not codes:
+            return []
+
+        def validate(code):
+            try:
+                return self.validateVoucher(code, params, strict=True, **kwargs)
+            except VoucherifyError as e:
+                return e.body
+
+        started = time.time()
+        executor = ThreadPoolExecutor(max_workers=min(max_concurrency, len(codes)))
+        try:
+            futures = [executor.submit(validate, code) for code in codes]
+            results = []
+            for code, future in zip(codes, futures):
+                remaining = None if deadline is None else max(0, deadline - (time.time() - started))
+                try:
+                    results.append(future.result(timeout=remaining))
+                except FutureTimeoutError:
+                    future.cancel()
+                    results.append(_deadline_exceeded(code))
+            return results
+        finally:
+            executor.shutdown(wait=False)
+
+    def validate_best(self, codes, params, **kwargs):
+        return _best_validation(self.validate_many(codes, params, **kwargs), params)
+
 
 class Distributions(VoucherifyRequest):
     def __init__(self, *args, **kwargs):
@@ -179,10 +647,11 @@ class Distributions(VoucherifyRequest):
 
     def publish(self, params, **kwargs):
         path = '/vouchers/publish'
+        kwargs.setdefault('idempotency_key', uuid.uuid4().hex)
         return self.request(
             path,
             method='POST',
-            data=json.dumps(params),
+            data=self.codec.encode(params),
             **kwargs
         )
 
@@ -195,21 +664,23 @@ class Customers(VoucherifyRequest):
     def create(self, customer, **kwargs):
         return self.request(
             self.base_path,
-            data=json.dumps(customer),
+            data=self.codec.encode(customer),
             method='POST',
+            model=Customer,
             **kwargs
         )
 
     def get(self, customer_id, **kwargs):
         path = self.base_path + quote(customer_id)
-        return self.request(path, **kwargs)
+        return self.request(path, model=Customer, **kwargs)
 
     def update(self, customer, **kwargs):
         path = self.base_path + quote(customer.get('id'))
         return self.request(
             path,
-            data=json.dumps(customer),
+            data=self.codec.encode(customer),
             method='PUT',
+            model=Customer,
             **kwargs
         )
 
@@ -220,6 +691,9 @@ class Customers(VoucherifyRequest):
     def list(self, query, **kwargs):
         return self.request(self.base_path, params=query, **kwargs)
 
+    def iter_list(self, query=None, prefetch=True, **kwargs):
+        return self._iterate(self.base_path, query, 'customers', prefetch=prefetch, model=Customer, **kwargs)
+
 
 class Orders(VoucherifyRequest):
     def __init__(self, *args, **kwargs):
@@ -229,27 +703,32 @@ class Orders(VoucherifyRequest):
     def create(self, order, **kwargs):
         return self.request(
             self.base_path,
-            data=json.dumps(order),
+            data=self.codec.encode(order),
             method='POST',
+            model=Order,
             **kwargs
         )
 
     def get(self, order_id, **kwargs):
         path = self.base_path + quote(order_id)
-        return self.request(path, **kwargs)
+        return self.request(path, model=Order, **kwargs)
 
     def update(self, order, **kwargs):
         path = self.base_path + quote(order.get('id'))
         return self.request(
             path,
-            data=json.dumps(order),
+            data=self.codec.encode(order),
             method='PUT',
+            model=Order,
             **kwargs
         )
 
     def list(self, query, **kwargs):
         return self.request(self.base_path, params=query, **kwargs)
 
+    def iter_list(self, query=None, prefetch=True, **kwargs):
+        return self._iterate(self.base_path, query, 'orders', prefetch=prefetch, model=Order, **kwargs)
+
 
 class Products(VoucherifyRequest):
     def __init__(self, *args, **kwargs):
@@ -259,27 +738,34 @@ class Products(VoucherifyRequest):
     def create(self, products, **kwargs):
         return self.request(
             self.base_path,
-            data=json.dumps(products),
+            data=self.codec.encode(products),
             method='POST',
+            model=Product,
             **kwargs
         )
 
     def get(self, products_id, **kwargs):
         path = self.base_path + quote(products_id)
-        return self.request(path, **kwargs)
+        return self._cached_request('products', products_id, path, model=Product, **kwargs)
 
     def update(self, products, **kwargs):
         path = self.base_path + quote(products.get('id'))
-        return self.request(
+        result = self.request(
             path,
-            data=json.dumps(products),
+            data=self.codec.encode(products),
             method='PUT',
+            model=Product,
             **kwargs
         )
+        self._invalidate('products', products.get('id'))
+        return result
 
     def list(self, query, **kwargs):
         return self.request(self.base_path, params=query, **kwargs)
 
+    def iter_list(self, query=None, prefetch=True, **kwargs):
+        return self._iterate(self.base_path, query, 'products', prefetch=prefetch, model=Product, **kwargs)
+
 
 class ValidationRules(VoucherifyRequest):
     def __init__(self, *args, **kwargs):
@@ -289,57 +775,117 @@ class ValidationRules(VoucherifyRequest):
     def create(self, validation_rule, **kwargs):
         return self.request(
             self.base_path,
-            data=json.dumps(validation_rule),
+            data=self.codec.encode(validation_rule),
             method='POST',
             **kwargs
         )
 
     def get(self, validation_rule_id, **kwargs):
         path = self.base_path + quote(validation_rule_id)
-        return self.request(path, **kwargs)
+        return self._cached_request('validation_rules', validation_rule_id, path, **kwargs)
 
     def update(self, validation_rule, **kwargs):
         path = self.base_path + quote(validation_rule.get('id'))
-        return self.request(
+        result = self.request(
             path,
-            data=json.dumps(validation_rule),
+            data=self.codec.encode(validation_rule),
             method='PUT',
             **kwargs
         )
+        self._invalidate('validation_rules', validation_rule.get('id'))
+        return result
 
     def list(self, query, **kwargs):
         return self.request(self.base_path, params=query, **kwargs)
 
+    def iter_list(self, query=None, prefetch=True, **kwargs):
+        return self._iterate(self.base_path, query, 'data', prefetch=prefetch, **kwargs)
+
     def assign(self, validation_rule_id, assignee_payload, **kwargs):
         path = self.base_path + quote(validation_rule_id) + "/assignments"
-        return self.request(
+        result = self.request(
             path,
-            data=json.dumps(assignee_payload),
+            data=self.codec.encode(assignee_payload),
             method='POST',
             **kwargs
         )
+        self._invalidate('validation_rules', validation_rule_id)
+        return result
+
+
+class _Resource(object):
+    def __init__(self, name, resource_class):
+        self.name = name
+        self.resource_class = resource_class
+
+    def __get__(self, client, owner):
+        if client is None:
+            return self
+        resource = client.__dict__[self.name] = self.resource_class(client._config)
+        return resource
 
 
 class Client(VoucherifyRequest):
-    def __init__(self, *args, **kwargs):
-        super(Client, self).__init__(*args, **kwargs)
-        self.customers = Customers(*args, **kwargs)
-        self.vouchers = Vouchers(*args, **kwargs)
-        self.redemptions = Redemptions(*args, **kwargs)
-        self.validations = Validations(*args, **kwargs)
-        self.distributions = Distributions(*args, **kwargs)
-        self.orders = Orders(*args, **kwargs)
-        self.products = Products(*args, **kwargs)
-        self.validation_rules = ValidationRules(*args, **kwargs)
+    customers = _Resource('customers', Customers)
+    vouchers = _Resource('vouchers', Vouchers)
+    redemptions = _Resource('redemptions', Redemptions)
+    validations = _Resource('validations', Validations)
+    distributions = _Resource('distributions', Distributions)
+    orders = _Resource('orders', Orders)
+    products = _Resource('products', Products)
+    validation_rules = _Resource('validation_rules', ValidationRules)
+
+    def __init__(self, application_id, client_secret_key, api_endpoint=None, timeout=TIMEOUT, strict=False,
+                 session=None, pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, max_retries=0,
+                 keep_alive=True, rate_limiter=None, retry_policy=None, cache=None, models=False, codec='json',
+                 single_flight=False, hooks=None, transport=None):
+        if session is not None and transport is not None:
+            raise ValueError('A transport cannot be combined with an external session.')
+        session_factory = None
+        if session is None:
+            session_factory = functools.partial(
+                create_session,
+                pool_connections=pool_connections,
+                pool_maxsize=pool_maxsize,
+                max_retries=max_retries,
+                keep_alive=keep_alive,
+                transport=transport
+            )
+
+        if isinstance(codec, six.string_types):
+            codec = _DEFAULT_CODEC if codec == 'json' else get_codec(codec)
+
+        if single_flight is True:
+            single_flight = SingleFlight()
+
+        super(Client, self).__init__(ClientConfig(
+            application_id, client_secret_key, api_endpoint, timeout, strict, session, rate_limiter, retry_policy,
+            cache, models, codec, single_flight or None, list(hooks or ()), session_factory
+        ))
+
+    def close(self):
+        self._config.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
 
 
 class VoucherifyError(Exception):
-    def __init__(self, request_exception):
+    def __init__(self, request_exception, body=None):
         self._e = request_exception
-        self._request = request_exception.request
-        self._response = request_exception.response
-        if self._response is not None:
-            self.body = self._response.json()
+        self._request = getattr(request_exception, 'request', None)
+        self._response = getattr(request_exception, 'response', None)
+        if body is None and self._response is not None:
+            try:
+                body = self._response.json()
+            except ValueError:
+                # Proxies and load balancers answer with HTML or empty bodies, which still carry the status.
+                body = {'code': self._response.status_code, 'message': self._response.text}
+        if body is not None:
+            self.body = body
             self.code = self.body.get('code')
             self.message = self.body.get('message')
         else:
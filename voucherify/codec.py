@@ -0,0 +1,114 @@
+import json
+
+_WHITESPACE = ' \t\n\r'
+
+
+class JsonCodec(object):
+    name = 'json'
+
+    def __init__(self):
+        self._encoder = json.JSONEncoder(separators=(',', ':'))
+        self._decoder = json.JSONDecoder()
+
+    def encode(self, obj):
+        return self._encoder.encode(obj).encode('utf-8')
+
+    def decode(self, data):
+        if isinstance(data, bytes):
+            data = data.decode('utf-8')
+        return self._decoder.decode(data)
+
+    def iter_array(self, data, key):
+        # Yields the items of the `key` array of a JSON object one at a time, without decoding the whole document.
+        if isinstance(data, bytes):
+            data = data.decode('utf-8')
+        raw_decode = self._decoder.raw_decode
+
+        def skip(index):
+            while index < len(data) and data[index] in _WHITESPACE:
+                index += 1
+            return index
+
+        index = skip(0)
+        if data[index:index + 1] != '{':
+            raise ValueError('Expected a JSON object.')
+        index = skip(index + 1)
+        while data[index:index + 1] == '"':
+            name, index = raw_decode(data, index)
+            index = skip(skip(index) + 1)
+            if name == key and data[index:index + 1] == '[':
+                index = skip(index + 1)
+                if data[index:index + 1] == ']':
+                    return
+                while True:
+                    item, index = raw_decode(data, index)
+                    yield item
+                    index = skip(index)
+                    if data[index:index + 1] == ']':
+                        return
+                    index = skip(index + 1)
+            _, index = raw_decode(data, index)
+            index = skip(index)
+            if data[index:index + 1] == ',':
+                index = skip(index + 1)
+
+
+class OrjsonCodec(JsonCodec):
+    name = 'orjson'
+
+    def __init__(self):
+        super(OrjsonCodec, self).__init__()
+        import orjson
+        self._dumps = orjson.dumps
+        self._loads = orjson.loads
+
+    def encode(self, obj):
+        return self._dumps(obj)
+
+    def decode(self, data):
+        return self._loads(data)
+
+    def iter_array(self, data, key):
+        # Decoding the whole document natively is faster than scanning it item by item in Python.
+        return iter(self.decode(data).get(key) or [])
+
+
+class UjsonCodec(JsonCodec):
+    name = 'ujson'
+
+    def __init__(self):
+        super(UjsonCodec, self).__init__()
+        import ujson
+        self._dumps = ujson.dumps
+        self._loads = ujson.loads
+
+    def encode(self, obj):
+        return self._dumps(obj, ensure_ascii=False).encode('utf-8')
+
+    def decode(self, data):
+        return self._loads(data)
+
+    def iter_array(self, data, key):
+        # Decoding the whole document natively is faster than scanning it item by item in Python.
+        return iter(self.decode(data).get(key) or [])
+
+
+def get_codec(name='json'):
+    # orjson and ujson are imported when a codec using them is created, not on `import voucherify`.
+    if name == 'auto':
+        for codec in (OrjsonCodec, UjsonCodec):
+            try:
+                return codec()
+            except ImportError:
+                pass
+        return JsonCodec()
+    codecs = {'json': JsonCodec, 'orjson': OrjsonCodec, 'ujson': UjsonCodec}
+    if name not in codecs:
+        raise ValueError('Unknown codec: %s.' % name)
+    try:
+        return codecs[name]()
+    except ImportError:
+        raise ImportError('The %s package is not installed.' % name)
+
+
+__all__ = ['JsonCodec', 'OrjsonCodec', 'UjsonCodec', 'get_codec']
@@ -0,0 +1,137 @@
+import hashlib
+import json
+
+import six
+
+from voucherify.client import VoucherifyError, _imap_bounded
+from voucherify.store import SqliteStore
+from voucherify.sync import _missing_key
+
+COMMIT_EVERY = 500
+DONE = 'done'
+FAILED = 'failed'
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS publications (
+    campaign TEXT NOT NULL,
+    customer TEXT NOT NULL,
+    status TEXT NOT NULL,
+    code TEXT,
+    error TEXT,
+    PRIMARY KEY (campaign, customer)
+)
+'''
+
+
+def _customer_key(customer):
+    if isinstance(customer, six.string_types):
+        return customer
+    return customer.get('source_id') or customer.get('id')
+
+
+def _publication_code(result):
+    if result.get('voucher'):
+        return result['voucher'].get('code')
+    if result.get('vouchers'):
+        return result['vouchers'][0].get('code')
+    return None
+
+
+def idempotency_key(campaign, customer):
+    # The same publication always gets the same key, so resending one whose response was lost is deduplicated.
+    data = json.dumps([campaign, customer])
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+class DistributionLog(SqliteStore):
+    # distribute() commits the log itself, right after flushing the output.
+    schema = _SCHEMA
+
+    def is_done(self, campaign, customer):
+        rows = self._query('SELECT status FROM publications WHERE campaign = ? AND customer = ?', (campaign, customer))
+        return bool(rows) and rows[0][0] == DONE
+
+    def record(self, campaign, customer, code=None, error=None):
+        self._write(
+            'INSERT OR REPLACE INTO publications (campaign, customer, status, code, error) VALUES (?, ?, ?, ?, ?)',
+            (campaign, customer, DONE if error is None else FAILED, code,
+             json.dumps(error) if error is not None else None))
+
+    def codes(self, campaign=None):
+        query = "SELECT campaign, customer, code FROM publications WHERE status = 'done'"
+        args = ()
+        if campaign is not None:
+            query += ' AND campaign = ?'
+            args = (campaign,)
+        rows = self._query(query + ' ORDER BY rowid', args)
+        return [{'campaign': row[0], 'customer': row[1], 'code': row[2]} for row in rows]
+
+    def stats(self):
+        counts = dict(self._query('SELECT status, COUNT(*) FROM publications GROUP BY status'))
+        return {'done': counts.get(DONE, 0), 'failed': counts.get(FAILED, 0)}
+
+
+def _sink(output):
+    if output is None:
+        return lambda line: None
+    if callable(output):
+        return output
+
+    def write(line):
+        output.write(json.dumps(line) + '\n')
+    return write
+
+
+def distribute(client, pairs, log, output=None, workers=8, params=None):
+    report = {'published': 0, 'skipped': 0, 'failed': 0, 'errors': []}
+    write = _sink(output)
+
+    def checkpoint():
+        # Codes reach the output before their publications are marked done, so none are lost in a crash.
+        if hasattr(output, 'flush'):
+            output.flush()
+        log.commit()
+
+    def pending():
+        for customer, campaign in pairs:
+            key = _customer_key(customer)
+            if key is None:
+                report['failed'] += 1
+                report['errors'].append((campaign, None, _missing_key(customer)))
+                continue
+            if log.is_done(campaign, key):
+                report['skipped'] += 1
+                continue
+            yield campaign, key, customer
+
+    def publish(item):
+        campaign, key, customer = item
+        if isinstance(customer, six.string_types):
+            customer = {'source_id': customer}
+        payload = dict(params or {}, campaign=campaign, customer=customer)
+        try:
+            result = client.distributions.publish(payload, idempotency_key=idempotency_key(campaign, key),
+                                                  strict=True)
+        except VoucherifyError as e:
+            return item, None, e
+        return item, result, None
+
+    try:
+        for done, ((campaign, key, _), result, error) in enumerate(_imap_bounded(publish, pending(), workers), 1):
+            if error is not None:
+                report['failed'] += 1
+                report['errors'].append((campaign, key, error.body))
+                log.record(campaign, key, error=error.body)
+            else:
+                code = _publication_code(result)
+                write({'campaign': campaign, 'customer': key, 'code': code})
+                log.record(campaign, key, code=code)
+                report['published'] += 1
+            if done % COMMIT_EVERY == 0:
+                checkpoint()
+    finally:
+        checkpoint()
+    return report
+
+
+__all__ = ['DistributionLog', 'distribute', 'idempotency_key']
@@ -0,0 +1,184 @@
+import argparse
+import csv
+import gzip
+import json
+import os
+import sys
+
+import six
+
+from concurrent.futures import ThreadPoolExecutor
+
+from voucherify.client import Client
+
+RESOURCES = {
+    'vouchers': 'vouchers',
+    'redemptions': 'redemptions',
+    'customers': 'customers',
+    'orders': 'orders',
+    'products': 'products'
+}
+FORMATS = ('ndjson', 'csv')
+CHECKPOINT_SUFFIX = '.checkpoint'
+
+_replace = getattr(os, 'replace', os.rename)
+
+
+def _encode_ndjson(records, codec):
+    return b''.join(codec.encode(record) + b'\n' for record in records)
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, separators=(',', ':'))
+    return value
+
+
+def _encode_csv(records, columns, header=False):
+    buffer = six.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    if header:
+        writer.writerow(columns)
+    for record in records:
+        writer.writerow([_csv_value(record.get(column)) for column in columns])
+    data = buffer.getvalue()
+    return data.encode('utf-8') if isinstance(data, six.text_type) else data
+
+
+def _gzip(data):
+    buffer = six.BytesIO()
+    member = gzip.GzipFile(fileobj=buffer, mode='wb', mtime=0)
+    member.write(data)
+    member.close()
+    return buffer.getvalue()
+
+
+def _read_checkpoint(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def _write_checkpoint(path, state):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+    _replace(tmp_path, path)
+
+
+def _output_format(path, format, compress):
+    name = path[:-3] if path.endswith('.gz') else path
+    if compress is None:
+        compress = path.endswith('.gz')
+    if format is None:
+        format = 'csv' if name.endswith('.csv') else 'ndjson'
+    if format not in FORMATS:
+        raise ValueError('Unsupported export format: %s.' % format)
+    return format, compress
+
+
+def export(client, resource, path, query=None, format=None, compress=None, columns=None, resume=True,
+           prefetch=True):
+    if resource not in RESOURCES:
+        raise ValueError('Unsupported export resource: %s.' % resource)
+    format, compress = _output_format(path, format, compress)
+    query = dict(query or {})
+    checkpoint_path = path + CHECKPOINT_SUFFIX
+    settings = {'resource': resource, 'query': query, 'format': format, 'compress': compress}
+
+    state = _read_checkpoint(checkpoint_path) if resume else None
+    if state is not None and state['settings'] != settings:
+        raise ValueError('Checkpoint %s belongs to a different export.' % checkpoint_path)
+    resumed = state is not None and os.path.exists(path)
+    if not resumed:
+        state = {'settings': settings, 'page': 0, 'records': 0, 'offset': 0, 'columns': columns}
+    columns = state['columns']
+
+    resource_client = getattr(client, resource)
+    page_query = dict(query, page=int(query.get('page') or 1) + state['page'])
+    pages = resource_client._iter_pages(resource_client.base_path, page_query, RESOURCES[resource],
+                                        prefetch=prefetch)
+
+    with open(path, 'r+b' if resumed else 'wb') as f:
+        f.seek(state['offset'])
+        f.truncate()
+        for _, records in pages:
+            if format == 'csv':
+                header = columns is None or state['offset'] == 0
+                if columns is None:
+                    columns = list(records[0])
+                data = _encode_csv(records, columns, header=header)
+            else:
+                data = _encode_ndjson(records, resource_client.codec)
+            f.write(_gzip(data) if compress else data)
+            f.flush()
+            state['page'] += 1
+            state['records'] += len(records)
+            state['offset'] = f.tell()
+            state['columns'] = columns
+            _write_checkpoint(checkpoint_path, state)
+        if format == 'csv' and columns is not None and state['offset'] == 0:
+            data = _encode_csv([], columns, header=True)
+            f.write(_gzip(data) if compress else data)
+
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return {
+        'resource': resource,
+        'path': path,
+        'pages': state['page'],
+        'records': state['records'],
+        'resumed': resumed
+    }
+
+
+def export_many(client, exports, workers=None):
+    exports = list(exports)
+    executor = ThreadPoolExecutor(max_workers=workers or len(exports) or 1)
+    try:
+        futures = [executor.submit(export, client, **options) for options in exports]
+        return [future.result() for future in futures]
+    finally:
+        executor.shutdown(wait=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export Voucherify resources to NDJSON or CSV files.')
+    parser.add_argument('resources', nargs='+', choices=sorted(RESOURCES))
+    parser.add_argument('--app-id', default=os.environ.get('VOUCHERIFY_APP_ID'))
+    parser.add_argument('--secret-key', default=os.environ.get('VOUCHERIFY_SECRET_KEY'))
+    parser.add_argument('--api-endpoint', default=os.environ.get('VOUCHERIFY_API_ENDPOINT'))
+    parser.add_argument('--output-dir', default='.')
+    parser.add_argument('--format', choices=FORMATS, default='ndjson')
+    parser.add_argument('--gzip', action='store_true', help='compress the output files')
+    parser.add_argument('--limit', type=int, default=100, help='records per page')
+    parser.add_argument('--workers', type=int, default=None, help='resources exported in parallel')
+    parser.add_argument('--no-resume', action='store_true', help='ignore checkpoints and start over')
+    args = parser.parse_args(argv)
+    if not args.app_id or not args.secret_key:
+        parser.error('--app-id and --secret-key (or VOUCHERIFY_APP_ID and VOUCHERIFY_SECRET_KEY) are required')
+
+    exports = [{
+        'resource': resource,
+        'path': os.path.join(args.output_dir, resource + '.' + args.format + ('.gz' if args.gzip else '')),
+        'query': {'limit': args.limit},
+        'format': args.format,
+        'compress': args.gzip,
+        'resume': not args.no_resume
+    } for resource in args.resources]
+
+    with Client(args.app_id, args.secret_key, api_endpoint=args.api_endpoint, strict=True) as client:
+        for result in export_many(client, exports, workers=args.workers):
+            sys.stdout.write('%(resource)s: %(records)d records in %(pages)d pages -> %(path)s\n' % result)
+    return 0
+
+
+__all__ = ['export', 'export_many', 'main']
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,173 @@
+import threading
+import time
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+ROUTE_SEGMENTS = frozenset([
+    'vouchers', 'redemptions', 'redemption', 'validations', 'validate', 'publish', 'enable', 'disable', 'sessions',
+    'customers', 'orders', 'products', 'validation-rules', 'assignments', 'rollback'
+])
+
+
+def endpoint(path):
+    segments = [segment if segment in ROUTE_SEGMENTS else '{id}' for segment in path.strip('/').split('/') if segment]
+    return '/' + '/'.join(segments)
+
+
+def request_context(resource, method, path, data=None):
+    return {
+        'resource': resource,
+        'method': method,
+        'path': path,
+        'endpoint': endpoint(path),
+        'started': time.time(),
+        'attempts': 0,
+        'status': None,
+        'bytes_out': len(data) if data else 0,
+        'bytes_in': 0,
+        'server_time': None,
+        'elapsed': None,
+        'error': None
+    }
+
+
+class Hook(object):
+    def before_request(self, context):
+        pass
+
+    def after_response(self, context):
+        pass
+
+    def on_error(self, context):
+        pass
+
+
+class MetricsCollector(Hook):
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def after_response(self, context):
+        self._record(context)
+
+    def on_error(self, context):
+        self._record(context)
+
+    def _record(self, context):
+        key = (context['method'], context['endpoint'])
+        elapsed = context['elapsed']
+        with self._lock:
+            stats = self._endpoints.get(key)
+            if stats is None:
+                stats = self._endpoints[key] = {
+                    'count': 0,
+                    'errors': {},
+                    'retries': 0,
+                    'bytes_out': 0,
+                    'bytes_in': 0,
+                    'latency_sum': 0.0,
+                    'latency_buckets': [0] * len(self.buckets)
+                }
+            stats['count'] += 1
+            stats['retries'] += max(0, context['attempts'] - 1)
+            stats['bytes_out'] += context['bytes_out']
+            stats['bytes_in'] += context['bytes_in']
+            stats['latency_sum'] += elapsed
+            for index, bound in enumerate(self.buckets):
+                if elapsed <= bound:
+                    stats['latency_buckets'][index] += 1
+            if context['error'] is not None:
+                code = str(context['status'] or 'connection')
+                stats['errors'][code] = stats['errors'].get(code, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            return dict(('%s %s' % key, {
+                'count': stats['count'],
+                'errors': dict(stats['errors']),
+                'retries': stats['retries'],
+                'bytes_out': stats['bytes_out'],
+                'bytes_in': stats['bytes_in'],
+                'latency_sum': stats['latency_sum'],
+                'latency_buckets': list(zip(self.buckets, stats['latency_buckets']))
+            }) for key, stats in self._endpoints.items())
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+    def prometheus(self, prefix='voucherify'):
+        lines = []
+        with self._lock:
+            items = sorted(self._endpoints.items())
+
+            def metric(name, kind, help_text):
+                lines.append('# HELP %s_%s %s' % (prefix, name, help_text))
+                lines.append('# TYPE %s_%s %s' % (prefix, name, kind))
+
+            metric('request_duration_seconds', 'histogram', 'Time spent on Voucherify API calls, including retries.')
+            for (method, path), stats in items:
+                labels = 'method="%s",endpoint="%s"' % (method, path)
+                for bound, count in zip(self.buckets, stats['latency_buckets']):
+                    lines.append('%s_request_duration_seconds_bucket{%s,le="%s"} %d' % (prefix, labels, bound, count))
+                lines.append('%s_request_duration_seconds_bucket{%s,le="+Inf"} %d' % (prefix, labels, stats['count']))
+                lines.append('%s_request_duration_seconds_sum{%s} %r' % (prefix, labels, stats['latency_sum']))
+                lines.append('%s_request_duration_seconds_count{%s} %d' % (prefix, labels, stats['count']))
+
+            metric('request_errors_total', 'counter', 'Voucherify API calls that failed, by status code.')
+            for (method, path), stats in items:
+                for code, count in sorted(stats['errors'].items()):
+                    lines.append('%s_request_errors_total{method="%s",endpoint="%s",code="%s"} %d' % (
+                        prefix, method, path, code, count))
+
+            for name, field, help_text in (
+                    ('request_retries_total', 'retries', 'Retried attempts of Voucherify API calls.'),
+                    ('request_bytes_total', 'bytes_out', 'Request body bytes sent to the Voucherify API.'),
+                    ('response_bytes_total', 'bytes_in', 'Response body bytes received from the Voucherify API.')):
+                metric(name, 'counter', help_text)
+                for (method, path), stats in items:
+                    lines.append('%s_%s{method="%s",endpoint="%s"} %d' % (prefix, name, method, path, stats[field]))
+        return '\n'.join(lines) + '\n'
+
+
+class OpenTelemetryHook(Hook):
+    def __init__(self, tracer=None):
+        # Imported here so that `import voucherify` does not load opentelemetry whenever it is installed.
+        try:
+            from opentelemetry import trace
+        except ImportError:
+            raise ImportError('The opentelemetry-api package is not installed.')
+        self._trace = trace
+        self.tracer = tracer if tracer is not None else trace.get_tracer('voucherify')
+
+    def before_request(self, context):
+        context['span'] = self.tracer.start_span(
+            'Voucherify %s %s' % (context['method'], context['endpoint']),
+            kind=self._trace.SpanKind.CLIENT,
+            attributes={
+                'http.method': context['method'],
+                'http.route': context['endpoint'],
+                'voucherify.resource': context['resource']
+            }
+        )
+
+    def after_response(self, context):
+        span = context.pop('span', None)
+        if span is not None:
+            span.set_attribute('http.status_code', context['status'])
+            span.set_attribute('http.response_content_length', context['bytes_in'])
+            span.set_attribute('voucherify.attempts', context['attempts'])
+            span.end()
+
+    def on_error(self, context):
+        span = context.pop('span', None)
+        if span is not None:
+            if context['status'] is not None:
+                span.set_attribute('http.status_code', context['status'])
+            span.set_attribute('voucherify.attempts', context['attempts'])
+            span.record_exception(context['error'])
+            span.set_status(self._trace.Status(self._trace.StatusCode.ERROR, str(context['error'])))
+            span.end()
+
+
+__all__ = ['Hook', 'MetricsCollector', 'OpenTelemetryHook', 'endpoint']
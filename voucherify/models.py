@@ -0,0 +1,122 @@
+import six
+
+
+class _ModelMeta(type):
+    def __new__(mcs, name, bases, namespace):
+        fields = namespace.get('fields', ())
+        nested = namespace.get('nested', {})
+        namespace['__slots__'] = tuple(namespace.get('__slots__', ())) + tuple(fields) + tuple(
+            '_' + field for field in nested)
+        namespace['_known'] = frozenset(fields) | frozenset(nested)
+        for field, model in nested.items():
+            namespace[field] = _nested_property('_' + field, model)
+        return super(_ModelMeta, mcs).__new__(mcs, name, bases, namespace)
+
+
+def _nested_property(slot, model):
+    def getter(self):
+        value = getattr(self, slot)
+        if isinstance(value, dict):
+            value = model.from_dict(value)
+            setattr(self, slot, value)
+        return value
+    return property(getter)
+
+
+class Model(six.with_metaclass(_ModelMeta, object)):
+    __slots__ = ('extra',)
+    fields = ()
+    nested = {}
+
+    @classmethod
+    def from_dict(cls, data):
+        instance = cls.__new__(cls)
+        get = data.get
+        for field in cls.fields:
+            setattr(instance, field, get(field))
+        for field in cls.nested:
+            setattr(instance, '_' + field, get(field))
+        if cls._known.issuperset(data):
+            instance.extra = None
+        else:
+            instance.extra = dict((key, value) for key, value in data.items() if key not in cls._known)
+        return instance
+
+    def to_dict(self):
+        data = dict(self.extra or {})
+        for field in self.fields:
+            data[field] = getattr(self, field)
+        for field in self.nested:
+            value = getattr(self, '_' + field)
+            data[field] = value.to_dict() if isinstance(value, Model) else value
+        return data
+
+    def __getitem__(self, key):
+        if key in self.fields or key in self.nested:
+            return getattr(self, key)
+        if self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        if key in self.fields or key in self.nested:
+            return getattr(self, key) is not None
+        return self.extra is not None and key in self.extra
+
+    def get(self, key, default=None):
+        try:
+            value = self[key]
+        except KeyError:
+            return default
+        return default if value is None else value
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.to_dict() == other.to_dict()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return '%s(%r)' % (type(self).__name__, self.to_dict())
+
+
+class Discount(Model):
+    fields = ('type', 'amount_off', 'percent_off', 'unit_off', 'unit_type', 'amount_limit', 'effect')
+
+
+class Gift(Model):
+    fields = ('amount', 'balance', 'effect')
+
+
+class VoucherRedemption(Model):
+    fields = ('quantity', 'redeemed_quantity', 'redeemed_amount', 'object', 'url')
+
+
+class Voucher(Model):
+    fields = ('id', 'code', 'campaign', 'campaign_id', 'category', 'type', 'active', 'start_date',
+              'expiration_date', 'metadata', 'additional_info', 'created_at', 'updated_at', 'object')
+    nested = {'discount': Discount, 'gift': Gift, 'redemption': VoucherRedemption}
+
+
+class Customer(Model):
+    fields = ('id', 'source_id', 'name', 'email', 'description', 'metadata', 'created_at', 'updated_at', 'object')
+
+
+class Order(Model):
+    fields = ('id', 'source_id', 'status', 'amount', 'discount_amount', 'total_discount_amount', 'total_amount',
+              'items', 'metadata', 'customer_id', 'created_at', 'updated_at', 'object')
+    nested = {'customer': Customer}
+
+
+class Product(Model):
+    fields = ('id', 'source_id', 'name', 'price', 'attributes', 'metadata', 'image_url', 'created_at', 'updated_at',
+              'object')
+
+
+class Redemption(Model):
+    fields = ('id', 'date', 'customer_id', 'tracking_id', 'result', 'failure_code', 'failure_message', 'amount',
+              'metadata', 'object')
+    nested = {'voucher': Voucher, 'order': Order, 'customer': Customer}
+
+
+__all__ = ['Model', 'Discount', 'Gift', 'VoucherRedemption', 'Voucher', 'Customer', 'Order', 'Product', 'Redemption']
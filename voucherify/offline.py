@@ -0,0 +1,191 @@
+from __future__ import division
+
+import datetime
+import re
+
+from voucherify.utils import calculate_discount
+
+DATE_FORMATS = ('%Y-%m-%dT%H:%M:%S.%fZ', '%Y-%m-%dT%H:%M:%SZ', '%Y-%m-%d')
+
+
+def parse_date(value):
+    if value is None or isinstance(value, datetime.datetime):
+        return value
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(value, date_format)
+        except ValueError:
+            pass
+    raise Exception('Unsupported date format: %s.' % value)
+
+
+def _invalid(voucher, key, reason, message):
+    return {
+        'valid': False,
+        'code': voucher.get('code'),
+        'reason': reason,
+        'error': {
+            'code': 400,
+            'key': key,
+            'message': message
+        }
+    }
+
+
+def _rule_value(name, params):
+    order = params.get('order') or {}
+    customer = params.get('customer') or {}
+    if name == 'order.amount':
+        return order.get('amount')
+    if name == 'order.items.count':
+        return len(order.get('items') or [])
+    if name == 'order.items.quantity':
+        return sum(item.get('quantity', 1) for item in order.get('items') or [])
+    if name.startswith('order.metadata.'):
+        return (order.get('metadata') or {}).get(name[len('order.metadata.'):])
+    if name.startswith('customer.metadata.'):
+        return (customer.get('metadata') or {}).get(name[len('customer.metadata.'):])
+    if name == 'customer.source_id':
+        return customer.get('source_id')
+    raise Exception('Unsupported validation rule: %s.' % name)
+
+
+CONDITIONS = {
+    '$is': lambda value, args: value in args,
+    '$in': lambda value, args: value in args,
+    '$is_not': lambda value, args: value not in args,
+    '$not_in': lambda value, args: value not in args,
+    '$more_than': lambda value, args: value is not None and value > args[0],
+    '$more_than_or_equal': lambda value, args: value is not None and value >= args[0],
+    '$less_than': lambda value, args: value is not None and value < args[0],
+    '$less_than_or_equal': lambda value, args: value is not None and value <= args[0],
+    '$starts_with': lambda value, args: value is not None and str(value).startswith(args[0]),
+    '$ends_with': lambda value, args: value is not None and str(value).endswith(args[0]),
+    '$contains': lambda value, args: value is not None and args[0] in str(value),
+}
+
+
+def _check_rule(rule, params):
+    value = _rule_value(rule['name'], params)
+    for operator, args in (rule.get('conditions') or {}).items():
+        if operator not in CONDITIONS:
+            raise Exception('Unsupported validation rule condition: %s.' % operator)
+        if not CONDITIONS[operator](value, args if isinstance(args, list) else [args]):
+            return False
+    return True
+
+
+def _evaluate_logic(logic, results):
+    tokens = re.findall(r'\(|\)|[A-Za-z]+|\d+', logic)
+    position = [0]
+
+    def peek():
+        return tokens[position[0]].lower() if position[0] < len(tokens) else None
+
+    def take():
+        token = peek()
+        position[0] += 1
+        return token
+
+    def parse_or():
+        value = parse_and()
+        while peek() == 'or':
+            take()
+            value = parse_and() or value
+        return value
+
+    def parse_and():
+        value = parse_not()
+        while peek() == 'and':
+            take()
+            value = parse_not() and value
+        return value
+
+    def parse_not():
+        if peek() == 'not':
+            take()
+            return not parse_not()
+        token = take()
+        if token == '(':
+            value = parse_or()
+            if take() != ')':
+                raise Exception('Invalid validation rule logic: %s.' % logic)
+            return value
+        if token not in results:
+            raise Exception('Invalid validation rule logic: %s.' % logic)
+        return results[token]
+
+    value = parse_or()
+    if peek() is not None:
+        raise Exception('Invalid validation rule logic: %s.' % logic)
+    return value
+
+
+def check_validation_rule(validation_rule, params):
+    rules = dict((key, rule) for key, rule in validation_rule.get('rules', {}).items() if key != 'logic')
+    if not rules:
+        return True
+    results = dict((key, _check_rule(rule, params)) for key, rule in rules.items())
+    logic = validation_rule['rules'].get('logic') or ' and '.join(sorted(results))
+    return _evaluate_logic(logic, results)
+
+
+def _unit_price(voucher, order):
+    unit_type = voucher['discount'].get('unit_type')
+    for item in order.get('items') or []:
+        if unit_type in (item.get('product_id'), item.get('sku_id')):
+            return item.get('price', 0)
+    return 0
+
+
+def validate_voucher(voucher, params=None, validation_rules=None, now=None):
+    params = params or {}
+    now = now or datetime.datetime.utcnow()
+
+    if not voucher.get('active', True):
+        return _invalid(voucher, 'voucher_disabled', 'voucher is disabled', 'Voucher is disabled')
+    start_date = parse_date(voucher.get('start_date'))
+    if start_date is not None and now < start_date:
+        return _invalid(voucher, 'voucher_not_active', 'voucher not active', 'Voucher not active yet')
+    expiration_date = parse_date(voucher.get('expiration_date'))
+    if expiration_date is not None and now > expiration_date:
+        return _invalid(voucher, 'voucher_expired', 'voucher expired', 'Voucher expired')
+    redemption = voucher.get('redemption') or {}
+    if redemption.get('quantity') is not None and redemption.get('redeemed_quantity', 0) >= redemption['quantity']:
+        return _invalid(voucher, 'quantity_exceeded', 'quantity exceeded', 'Quantity exceeded')
+    for validation_rule in validation_rules or []:
+        if not check_validation_rule(validation_rule, params):
+            return _invalid(voucher, 'validation_rules_violated', 'order does not match validation rules',
+                            'Order does not match validation rules')
+
+    result = {
+        'valid': True,
+        'code': voucher.get('code'),
+        'metadata': voucher.get('metadata'),
+    }
+    gift = voucher.get('gift')
+    if gift is not None:
+        result['gift'] = gift
+    else:
+        result['discount'] = voucher.get('discount')
+
+    order = params.get('order')
+    if order is not None and order.get('amount') is not None:
+        amount = order['amount']
+        if gift is not None:
+            discount_amount = min(gift.get('balance', 0), amount)
+        elif 'discount' in voucher:
+            unit_price = _unit_price(voucher, order) if voucher['discount'].get('type') == 'UNIT' else 0
+            discount_amount = int(round(calculate_discount(amount / 100, voucher, unit_price / 100) * 100))
+        else:
+            raise Exception('Unsupported voucher type.')
+        result['order'] = {
+            'amount': amount,
+            'discount_amount': discount_amount,
+            'total_discount_amount': discount_amount,
+            'total_amount': amount - discount_amount
+        }
+    return result
+
+
+__all__ = ['validate_voucher', 'check_validation_rule']
@@ -0,0 +1,155 @@
+import os
+import struct
+import threading
+import time
+
+from email.utils import parsedate_tz, mktime_tz
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+def parse_retry_after(value, now=None):
+    if value is None:
+        return None
+    now = time.time() if now is None else now
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        parsed = parsedate_tz(value)
+        if parsed is None:
+            return None
+        return max(0.0, mktime_tz(parsed) - now)
+
+
+def parse_rate_limit_reset(value, now=None):
+    if value is None:
+        return None
+    now = time.time() if now is None else now
+    try:
+        reset = float(value)
+    except ValueError:
+        return None
+    # Large values are epoch timestamps, small ones are seconds until reset.
+    return max(0.0, reset - now) if reset > 1e9 else reset
+
+
+class MemoryBucket(object):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = None
+
+    def _load(self, burst, now):
+        return self._state if self._state is not None else (float(burst), now, 0.0)
+
+    def _save(self, state):
+        self._state = state
+
+    def take(self, rate, burst, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            tokens, updated, paused_until = self._load(burst, now)
+            if now < paused_until:
+                self._save((0.0, paused_until, paused_until))
+                return paused_until - now
+            tokens = min(float(burst), tokens + (now - updated) * rate)
+            if tokens >= 1:
+                self._save((tokens - 1, now, paused_until))
+                return 0.0
+            self._save((tokens, now, paused_until))
+            return (1 - tokens) / rate
+
+    def pause(self, delay, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            paused_until = max(self._load(0, now)[2], now + delay)
+            self._save((0.0, paused_until, paused_until))
+
+
+class _FileLock(object):
+    def __init__(self, fd):
+        self._fd = fd
+        self._thread_lock = threading.Lock()
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+
+    def __exit__(self, *exc_info):
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._thread_lock.release()
+
+
+def _read_at(fd, size, offset):
+    # os.pread and os.pwrite are Python 3 only; callers hold a _FileLock, so moving the shared offset is safe.
+    os.lseek(fd, offset, os.SEEK_SET)
+    return os.read(fd, size)
+
+
+def _write_at(fd, data, offset):
+    os.lseek(fd, offset, os.SEEK_SET)
+    os.write(fd, data)
+
+
+class FileLockBucket(MemoryBucket):
+    _format = '<ddd'
+
+    def __init__(self, path):
+        if fcntl is None:
+            raise RuntimeError('FileLockBucket requires fcntl, which is not available on this platform.')
+        super(FileLockBucket, self).__init__()
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        self._lock = _FileLock(self._fd)
+
+    def _load(self, burst, now):
+        data = _read_at(self._fd, struct.calcsize(self._format), 0)
+        if len(data) < struct.calcsize(self._format):
+            return float(burst), now, 0.0
+        return struct.unpack(self._format, data)
+
+    def _save(self, state):
+        _write_at(self._fd, struct.pack(self._format, *state), 0)
+
+    def close(self):
+        os.close(self._fd)
+
+
+class RateLimiter(object):
+    def __init__(self, rate, burst=None, min_rate=None, backend=None, max_retries=3):
+        self.max_rate = float(rate)
+        self.min_rate = float(min_rate) if min_rate is not None else self.max_rate / 10
+        self.rate = self.max_rate
+        self.burst = burst if burst is not None else max(1, int(rate))
+        self.backend = backend if backend is not None else MemoryBucket()
+        self.max_retries = max_retries
+        self.throttled = 0
+
+    def acquire(self):
+        while True:
+            wait = self.backend.take(self.rate, self.burst)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    def update(self, status_code, headers):
+        now = time.time()
+        if status_code == 429:
+            self.throttled += 1
+            self.rate = max(self.min_rate, self.rate / 2)
+            delay = parse_retry_after(headers.get('Retry-After'), now)
+            if delay is None:
+                delay = parse_rate_limit_reset(headers.get('X-RateLimit-Reset'), now)
+            self.backend.pause(delay if delay is not None else 1 / self.rate, now)
+            return
+
+        self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+        if headers.get('X-RateLimit-Remaining') == '0':
+            delay = parse_rate_limit_reset(headers.get('X-RateLimit-Reset'), now)
+            if delay:
+                self.backend.pause(delay, now)
+
+
+__all__ = ['RateLimiter', 'MemoryBucket', 'FileLockBucket']
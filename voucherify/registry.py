@@ -0,0 +1,166 @@
+import collections
+import functools
+import threading
+import time
+
+import six
+
+from voucherify.cache import CacheBackend
+from voucherify.client import (
+    TIMEOUT, POOL_CONNECTIONS, POOL_MAXSIZE, Client, ClientConfig, VoucherifyRequest, create_session, _DEFAULT_CODEC
+)
+from voucherify.codec import get_codec
+from voucherify.hooks import MetricsCollector
+from voucherify.singleflight import SingleFlight
+from voucherify.warmup import RefreshAhead
+
+MAX_TENANTS = 1024
+
+
+class _TenantCache(CacheBackend):
+    # Keys are prefixed with the application id so tenants sharing one cache never read each other's entries.
+    def __init__(self, cache, application_id):
+        self.cache = cache
+        self.prefix = application_id + ':'
+
+    def ttl_for(self, namespace, negative=False):
+        return self.cache.ttl_for(namespace, negative)
+
+    def get(self, namespace, key):
+        return self.cache.get(namespace, self.prefix + key)
+
+    def set(self, namespace, key, value, negative=False):
+        self.cache.set(namespace, self.prefix + key, value, negative)
+
+    def invalidate(self, namespace, key):
+        self.cache.invalidate(namespace, self.prefix + key)
+
+    def stats(self):
+        return self.cache.stats()
+
+
+class TenantClient(Client):
+    def __init__(self, config, application_id, metrics=None):
+        VoucherifyRequest.__init__(self, config)
+        self.application_id = application_id
+        self.metrics = metrics
+
+
+class ClientRegistry(object):
+    def __init__(self, api_endpoint=None, timeout=TIMEOUT, strict=False, session=None,
+                 pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, max_retries=0, keep_alive=True,
+                 rate_limiter=None, retry_policy=None, cache=None, models=False, codec='json', single_flight=False,
+                 hooks=None, max_tenants=MAX_TENANTS, idle_timeout=None, metrics=True, clock=time.time):
+        if isinstance(cache, RefreshAhead):
+            # Refreshes are sent by the one client RefreshAhead is bound to, with its credentials and unprefixed keys.
+            raise ValueError('A RefreshAhead cache cannot be shared across tenants.')
+        session_factory = None
+        if session is None:
+            session_factory = functools.partial(
+                create_session,
+                pool_connections=pool_connections,
+                pool_maxsize=pool_maxsize,
+                max_retries=max_retries,
+                keep_alive=keep_alive
+            )
+        if isinstance(codec, six.string_types):
+            codec = _DEFAULT_CODEC if codec == 'json' else get_codec(codec)
+
+        self.api_endpoint = api_endpoint
+        self.timeout = timeout
+        self.strict = strict
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+        self.cache = cache
+        self.models = models
+        self.codec = codec
+        self.single_flight = single_flight
+        self.hooks = list(hooks or ())
+        self.max_tenants = max_tenants
+        self.idle_timeout = idle_timeout
+        self.metrics = metrics
+        self.clock = clock
+        self.created = 0
+        self.reused = 0
+        self.evicted = 0
+        self._transport = ClientConfig(None, None, session=session, session_factory=session_factory)
+        self._tenants = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, application_id, client_secret_key):
+        now = self.clock()
+        with self._lock:
+            entry = self._tenants.get(application_id)
+            if entry is not None and entry[0].headers['X-App-Token'] == client_secret_key:
+                entry[1] = now
+                # Re-inserting moves the tenant to the most recently used end; move_to_end is Python 3 only.
+                self._tenants[application_id] = self._tenants.pop(application_id)
+                self.reused += 1
+                client = entry[0]
+            else:
+                client = self._create(application_id, client_secret_key)
+                self._tenants.pop(application_id, None)
+                self._tenants[application_id] = [client, now]
+                self.created += 1
+            self._evict(now)
+        return client
+
+    def evict(self, application_id):
+        with self._lock:
+            return self._tenants.pop(application_id, None) is not None
+
+    def evict_idle(self):
+        with self._lock:
+            return self._evict(self.clock())
+
+    def tenant_metrics(self, application_id=None):
+        with self._lock:
+            tenants = [(key, entry[0]) for key, entry in self._tenants.items()
+                       if application_id is None or key == application_id]
+        return dict((key, client.metrics.snapshot()) for key, client in tenants if client.metrics is not None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'tenants': len(self._tenants),
+                'created': self.created,
+                'reused': self.reused,
+                'evicted': self.evicted
+            }
+
+    def close(self):
+        with self._lock:
+            self._tenants.clear()
+        self._transport.close()
+
+    def _create(self, application_id, client_secret_key):
+        metrics = MetricsCollector() if self.metrics else None
+        config = ClientConfig(
+            application_id, client_secret_key, self.api_endpoint, self.timeout, self.strict,
+            self._transport.session, self.rate_limiter, self.retry_policy,
+            _TenantCache(self.cache, application_id) if self.cache is not None else None, self.models, self.codec,
+            SingleFlight() if self.single_flight else None,
+            self.hooks + [metrics] if metrics is not None else self.hooks
+        )
+        return TenantClient(config, application_id, metrics)
+
+    def _evict(self, now):
+        evicted = 0
+        while self._tenants:
+            application_id, (_, last_used) = next(iter(self._tenants.items()))
+            idle = self.idle_timeout is not None and now - last_used > self.idle_timeout
+            if len(self._tenants) <= self.max_tenants and not idle:
+                break
+            del self._tenants[application_id]
+            evicted += 1
+        self.evicted += evicted
+        return evicted
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+__all__ = ['ClientRegistry', 'TenantClient']
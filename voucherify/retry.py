@@ -0,0 +1,55 @@
+import random
+import time
+
+from voucherify.ratelimit import parse_retry_after
+
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class RetryPolicy(object):
+    def __init__(self, max_attempts=3, backoff_factor=0.5, max_backoff=30, jitter=True,
+                 retry_methods=IDEMPOTENT_METHODS, retry_statuses=RETRY_STATUS_CODES,
+                 connect_timeout=None, read_timeout=None, deadline=None):
+        self.max_attempts = max_attempts
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.retry_methods = retry_methods
+        self.retry_statuses = retry_statuses
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.deadline = deadline
+
+    def timeout(self, default, started):
+        connect = self.connect_timeout if self.connect_timeout is not None else default
+        read = self.read_timeout if self.read_timeout is not None else default
+        if self.deadline is not None:
+            remaining = max(0.001, self.deadline - (time.time() - started))
+            connect = min(connect, remaining)
+            read = min(read, remaining)
+        return connect, read
+
+    def backoff(self, attempt):
+        delay = min(self.max_backoff, self.backoff_factor * (2 ** (attempt - 1)))
+        return random.uniform(0, delay) if self.jitter else delay
+
+    def next_delay(self, method, attempt, started, idempotent=False, response=None):
+        if attempt >= self.max_attempts:
+            return None
+        if method.upper() not in self.retry_methods and not idempotent:
+            return None
+        if response is not None and response.status_code not in self.retry_statuses:
+            return None
+
+        delay = self.backoff(attempt)
+        if response is not None:
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+        if self.deadline is not None and time.time() - started + delay >= self.deadline:
+            return None
+        return delay
+
+
+__all__ = ['RetryPolicy']
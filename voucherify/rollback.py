@@ -0,0 +1,44 @@
+import json
+
+from voucherify.store import SqliteStore
+
+DONE = 'done'
+FAILED = 'failed'
+COMMIT_EVERY = 50
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS rollbacks (
+    redemption_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    result TEXT
+)
+'''
+
+
+class RollbackJournal(SqliteStore):
+    schema = _SCHEMA
+    commit_every = COMMIT_EVERY
+
+    def is_done(self, redemption_id):
+        rows = self._query('SELECT status FROM rollbacks WHERE redemption_id = ?', (redemption_id,))
+        return bool(rows) and rows[0][0] == DONE
+
+    def record(self, redemption_id, result=None, error=None):
+        self._write('INSERT OR REPLACE INTO rollbacks (redemption_id, status, result) VALUES (?, ?, ?)',
+                    (redemption_id, DONE if error is None else FAILED, json.dumps(result if error is None else error)))
+
+    def entries(self, status=None):
+        query = 'SELECT redemption_id, status, result FROM rollbacks'
+        args = ()
+        if status is not None:
+            query += ' WHERE status = ?'
+            args = (status,)
+        rows = self._query(query + ' ORDER BY rowid', args)
+        return [{'redemption_id': row[0], 'status': row[1], 'result': json.loads(row[2])} for row in rows]
+
+    def stats(self):
+        counts = dict(self._query('SELECT status, COUNT(*) FROM rollbacks GROUP BY status'))
+        return {'done': counts.get(DONE, 0), 'failed': counts.get(FAILED, 0)}
+
+
+__all__ = ['RollbackJournal']
@@ -0,0 +1,244 @@
+import collections
+import json
+import sqlite3
+import threading
+import time
+import uuid
+
+from voucherify.client import VoucherifyError, _is_transient_error
+
+PENDING = 'pending'
+INFLIGHT = 'inflight'
+DEAD = 'dead'
+RATE_WINDOW = 60
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS redemptions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    code TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    idempotency_key TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS redemptions_status ON redemptions (status, next_attempt);
+CREATE INDEX IF NOT EXISTS redemptions_code ON redemptions (code, id);
+'''
+
+# A row is only claimable while no older row for the same voucher code is still waiting or being sent.
+_CLAIM = '''
+SELECT id, code, payload, idempotency_key, attempts FROM redemptions AS r
+WHERE status = 'pending' AND next_attempt <= ? AND NOT EXISTS (
+    SELECT 1 FROM redemptions AS o WHERE o.code = r.code AND o.id < r.id AND o.status IN ('pending', 'inflight')
+)
+ORDER BY id LIMIT 1
+'''
+
+
+class RedemptionSpool(object):
+    def __init__(self, client, path, workers=4, max_attempts=5, retry_delay=1.0, max_retry_delay=60,
+                 poll_interval=1.0, start=True):
+        self.client = client
+        self.path = path
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.poll_interval = poll_interval
+        self.drained = 0
+        self._started = time.time()
+        self._completed = collections.deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._stopping = False
+        self._threads = []
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.executescript(_SCHEMA)
+        # Rows claimed by a process that died were possibly sent; their idempotency key makes resending safe.
+        self._db.execute("UPDATE redemptions SET status = 'pending' WHERE status = 'inflight'")
+        if start:
+            self.start()
+
+    def redeem(self, code, tracking_id=None):
+        return self.redeem_many([(code, tracking_id)])[0]
+
+    def redeem_many(self, redemptions):
+        rows = []
+        now = time.time()
+        for code, tracking_id in redemptions:
+            context = None
+            if isinstance(code, dict):
+                context = dict(code)
+                code = context.pop('voucher')
+            payload = json.dumps({'context': context, 'tracking_id': tracking_id})
+            rows.append((code, payload, uuid.uuid4().hex, PENDING, now))
+        with self._lock:
+            ids = []
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                for row in rows:
+                    cursor = self._db.execute(
+                        'INSERT INTO redemptions (code, payload, idempotency_key, status, created_at) '
+                        'VALUES (?, ?, ?, ?, ?)', row)
+                    ids.append(cursor.lastrowid)
+                self._db.execute('COMMIT')
+            except Exception:
+                self._db.execute('ROLLBACK')
+                raise
+            self._wakeup.notify_all()
+        return ids
+
+    def start(self):
+        self._stopping = False
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self._work)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def close(self, timeout=None):
+        with self._lock:
+            self._stopping = True
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        with self._lock:
+            self._db.execute("UPDATE redemptions SET status = 'pending' WHERE status = 'inflight'")
+            self._db.close()
+
+    def drain(self, timeout=None):
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            with self._lock:
+                if self._depth() == 0:
+                    return True
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._wakeup.wait(self.poll_interval if remaining is None else min(self.poll_interval, remaining))
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._db.execute('SELECT status, COUNT(*) FROM redemptions GROUP BY status').fetchall())
+            now = time.time()
+            self._trim_completed(now)
+            window = min(RATE_WINDOW, now - self._started)
+            return {
+                'depth': counts.get(PENDING, 0) + counts.get(INFLIGHT, 0),
+                'pending': counts.get(PENDING, 0),
+                'inflight': counts.get(INFLIGHT, 0),
+                'dead': counts.get(DEAD, 0),
+                'drained': self.drained,
+                'drain_rate': len(self._completed) / window if window > 0 else 0.0
+            }
+
+    def dead_letters(self):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, code, payload, idempotency_key, attempts, error FROM redemptions WHERE status = 'dead' "
+                "ORDER BY id").fetchall()
+        return [{
+            'id': row[0],
+            'code': row[1],
+            'tracking_id': json.loads(row[2])['tracking_id'],
+            'idempotency_key': row[3],
+            'attempts': row[4],
+            'error': json.loads(row[5]) if row[5] else None
+        } for row in rows]
+
+    def retry_dead(self, ids=None):
+        return self._update_dead("UPDATE redemptions SET status = 'pending', attempts = 0, next_attempt = 0, "
+                                 "error = NULL WHERE status = 'dead'", ids, notify=True)
+
+    def purge_dead(self, ids=None):
+        return self._update_dead("DELETE FROM redemptions WHERE status = 'dead'", ids)
+
+    def _update_dead(self, statement, ids, notify=False):
+        with self._lock:
+            if ids is None:
+                cursor = self._db.execute(statement)
+            else:
+                ids = list(ids)
+                cursor = self._db.execute(statement + ' AND id IN (%s)' % ','.join('?' * len(ids)), ids)
+            if notify:
+                self._wakeup.notify_all()
+            return cursor.rowcount
+
+    def _depth(self):
+        query = "SELECT COUNT(*) FROM redemptions WHERE status IN ('pending', 'inflight')"
+        return self._db.execute(query).fetchone()[0]
+
+    def _trim_completed(self, now):
+        while self._completed and self._completed[0] < now - RATE_WINDOW:
+            self._completed.popleft()
+
+    def _claim(self):
+        now = time.time()
+        row = self._db.execute(_CLAIM, (now,)).fetchone()
+        if row is None:
+            return None
+        self._db.execute("UPDATE redemptions SET status = 'inflight', attempts = attempts + 1 WHERE id = ?",
+                         (row[0],))
+        return row[:4] + (row[4] + 1,)
+
+    def _wait_time(self):
+        row = self._db.execute("SELECT MIN(next_attempt) FROM redemptions WHERE status = 'pending'").fetchone()
+        if row[0] is None:
+            return self.poll_interval
+        return max(0.001, min(self.poll_interval, row[0] - time.time()))
+
+    def _work(self):
+        while True:
+            with self._lock:
+                row = None
+                while not self._stopping:
+                    row = self._claim()
+                    if row is not None:
+                        break
+                    self._wakeup.wait(self._wait_time())
+                if row is None:
+                    return
+            self._send(*row)
+
+    def _send(self, row_id, code, payload, idempotency_key, attempts):
+        payload = json.loads(payload)
+        target = dict(payload['context'], voucher=code) if payload['context'] is not None else code
+        error = None
+        try:
+            self.client.redemptions.redeem(target, payload['tracking_id'], idempotency_key=idempotency_key,
+                                           strict=True)
+        except VoucherifyError as e:
+            error = e
+        except Exception as e:
+            # Anything else is retried like a connection error, so the worker keeps draining the remaining rows.
+            error = VoucherifyError(e)
+
+        with self._lock:
+            now = time.time()
+            if error is None:
+                self._db.execute('DELETE FROM redemptions WHERE id = ?', (row_id,))
+                self.drained += 1
+                self._completed.append(now)
+                self._trim_completed(now)
+            elif attempts < self.max_attempts and _is_transient_error(error):
+                delay = min(self.max_retry_delay, self.retry_delay * (2 ** (attempts - 1)))
+                self._db.execute("UPDATE redemptions SET status = 'pending', next_attempt = ?, error = ? WHERE id = ?",
+                                 (now + delay, json.dumps(error.body), row_id))
+            else:
+                self._db.execute("UPDATE redemptions SET status = 'dead', error = ? WHERE id = ?",
+                                 (json.dumps(error.body), row_id))
+            self._wakeup.notify_all()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+__all__ = ['RedemptionSpool']
@@ -0,0 +1,48 @@
+import sqlite3
+import threading
+
+
+class SqliteStore(object):
+    # Subclasses set the table schema and how many writes are batched into one transaction (None commits only on
+    # commit() and close()).
+    schema = None
+    commit_every = None
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(self.schema)
+        self._pending = 0
+
+    def _query(self, query, args=()):
+        with self._lock:
+            return self._db.execute(query, args).fetchall()
+
+    def _write(self, query, args):
+        with self._lock:
+            self._db.execute(query, args)
+            self._pending += 1
+            if self.commit_every is not None and self._pending >= self.commit_every:
+                self._db.commit()
+                self._pending = 0
+
+    def commit(self):
+        with self._lock:
+            self._db.commit()
+            self._pending = 0
+
+    def close(self):
+        self.commit()
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+__all__ = ['SqliteStore']
@@ -0,0 +1,428 @@
+import argparse
+import datetime
+import json
+import random
+import sys
+import threading
+import time
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import urlsplit, parse_qsl
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import urlsplit, parse_qsl
+
+
+def echo_handler(method, path, query, body):
+    return 200, {'method': method, 'path': path, 'query': query}
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    # The default backlog of 5 drops bursts of concurrent connections, which then wait a second for a SYN retry.
+    request_queue_size = 128
+
+
+class _StubRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    wbufsize = -1
+
+    def log_message(self, format, *args):
+        pass
+
+    def handle(self):
+        self.server.stub.record_connection()
+        BaseHTTPRequestHandler.handle(self)
+
+    def _dispatch(self):
+        stub = self.server.stub
+        length = int(self.headers.get('Content-Length') or 0)
+        raw_body = self.rfile.read(length) if length else b''
+        body = json.loads(raw_body.decode('utf-8')) if raw_body else None
+        parts = urlsplit(self.path)
+        query = dict(parse_qsl(parts.query))
+        stub.record_request(self.command, parts.path, query, body, self.headers)
+
+        if stub.latency:
+            time.sleep(stub.latency)
+
+        result = stub.handler(self.command, parts.path, query, body)
+        if result is None:
+            self.close_connection = True
+            return
+        status, payload = result[0], result[1]
+        headers = result[2] if len(result) > 2 else {}
+
+        data = json.dumps(payload).encode('utf-8') if payload is not None else b''
+        self.send_response(status)
+        if payload is not None:
+            self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        if self.close_connection:
+            self.send_header('Connection', 'close')
+        for name, value in headers.items():
+            self.send_header(name, str(value))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = _dispatch
+    do_POST = _dispatch
+    do_PUT = _dispatch
+    do_DELETE = _dispatch
+
+
+class StubServer(object):
+    def __init__(self, handler=None, latency=0, host='127.0.0.1', port=0):
+        self.handler = handler or echo_handler
+        self.latency = latency
+        self.requests = []
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._server = _ThreadingHTTPServer((host, port), _StubRequestHandler)
+        self._server.stub = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return 'http://%s:%d' % (host, port)
+
+    def record_connection(self):
+        with self._lock:
+            self.connections += 1
+
+    def record_request(self, method, path, query, body, headers):
+        with self._lock:
+            self.requests.append({
+                'method': method,
+                'path': path,
+                'query': query,
+                'body': body,
+                'headers': dict(headers.items())
+            })
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def _error(status, key, message):
+    return status, {'code': status, 'key': key, 'message': message}
+
+
+def _not_found(kind):
+    return _error(404, 'not_found', 'Cannot find %s' % kind)
+
+
+def _now():
+    return datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S.%fZ')[:-4] + 'Z'
+
+
+class ApiStub(object):
+    # Emulates the Voucherify endpoints used by the SDK on in-memory state, for load tests and benchmarks.
+    COLLECTIONS = ('vouchers', 'redemptions', 'customers', 'orders', 'products', 'validation-rules')
+
+    def __init__(self, vouchers=(), error_rate=0.0, error_status=503, seed=None):
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+        self.data = dict((name, {}) for name in self.COLLECTIONS)
+        self.failures = {}
+        self._ids = 0
+        self._lock = threading.Lock()
+        for voucher in vouchers:
+            self._create_voucher(dict(voucher))
+
+    def fail(self, path, status=503, times=1):
+        with self._lock:
+            self.failures[path] = (status, times)
+
+    def __call__(self, method, path, query, body):
+        with self._lock:
+            error = self._injected_error(path)
+            if error is not None:
+                return error
+            parts = [part for part in path.split('/') if part]
+            if parts[:1] == ['v1']:
+                parts = parts[1:]
+            if not parts:
+                return _not_found('resource')
+            route = getattr(self, '_%s' % parts[0].replace('-', '_'), None)
+            if route is None:
+                return _not_found('resource')
+            return route(method, parts[1:], query, body or {})
+
+    def _injected_error(self, path):
+        failure = self.failures.get(path)
+        if failure is not None:
+            status, times = failure
+            if times <= 1:
+                del self.failures[path]
+            else:
+                self.failures[path] = (status, times - 1)
+            return _error(status, 'injected_error', 'Injected error')
+        if self.error_rate and self.random.random() < self.error_rate:
+            return _error(self.error_status, 'injected_error', 'Injected error')
+        return None
+
+    def _next_id(self, prefix):
+        self._ids += 1
+        return '%s_%d' % (prefix, self._ids)
+
+    def _list(self, name, query, key=None, match=None):
+        limit = int(query.get('limit') or 10)
+        page = int(query.get('page') or 1)
+        records = [record for record in self.data[name].values() if match is None or match(record)]
+        return 200, {
+            'object': 'list',
+            'data_ref': key or name,
+            key or name: records[(page - 1) * limit:page * limit],
+            'total': len(records)
+        }
+
+    def _crud(self, name, kind, prefix, method, parts, query, body):
+        collection = self.data[name]
+        if not parts:
+            if method == 'GET':
+                return self._list(name, query, 'data' if name == 'validation-rules' else None)
+            if method == 'POST':
+                record = dict(body, id=body.get('id') or self._next_id(prefix), created_at=_now())
+                if name == 'customers' and body.get('source_id'):
+                    # Customers are upserted by their source_id.
+                    for existing in collection.values():
+                        if existing.get('source_id') == body['source_id']:
+                            existing.update(body)
+                            return 200, existing
+                collection[record['id']] = record
+                return 200, record
+            return _error(405, 'method_not_allowed', 'Method not allowed')
+        record = collection.get(parts[0])
+        if record is None:
+            return _not_found(kind)
+        if method == 'GET':
+            return 200, record
+        if method == 'PUT':
+            record.update(body)
+            record['updated_at'] = _now()
+            return 200, record
+        if method == 'DELETE':
+            del collection[parts[0]]
+            return 204, None
+        return _error(405, 'method_not_allowed', 'Method not allowed')
+
+    def _customers(self, method, parts, query, body):
+        return self._crud('customers', 'customer', 'cust', method, parts, query, body)
+
+    def _orders(self, method, parts, query, body):
+        return self._crud('orders', 'order', 'ord', method, parts, query, body)
+
+    def _products(self, method, parts, query, body):
+        return self._crud('products', 'product', 'prod', method, parts, query, body)
+
+    def _validation_rules(self, method, parts, query, body):
+        if len(parts) == 2 and parts[1] == 'assignments' and method == 'POST':
+            rule = self.data['validation-rules'].get(parts[0])
+            voucher = self.data['vouchers'].get(body.get('voucher'))
+            if rule is None or voucher is None:
+                return _not_found('validation rule' if rule is None else 'voucher')
+            voucher.setdefault('validation_rules', []).append(rule['id'])
+            return 200, {'id': self._next_id('asgm'), 'rule_id': rule['id'], 'related_object_id': voucher['code']}
+        return self._crud('validation-rules', 'validation rule', 'val', method, parts, query, body)
+
+    def _create_voucher(self, voucher):
+        code = voucher.get('code') or self._next_id('CODE')
+        voucher.update({'code': code, 'object': 'voucher'})
+        voucher.setdefault('active', True)
+        voucher.setdefault('redemption', {'quantity': None, 'redeemed_quantity': 0})
+        self.data['vouchers'][code] = voucher
+        return voucher
+
+    def _vouchers(self, method, parts, query, body):
+        vouchers = self.data['vouchers']
+        if not parts:
+            if method == 'POST':
+                return 200, self._create_voucher(body)
+            campaign = query.get('campaign')
+            return self._list('vouchers', query, match=lambda v: campaign is None or v.get('campaign') == campaign)
+        if parts[0] == 'publish' and len(parts) == 1:
+            return self._publish(body)
+        code = parts[0]
+        voucher = vouchers.get(code)
+        if len(parts) == 1:
+            if method == 'POST':
+                if voucher is not None:
+                    return _error(409, 'duplicate_found', 'Duplicated voucher code')
+                return 200, self._create_voucher(dict(body, code=code))
+            if voucher is None:
+                return _not_found('voucher')
+            if method == 'PUT':
+                voucher.update(body)
+                return 200, voucher
+            if method == 'DELETE':
+                del vouchers[code]
+                return 204, None
+            return 200, voucher
+        if voucher is None:
+            return _not_found('voucher')
+        action = parts[1]
+        if action in ('enable', 'disable'):
+            voucher['active'] = action == 'enable'
+            return 200, voucher
+        if action == 'sessions':
+            return 204, None
+        if action == 'validate':
+            return 200, self._validate(voucher, body)
+        if action == 'redemption':
+            if method == 'GET':
+                entries = [r for r in self.data['redemptions'].values() if r.get('voucher', {}).get('code') == code]
+                return 200, dict(voucher['redemption'], object='list', data_ref='redemption_entries',
+                                 redemption_entries=entries)
+            return self._redeem(voucher, body, query.get('tracking_id'))
+        return _not_found('resource')
+
+    def _validate(self, voucher, params):
+        from voucherify.offline import validate_voucher
+
+        rules = [self.data['validation-rules'][rule_id] for rule_id in voucher.get('validation_rules') or []
+                 if rule_id in self.data['validation-rules']]
+        return validate_voucher(voucher, params, rules)
+
+    def _redeem(self, voucher, params, tracking_id=None):
+        validation = self._validate(voucher, params)
+        if not validation['valid']:
+            return 400, dict(validation['error'], details=voucher['code'])
+        voucher['redemption']['redeemed_quantity'] = voucher['redemption'].get('redeemed_quantity', 0) + 1
+        redemption = {
+            'id': self._next_id('r'),
+            'object': 'redemption',
+            'date': _now(),
+            'result': 'SUCCESS',
+            'tracking_id': tracking_id,
+            'customer': params.get('customer'),
+            'order': validation.get('order'),
+            'metadata': params.get('metadata'),
+            'voucher': voucher
+        }
+        self.data['redemptions'][redemption['id']] = redemption
+        return 200, redemption
+
+    def _publish(self, params):
+        campaign = params.get('campaign')
+        if isinstance(campaign, dict):
+            campaign = campaign.get('name')
+        voucher = None
+        for candidate in self.data['vouchers'].values():
+            if candidate.get('campaign') == campaign and candidate.get('publish', {}).get('customer') is None:
+                voucher = candidate
+                break
+        if voucher is None:
+            if campaign is None:
+                return _error(400, 'missing_campaign', 'Campaign is required')
+            voucher = self._create_voucher({'campaign': campaign, 'code': self._next_id(campaign.upper())})
+        voucher['publish'] = {'customer': params.get('customer'), 'channel': params.get('channel')}
+        return 200, {'id': self._next_id('pub'), 'object': 'publication', 'voucher': voucher,
+                     'customer': params.get('customer')}
+
+    def _redemptions(self, method, parts, query, body):
+        redemptions = self.data['redemptions']
+        if not parts:
+            if method == 'POST':
+                return self._redeem_stackable(body)
+            return self._list('redemptions', query)
+        redemption = redemptions.get(parts[0])
+        if redemption is None:
+            return _not_found('redemption')
+        if len(parts) == 2 and parts[1] == 'rollback' and method == 'POST':
+            if redemption.get('object') != 'redemption' or redemption.get('status') == 'ROLLED_BACK':
+                return _error(400, 'already_rolled_back', 'Redemption has already been rolled back')
+            redemption['status'] = 'ROLLED_BACK'
+            voucher = redemption['voucher']
+            voucher['redemption']['redeemed_quantity'] -= 1
+            rollback = {
+                'id': self._next_id('rr'),
+                'object': 'redemption_rollback',
+                'date': _now(),
+                'result': 'SUCCESS',
+                'reason': query.get('reason'),
+                'redemption': redemption['id'],
+                'voucher': voucher
+            }
+            redemptions[rollback['id']] = rollback
+            return 200, rollback
+        return 200, redemption
+
+    def _redeem_stackable(self, params):
+        results = []
+        for redeemable in params.get('redeemables') or []:
+            voucher = self.data['vouchers'].get(redeemable.get('id'))
+            if voucher is None:
+                return _not_found('voucher')
+            status, redemption = self._redeem(voucher, params)
+            if status != 200:
+                return status, redemption
+            results.append(redemption)
+        return 200, {'redemptions': results, 'order': params.get('order')}
+
+    def _validations(self, method, parts, query, body):
+        redeemables = []
+        for redeemable in body.get('redeemables') or []:
+            voucher = self.data['vouchers'].get(redeemable.get('id'))
+            if voucher is None:
+                redeemables.append({'status': 'INAPPLICABLE', 'id': redeemable.get('id')})
+                continue
+            validation = self._validate(voucher, body)
+            redeemables.append({'status': 'APPLICABLE' if validation['valid'] else 'INAPPLICABLE',
+                                'id': voucher['code'], 'result': validation})
+        return 200, {'valid': all(r['status'] == 'APPLICABLE' for r in redeemables), 'redeemables': redeemables}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve an in-memory emulation of the Voucherify API.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0, help='seconds added to every response')
+    parser.add_argument('--error-rate', type=float, default=0, help='fraction of requests failing')
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    stub = ApiStub(error_rate=args.error_rate, error_status=args.error_status, seed=args.seed)
+    server = StubServer(stub, latency=args.latency, host=args.host, port=args.port)
+    print('Serving the Voucherify API stub on %s/v1' % server.url)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+__all__ = ['StubServer', 'ApiStub', 'echo_handler', 'main']
+
+
+if __name__ == '__main__':
+    sys.exit(main())
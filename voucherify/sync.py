@@ -0,0 +1,106 @@
+import hashlib
+import json
+
+from voucherify.client import VoucherifyError, _imap_bounded
+from voucherify.store import SqliteStore
+
+RESOURCES = ('customers', 'orders')
+COMMIT_EVERY = 500
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS records (
+    resource TEXT NOT NULL,
+    key TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    remote_id TEXT,
+    PRIMARY KEY (resource, key)
+)
+'''
+
+
+def content_hash(record):
+    data = json.dumps(record, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+def record_key(record):
+    return record.get('source_id') or record.get('id')
+
+
+class SyncIndex(SqliteStore):
+    schema = _SCHEMA
+    commit_every = COMMIT_EVERY
+
+    def get(self, resource, key):
+        rows = self._query('SELECT hash, remote_id FROM records WHERE resource = ? AND key = ?', (resource, key))
+        return rows[0] if rows else None
+
+    def put(self, resource, key, hash, remote_id):
+        self._write('INSERT OR REPLACE INTO records (resource, key, hash, remote_id) VALUES (?, ?, ?, ?)',
+                    (resource, key, hash, remote_id))
+
+    def count(self, resource=None):
+        if resource is None:
+            return self._query('SELECT COUNT(*) FROM records')[0][0]
+        return self._query('SELECT COUNT(*) FROM records WHERE resource = ?', (resource,))[0][0]
+
+
+def _missing_key(record):
+    return {
+        'code': None,
+        'key': 'missing_key',
+        'message': 'Record has neither a source_id nor an id',
+        'record': record
+    }
+
+
+def sync(client, resource, records, index, workers=4, force=False, key=record_key):
+    if resource not in RESOURCES:
+        raise ValueError('Unsupported sync resource: %s.' % resource)
+    api = getattr(client, resource)
+    report = {'skipped': 0, 'created': 0, 'updated': 0, 'failed': 0, 'errors': []}
+
+    def changed():
+        for record in records:
+            record_id = key(record)
+            if record_id is None:
+                report['failed'] += 1
+                report['errors'].append((None, _missing_key(record)))
+                continue
+            digest = content_hash(record)
+            known = index.get(resource, record_id)
+            if known is not None and known[0] == digest and not force:
+                report['skipped'] += 1
+                continue
+            yield record_id, digest, record, known[1] if known is not None else record.get('id')
+
+    def send(item):
+        record_id, digest, record, remote_id = item
+        try:
+            if remote_id is not None:
+                try:
+                    return item, api.update(dict(record, id=remote_id), strict=True), None
+                except VoucherifyError as e:
+                    # The record was deleted remotely since the last run, so it is created again.
+                    if e.code != 404 or 'id' in record:
+                        raise
+                item = record_id, digest, record, None
+            return item, api.create(record, strict=True), None
+        except VoucherifyError as e:
+            return item, None, e
+
+    try:
+        for (record_id, digest, record, remote_id), result, error in _imap_bounded(send, changed(), workers):
+            if error is not None:
+                report['failed'] += 1
+                report['errors'].append((record_id, error.body))
+                continue
+            report['updated' if remote_id is not None else 'created'] += 1
+            result_id = result.get('id') if isinstance(result, dict) else getattr(result, 'id', None)
+            index.put(resource, record_id, digest, result_id or remote_id)
+    finally:
+        index.commit()
+    return report
+
+
+__all__ = ['SyncIndex', 'sync', 'content_hash']
@@ -0,0 +1,137 @@
+import collections
+import json
+import threading
+import time
+
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.exceptions import ConnectionError
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+
+try:
+    from urllib.parse import urlsplit, parse_qsl
+except ImportError:
+    from urlparse import urlsplit, parse_qsl
+
+# Only response headers the SDK reads are recorded; request headers carry credentials and are never written.
+RECORDED_HEADERS = ('Content-Type', 'Retry-After', 'X-RateLimit-Limit', 'X-RateLimit-Remaining', 'X-RateLimit-Reset')
+
+
+def _body(body):
+    if body is None or body == b'' or body == '':
+        return None
+    if isinstance(body, bytes):
+        body = body.decode('utf-8')
+    try:
+        return json.loads(body)
+    except ValueError:
+        return body
+
+
+def describe_request(request):
+    parts = urlsplit(request.url)
+    return {
+        'method': request.method,
+        'path': parts.path,
+        'query': sorted(parse_qsl(parts.query, keep_blank_values=True)),
+        'body': _body(request.body)
+    }
+
+
+def _key(request, match_body):
+    body = json.dumps(request['body'], sort_keys=True) if match_body else None
+    return request['method'], request['path'], json.dumps([list(pair) for pair in request['query']]), body
+
+
+def load_cassette(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class RecordingAdapter(BaseAdapter):
+    def __init__(self, path, adapter=None):
+        super(RecordingAdapter, self).__init__()
+        self.path = path
+        self.adapter = adapter if adapter is not None else HTTPAdapter()
+        self.recorded = 0
+        self._lock = threading.Lock()
+        self._file = open(path, 'a')
+
+    def send(self, request, **kwargs):
+        response = self.adapter.send(request, **kwargs)
+        interaction = {
+            'request': describe_request(request),
+            'response': {
+                'status': response.status_code,
+                'headers': dict((name, response.headers[name]) for name in RECORDED_HEADERS
+                                if name in response.headers),
+                'body': response.content.decode('utf-8'),
+                'elapsed': response.elapsed.total_seconds()
+            }
+        }
+        line = json.dumps(interaction) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self.recorded += 1
+        return response
+
+    def close(self):
+        self.adapter.close()
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+class ReplayAdapter(BaseAdapter):
+    def __init__(self, interactions, latency=0, realtime=False, match_body=True):
+        super(ReplayAdapter, self).__init__()
+        if not isinstance(interactions, (list, tuple)):
+            interactions = load_cassette(interactions)
+        self.latency = latency
+        self.realtime = realtime
+        self.match_body = match_body
+        self.hits = 0
+        self.misses = 0
+        self._responses = collections.defaultdict(collections.deque)
+        self._lock = threading.Lock()
+        for interaction in interactions:
+            request = interaction['request']
+            request['query'] = [tuple(pair) for pair in request['query']]
+            self._responses[_key(request, match_body)].append(interaction['response'])
+
+    def send(self, request, **kwargs):
+        description = describe_request(request)
+        with self._lock:
+            responses = self._responses.get(_key(description, self.match_body))
+            if not responses:
+                self.misses += 1
+                raise ConnectionError('No recorded response for %s %s' % (request.method, request.url),
+                                      request=request)
+            self.hits += 1
+            # Responses recorded for the same request are served in order; the last one is repeated after that.
+            recorded = responses.popleft() if len(responses) > 1 else responses[0]
+
+        delay = self.latency + (recorded.get('elapsed', 0) if self.realtime else 0)
+        if delay:
+            time.sleep(delay)
+
+        response = Response()
+        response.status_code = recorded['status']
+        response.headers = CaseInsensitiveDict(recorded.get('headers') or {})
+        response._content = recorded['body'].encode('utf-8')
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+    def close(self):
+        pass
+
+
+__all__ = ['RecordingAdapter', 'ReplayAdapter', 'load_cassette']
@@ -1,5 +1,24 @@
 from __future__ import division
 
+from voucherify.models import Voucher, Discount
+
+numpy = None
+_numpy_loaded = False
+
+
+def _load_numpy():
+    # NumPy takes longer to import than the rest of the SDK, so it is only loaded for the first batch calculation.
+    global numpy, _numpy_loaded
+    if not _numpy_loaded:
+        try:
+            import numpy as module
+        except ImportError:
+            module = None
+        numpy = module
+        _numpy_loaded = True
+    return numpy
+
+
 def round_money(value):
     if value is None or value < 0:
         raise Exception('Invalid value, amount should be a number and higher than zero.')
@@ -22,66 +41,170 @@ def validate_unit_discount(discount=None):
 
 
 def calculate_price(base_price, voucher, unit_price):
+    kind, discount = _compile_voucher(voucher)
+    return round_money(_apply_price(kind, discount, base_price, unit_price))
+
+
+def calculate_discount(base_price, voucher, unit_price):
+    kind, discount = _compile_voucher(voucher)
+    return round_money(_apply_discount(kind, discount, base_price, unit_price))
+
+
+def _discount_field(discount, name):
+    return getattr(discount, name) if isinstance(discount, Discount) else discount[name]
+
+
+def _compile_voucher(voucher):
     e = 100
-    
-    if getattr(voucher, 'gift', None) is not None:
-        discount = min(voucher['gift']['balance'] / e, base_price)
-        return round_money(base_price - discount)
-    
-    if 'discount' not in voucher:
-        raise Exception('Unsupported voucher type.')
-    
-    if voucher['discount']['type'] == 'PERCENT':
-        discount = voucher['discount']['percent_off']
-        validate_percent_discount(discount)
-        price_discount = base_price * (discount / 100)
-        return round_money(base_price - price_discount)
-
-    elif voucher['discount']['type'] == 'AMOUNT':
-        discount = voucher['discount']['amount_off'] / e
-        validate_amount_discount(discount)
-        new_price = base_price - discount
-        return round_money(new_price if new_price > 0 else 0)
 
-    elif voucher['discount']['type'] == 'UNIT':
-        discount = voucher['discount']['unit_off']
-        validate_unit_discount(discount)
-        new_price = base_price - unit_price * discount
-        return round_money(new_price if new_price > 0 else 0)
+    if isinstance(voucher, Voucher):
+        if voucher.gift is not None:
+            return 'GIFT', voucher.gift.balance / e
+        if voucher.discount is None:
+            raise Exception('Unsupported voucher type.')
+        discount = voucher.discount
+    else:
+        if voucher.get('gift') is not None:
+            return 'GIFT', voucher['gift']['balance'] / e
+        if 'discount' not in voucher:
+            raise Exception('Unsupported voucher type.')
+        discount = voucher['discount']
+
+    discount_type = _discount_field(discount, 'type')
+    if discount_type == 'PERCENT':
+        value = _discount_field(discount, 'percent_off')
+        validate_percent_discount(value)
+        return 'PERCENT', value / 100
+
+    elif discount_type == 'AMOUNT':
+        value = _discount_field(discount, 'amount_off') / e
+        validate_amount_discount(value)
+        return 'AMOUNT', value
+
+    elif discount_type == 'UNIT':
+        value = _discount_field(discount, 'unit_off')
+        validate_unit_discount(value)
+        return 'UNIT', value
 
     else:
         raise Exception('Unsupported discount type.')
 
 
-def calculate_discount(base_price, voucher, unit_price):
-    e = 100
-    
-    if getattr(voucher, 'gift', None) is not None: 
-        discount = min(voucher['gift']['balance'] / e, base_price)
-        return round_money(discount)
-    
-    if 'discount' not in voucher:
-        raise Exception('Unsupported voucher type.')
-    
-    if voucher['discount']['type'] == 'PERCENT':
-        discount = voucher['discount']['percent_off']
-        validate_percent_discount(discount)
-        return round_money(base_price * (discount / 100))
-
-    elif voucher['discount']['type'] == 'AMOUNT':
-        discount = voucher['discount']['amount_off'] / e
-        validate_amount_discount(discount)
+def _apply_price(kind, discount, base_price, unit_price):
+    if kind == 'GIFT':
+        return base_price - min(discount, base_price)
+    elif kind == 'PERCENT':
+        return base_price - base_price * discount
+    elif kind == 'AMOUNT':
         new_price = base_price - discount
-        return round_money(discount if new_price > 0 else base_price)
+        return new_price if new_price > 0 else 0
+    else:
+        new_price = base_price - unit_price * discount
+        return new_price if new_price > 0 else 0
 
-    elif voucher['discount']['type'] == 'UNIT':
-        discount = voucher['discount']['unit_off']
-        validate_unit_discount(discount)
+
+def _apply_discount(kind, discount, base_price, unit_price):
+    if kind == 'GIFT':
+        return min(discount, base_price)
+    elif kind == 'PERCENT':
+        return base_price * discount
+    elif kind == 'AMOUNT':
+        return discount if base_price - discount > 0 else base_price
+    else:
         price_discount = unit_price * discount
-        return round_money(base_price if price_discount > base_price else price_discount)
+        return base_price if price_discount > base_price else price_discount
+
+
+def _compile_vouchers(vouchers, count):
+    if isinstance(vouchers, (list, tuple)):
+        if len(vouchers) != count:
+            raise Exception('Invalid vouchers, expected one voucher per price.')
+        compiled = {}
+        for voucher in vouchers:
+            if id(voucher) not in compiled:
+                compiled[id(voucher)] = _compile_voucher(voucher)
+        return [compiled[id(voucher)] for voucher in vouchers]
+    return [_compile_voucher(vouchers)] * count
+
 
+def _round_all(values):
+    for value in values:
+        if value is None or value < 0:
+            raise Exception('Invalid value, amount should be a number and higher than zero.')
+    return [round(value, 2) for value in values]
+
+
+def _calculate_python(base_prices, compiled, unit_prices, price):
+    apply = _apply_price if price else _apply_discount
+    return [apply(kind, discount, base_price, unit_price)
+            for base_price, (kind, discount), unit_price in zip(base_prices, compiled, unit_prices)]
+
+
+def _calculate_numpy(base_prices, compiled, unit_prices, price):
+    base = numpy.asarray(base_prices, dtype=float)
+    units = numpy.asarray(unit_prices, dtype=float)
+    if all(item is compiled[0] for item in compiled):
+        kinds = numpy.array(compiled[0][0])
+        discounts = compiled[0][1]
     else:
-        raise Exception('Unsupported discount type.')
+        kinds = numpy.array([kind for kind, _ in compiled])
+        discounts = numpy.array([discount for _, discount in compiled], dtype=float)
+
+    # Same operation order as the scalar functions, so float results are bit-for-bit identical.
+    with numpy.errstate(invalid='ignore'):
+        gift = numpy.minimum(discounts, base)
+        percent = base * discounts
+        amount_price = base - discounts
+        unit_value = units * discounts
+        unit_price = base - unit_value
+    conditions = [kinds == 'GIFT', kinds == 'PERCENT', kinds == 'AMOUNT']
+    if price:
+        choices = [base - gift, base - percent, numpy.where(amount_price > 0, amount_price, 0)]
+        default = numpy.where(unit_price > 0, unit_price, 0)
+    else:
+        choices = [gift, percent, numpy.where(amount_price > 0, discounts, base)]
+        default = numpy.where(unit_value > base, base, unit_value)
+    results = numpy.select([numpy.broadcast_to(c, base.shape) for c in conditions], choices, default)
+
+    if numpy.isnan(results).any() or (results < 0).any():
+        raise Exception('Invalid value, amount should be a number and higher than zero.')
+    # rint(x * 100) / 100 matches round(x, 2) unless x * 100 lies next to a .5 boundary,
+    # where the builtin's correctly rounded result is used instead.
+    scaled = results * 100
+    rounded = numpy.rint(scaled) / 100
+    ties = numpy.flatnonzero(numpy.abs(scaled - numpy.floor(scaled) - 0.5) < 1e-9 * numpy.maximum(1, scaled))
+    rounded = rounded.tolist()
+    for index in ties.tolist():
+        rounded[index] = round(float(results[index]), 2)
+    return rounded
+
+
+def _calculate_batch(base_prices, vouchers, unit_prices, price, use_numpy):
+    base_prices = list(base_prices)
+    count = len(base_prices)
+    if unit_prices is None or isinstance(unit_prices, (int, float)):
+        unit_prices = [unit_prices or 0] * count
+    else:
+        unit_prices = list(unit_prices)
+    compiled = _compile_vouchers(vouchers, count)
+    if count == 0:
+        return []
+
+    if use_numpy is None:
+        use_numpy = _load_numpy() is not None
+    if use_numpy:
+        if _load_numpy() is None:
+            raise Exception('NumPy is not installed.')
+        return _calculate_numpy(base_prices, compiled, unit_prices, price)
+    return _round_all(_calculate_python(base_prices, compiled, unit_prices, price))
+
+
+def calculate_prices(base_prices, vouchers, unit_prices=None, use_numpy=None):
+    return _calculate_batch(base_prices, vouchers, unit_prices, True, use_numpy)
+
+
+def calculate_discounts(base_prices, vouchers, unit_prices=None, use_numpy=None):
+    return _calculate_batch(base_prices, vouchers, unit_prices, False, use_numpy)
 
 
-__all__ = ['calculate_price', 'calculate_discount']
+__all__ = ['calculate_price', 'calculate_discount', 'calculate_prices', 'calculate_discounts']
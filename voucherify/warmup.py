@@ -0,0 +1,179 @@
+import heapq
+import random
+import threading
+
+from voucherify.cache import CacheBackend
+from voucherify.client import VoucherifyError, _imap_bounded
+
+try:
+    from urllib.parse import quote
+except ImportError:
+    from urllib import quote
+
+PATHS = {
+    'vouchers': '/vouchers/',
+    'products': '/products/',
+    'validation_rules': '/validation-rules/'
+}
+LIST_KEYS = {
+    'vouchers': ('vouchers', 'code'),
+    'products': ('products', 'id'),
+    'validation_rules': ('data', 'id')
+}
+
+
+def warm_up(client, vouchers=None, products=None, validation_rules=None, codes=(), workers=4):
+    if client.cache is None:
+        raise ValueError('Warming up requires a client created with a cache.')
+    loaded = {}
+    queries = (('vouchers', vouchers), ('products', products), ('validation_rules', validation_rules))
+    for namespace, query in queries:
+        if query is None:
+            continue
+        resource = getattr(client, namespace)
+        records_key, id_key = LIST_KEYS[namespace]
+        loaded[namespace] = 0
+        for _, records in resource._iter_pages(resource.base_path, query, records_key):
+            for record in records:
+                client.cache.set(namespace, record[id_key], record)
+            loaded[namespace] += len(records)
+
+    if codes:
+        loaded['codes'] = sum(1 for _ in _imap_bounded(client.vouchers.get, codes, workers))
+    return loaded
+
+
+class RefreshAhead(CacheBackend):
+    def __init__(self, cache, refresh_before=0.2, jitter=0.1, max_idle_refreshes=1, workers=2):
+        self.cache = cache
+        self.refresh_before = refresh_before
+        self.jitter = jitter
+        self.max_idle_refreshes = max_idle_refreshes
+        self.workers = workers
+        self.refreshes = 0
+        self.failures = 0
+        self.client = None
+        self._schedule = []
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._stopping = False
+        self._threads = []
+
+    @property
+    def clock(self):
+        return self.cache.clock
+
+    def ttl_for(self, namespace, negative=False):
+        return self.cache.ttl_for(namespace, negative)
+
+    def get(self, namespace, key):
+        entry = self.cache.get(namespace, key)
+        if entry is not None:
+            with self._lock:
+                state = self._entries.get((namespace, key))
+                if state is not None:
+                    state[1] = 0
+        return entry
+
+    def set(self, namespace, key, value, negative=False):
+        self.cache.set(namespace, key, value, negative)
+        ttl = self.ttl_for(namespace, negative)
+        if negative or not ttl or namespace not in PATHS:
+            self._forget(namespace, key)
+            return
+        lead = ttl * (self.refresh_before + random.uniform(0, self.jitter))
+        due = self.clock() + max(0, ttl - lead)
+        with self._lock:
+            state = self._entries.get((namespace, key))
+            idle = state[1] if state is not None else 0
+            self._entries[(namespace, key)] = [due, idle]
+            heapq.heappush(self._schedule, (due, namespace, key))
+            self._wakeup.notify()
+
+    def invalidate(self, namespace, key):
+        self._forget(namespace, key)
+        self.cache.invalidate(namespace, key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._schedule = []
+        self.cache.clear()
+
+    def stats(self):
+        stats = self.cache.stats()
+        with self._lock:
+            stats['refreshes'] = self.refreshes
+            stats['refresh_failures'] = self.failures
+            stats['scheduled'] = len(self._entries)
+        return stats
+
+    def start(self, client):
+        self.client = client
+        self._stopping = False
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self._work)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        with self._lock:
+            self._stopping = True
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def _forget(self, namespace, key):
+        with self._lock:
+            self._entries.pop((namespace, key), None)
+
+    def _next_due(self):
+        while self._schedule:
+            due, namespace, key = self._schedule[0]
+            state = self._entries.get((namespace, key))
+            if state is not None and state[0] == due:
+                return due, namespace, key
+            heapq.heappop(self._schedule)
+        return None
+
+    def _work(self):
+        while True:
+            with self._lock:
+                while True:
+                    if self._stopping:
+                        return
+                    item = self._next_due()
+                    now = self.clock()
+                    if item is not None and item[0] <= now:
+                        break
+                    self._wakeup.wait(None if item is None else item[0] - now)
+                heapq.heappop(self._schedule)
+                due, namespace, key = item
+                state = self._entries[(namespace, key)]
+                if state[1] >= self.max_idle_refreshes:
+                    del self._entries[(namespace, key)]
+                    continue
+                state[1] += 1
+            self._refresh(namespace, key)
+
+    def _refresh(self, namespace, key):
+        try:
+            result = self.client.request(PATHS[namespace] + quote(key), strict=True)
+        except VoucherifyError as e:
+            with self._lock:
+                self.failures += 1
+            if e.code == 404:
+                self.set(namespace, key, e.body, negative=True)
+            else:
+                self._forget(namespace, key)
+            return
+        with self._lock:
+            self.refreshes += 1
+        self.set(namespace, key, result)
+
+
+__all__ = ['warm_up', 'RefreshAhead']